@@ -19,8 +19,12 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from models import Base
+from db import database_url
 target_metadata = Base.metadata
 
+# $BUDGET_TRACKER_DB_URL (or the default database next to the code) wins over alembic.ini
+config.set_main_option("sqlalchemy.url", database_url().replace("%", "%%"))
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
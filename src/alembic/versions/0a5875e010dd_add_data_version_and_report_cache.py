@@ -0,0 +1,54 @@
+"""
+Add per-user data version and report cache
+
+Revision ID: 0a5875e010dd
+Revises: 1d5f5de435c6
+Create Date: 2026-10-18 13:20:41.318562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a5875e010dd'
+down_revision = '1d5f5de435c6'
+branch_labels = None
+depends_on = None
+
+
+TRIGGERS = [
+    (f'trg_{table}_data_version_{action}', table, action, users)
+    for table in ('transactions', 'budgets')
+    for action, users in (('insert', 'NEW.user_id'), ('delete', 'OLD.user_id'),
+                          ('update', 'OLD.user_id, NEW.user_id'))
+]
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table(
+        'report_cache',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('cache_key', sa.String(), nullable=False),
+        sa.Column('data_version', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.Column('used_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('uq_report_cache_user_id_cache_key', 'report_cache', ['user_id', 'cache_key'], unique=True)
+    op.create_index('ix_report_cache_used_at', 'report_cache', ['used_at'])
+    for name, table, action, users in TRIGGERS:
+        op.execute(f"""CREATE TRIGGER {name}
+    AFTER {action.upper()} ON {table}
+    BEGIN UPDATE users SET data_version = data_version + 1 WHERE id IN ({users}); END""")
+
+
+def downgrade() -> None:
+    for name, _, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.drop_index('ix_report_cache_used_at', table_name='report_cache')
+    op.drop_index('uq_report_cache_user_id_cache_key', table_name='report_cache')
+    op.drop_table('report_cache')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('data_version')
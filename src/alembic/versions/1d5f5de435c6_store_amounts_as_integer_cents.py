@@ -0,0 +1,97 @@
+"""
+Store amounts as integer cents
+
+Revision ID: 1d5f5de435c6
+Revises: 24dc06f294c7
+Create Date: 2026-10-18 12:48:03.661290
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d5f5de435c6'
+down_revision = '24dc06f294c7'
+branch_labels = None
+depends_on = None
+
+
+ADD_NEW_TO_BALANCE = """
+    INSERT INTO balances (user_id, total_income, total_expense, transaction_count)
+    SELECT NEW.user_id,
+           CASE WHEN NEW.transaction_type = 'income' THEN NEW.amount ELSE 0 END,
+           CASE WHEN NEW.transaction_type = 'expense' THEN NEW.amount ELSE 0 END,
+           1
+    WHERE NEW.user_id IS NOT NULL
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_income = total_income + excluded.total_income,
+        total_expense = total_expense + excluded.total_expense,
+        transaction_count = transaction_count + 1;
+"""
+REMOVE_OLD_FROM_BALANCE = """
+    UPDATE balances SET
+        total_income = total_income - CASE WHEN OLD.transaction_type = 'income' THEN OLD.amount ELSE 0 END,
+        total_expense = total_expense - CASE WHEN OLD.transaction_type = 'expense' THEN OLD.amount ELSE 0 END,
+        transaction_count = transaction_count - 1
+    WHERE user_id = OLD.user_id;
+"""
+BALANCE_TRIGGERS = ('trg_transactions_balance_insert', 'trg_transactions_balance_delete',
+                    'trg_transactions_balance_update')
+
+
+def drop_balance_triggers():
+    # Batch mode rebuilds the transactions table, which would drop its triggers anyway
+    for name in BALANCE_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def create_balance_triggers():
+    op.execute(f"""CREATE TRIGGER trg_transactions_balance_insert
+    AFTER INSERT ON transactions
+    BEGIN {ADD_NEW_TO_BALANCE} END""")
+    op.execute(f"""CREATE TRIGGER trg_transactions_balance_delete
+    AFTER DELETE ON transactions
+    BEGIN {REMOVE_OLD_FROM_BALANCE} END""")
+    op.execute(f"""CREATE TRIGGER trg_transactions_balance_update
+    AFTER UPDATE OF user_id, transaction_type, amount ON transactions
+    BEGIN {REMOVE_OLD_FROM_BALANCE} {ADD_NEW_TO_BALANCE} END""")
+
+
+def convert(table, columns, to_cents):
+    """Rescale the amount columns of a table and change their declared type."""
+    expression = "CAST(ROUND({column} * 100) AS INTEGER)" if to_cents else "{column} / 100.0"
+    op.execute(f"UPDATE {table} SET " + ", ".join(
+        f"{column} = " + expression.format(column=column) for column in columns))
+    with op.batch_alter_table(table) as batch_op:
+        for column in columns:
+            batch_op.alter_column(
+                column,
+                type_=sa.Integer() if to_cents else sa.Float(),
+                existing_type=sa.Float() if to_cents else sa.Integer(),
+            )
+
+
+def upgrade() -> None:
+    drop_balance_triggers()
+    convert('transactions', ['amount'], to_cents=True)
+    convert('budgets', ['amount'], to_cents=True)
+    convert('balances', ['total_income', 'total_expense'], to_cents=True)
+    # Recompute from the converted rows so the ledger carries no float rounding over
+    op.execute("DELETE FROM balances")
+    op.execute(
+        "INSERT INTO balances (user_id, total_income, total_expense, transaction_count) "
+        "SELECT user_id, "
+        "COALESCE(SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END), 0), "
+        "COALESCE(SUM(CASE WHEN transaction_type = 'expense' THEN amount ELSE 0 END), 0), "
+        "COUNT(id) FROM transactions WHERE user_id IS NOT NULL GROUP BY user_id"
+    )
+    create_balance_triggers()
+
+
+def downgrade() -> None:
+    drop_balance_triggers()
+    convert('balances', ['total_income', 'total_expense'], to_cents=False)
+    convert('budgets', ['amount'], to_cents=False)
+    convert('transactions', ['amount'], to_cents=False)
+    create_balance_triggers()
@@ -0,0 +1,34 @@
+"""
+Add login sessions for token authentication
+
+Revision ID: 24dc06f294c7
+Revises: cb1cd555e01d
+Create Date: 2026-10-18 11:26:51.804113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '24dc06f294c7'
+down_revision = 'cb1cd555e01d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'login_sessions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('token_hash', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('token_hash'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('login_sessions')
@@ -0,0 +1,72 @@
+"""
+Add monthly summaries maintained by triggers
+
+Revision ID: 5f0c2d9b7e41
+Revises: 0a5875e010dd
+Create Date: 2026-10-18 14:05:12.804417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0c2d9b7e41'
+down_revision = '0a5875e010dd'
+branch_labels = None
+depends_on = None
+
+
+ADD_NEW_TO_SUMMARY = """
+    INSERT INTO monthly_summaries (user_id, year_month, category, transaction_type, transaction_count, total)
+    SELECT NEW.user_id, strftime('%Y-%m', NEW.date), COALESCE(NEW.category, ''), NEW.transaction_type, 1, NEW.amount
+    WHERE NEW.user_id IS NOT NULL AND NEW.date IS NOT NULL AND NEW.transaction_type IS NOT NULL
+    ON CONFLICT (user_id, year_month, category, transaction_type) DO UPDATE SET
+        transaction_count = transaction_count + 1,
+        total = total + excluded.total;
+"""
+SUMMARY_OF_OLD = """user_id = OLD.user_id AND year_month = strftime('%Y-%m', OLD.date)
+        AND category = COALESCE(OLD.category, '') AND transaction_type = OLD.transaction_type"""
+REMOVE_OLD_FROM_SUMMARY = f"""
+    UPDATE monthly_summaries SET
+        transaction_count = transaction_count - 1,
+        total = total - OLD.amount
+    WHERE {SUMMARY_OF_OLD};
+    DELETE FROM monthly_summaries WHERE {SUMMARY_OF_OLD} AND transaction_count <= 0;
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'monthly_summaries',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('year_month', sa.String(length=7), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('transaction_type', sa.String(length=20), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'year_month', 'category', 'transaction_type'),
+    )
+    op.execute(
+        "INSERT INTO monthly_summaries (user_id, year_month, category, transaction_type, transaction_count, total) "
+        "SELECT user_id, strftime('%Y-%m', date), COALESCE(category, ''), transaction_type, COUNT(id), SUM(amount) "
+        "FROM transactions "
+        "WHERE user_id IS NOT NULL AND date IS NOT NULL AND transaction_type IS NOT NULL "
+        "GROUP BY 1, 2, 3, 4"
+    )
+    op.execute(f"""CREATE TRIGGER trg_transactions_summary_insert
+    AFTER INSERT ON transactions
+    BEGIN {ADD_NEW_TO_SUMMARY} END""")
+    op.execute(f"""CREATE TRIGGER trg_transactions_summary_delete
+    AFTER DELETE ON transactions
+    BEGIN {REMOVE_OLD_FROM_SUMMARY} END""")
+    op.execute(f"""CREATE TRIGGER trg_transactions_summary_update
+    AFTER UPDATE OF user_id, transaction_type, category, amount, date ON transactions
+    BEGIN {REMOVE_OLD_FROM_SUMMARY} {ADD_NEW_TO_SUMMARY} END""")
+
+
+def downgrade() -> None:
+    for name in ('trg_transactions_summary_insert', 'trg_transactions_summary_delete',
+                 'trg_transactions_summary_update'):
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.drop_table('monthly_summaries')
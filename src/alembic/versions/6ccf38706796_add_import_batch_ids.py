@@ -0,0 +1,30 @@
+"""
+Add import batch ids to transactions
+
+Revision ID: 6ccf38706796
+Revises: e2a327fe02c1
+Create Date: 2026-10-18 17:24:51.906312
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6ccf38706796'
+down_revision = 'e2a327fe02c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for table in ('transactions', 'transactions_archive'):
+        op.add_column(table, sa.Column('import_batch_id', sa.String(length=12), nullable=True))
+    op.create_index('ix_transactions_user_id_import_batch_id', 'transactions', ['user_id', 'import_batch_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_user_id_import_batch_id', table_name='transactions')
+    # Plain DROP COLUMN (SQLite 3.35+), batch mode would recreate the tables and lose their triggers
+    for table in ('transactions', 'transactions_archive'):
+        op.execute(f"ALTER TABLE {table} DROP COLUMN import_batch_id")
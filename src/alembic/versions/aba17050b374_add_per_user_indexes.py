@@ -0,0 +1,56 @@
+"""
+Add per-user indexes and uniqueness constraints
+
+Revision ID: aba17050b374
+Revises: d7b080ab3ec1
+Create Date: 2026-10-18 09:12:40.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'aba17050b374'
+down_revision = 'd7b080ab3ec1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    duplicate_usernames = conn.execute(sa.text(
+        "SELECT username FROM users GROUP BY username HAVING COUNT(*) > 1"
+    )).scalars().all()
+    if duplicate_usernames:
+        raise RuntimeError(
+            "Cannot make users.username unique, these usernames are taken more than once: "
+            + ", ".join(map(str, duplicate_usernames))
+        )
+
+    # set_budget treats (user_id, category) as the budget's identity
+    duplicate_budgets = conn.execute(sa.text(
+        "SELECT user_id, category, GROUP_CONCAT(id, '/') FROM budgets "
+        "WHERE user_id IS NOT NULL AND category IS NOT NULL "  # NULLs never collide in a unique index
+        "GROUP BY user_id, category HAVING COUNT(*) > 1 ORDER BY user_id, category"
+    )).all()
+    if duplicate_budgets:
+        raise RuntimeError(
+            "Cannot make budgets unique per user and category, delete all but one of these budget ids: "
+            + ", ".join(f"{ids} (user {user_id}, {category!r})" for user_id, category, ids in duplicate_budgets)
+        )
+
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+    op.create_index('uq_budgets_user_id_category', 'budgets', ['user_id', 'category'], unique=True)
+    op.create_index('ix_transactions_user_id_transaction_type', 'transactions', ['user_id', 'transaction_type'])
+    op.create_index('ix_transactions_user_id_date', 'transactions', ['user_id', 'date'])
+    op.create_index('ix_transactions_user_id_category', 'transactions', ['user_id', 'category'])
+    op.execute("ANALYZE")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_user_id_category', table_name='transactions')
+    op.drop_index('ix_transactions_user_id_date', table_name='transactions')
+    op.drop_index('ix_transactions_user_id_transaction_type', table_name='transactions')
+    op.drop_index('uq_budgets_user_id_category', table_name='budgets')
+    op.drop_index('ix_users_username', table_name='users')
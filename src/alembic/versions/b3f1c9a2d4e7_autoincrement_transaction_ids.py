@@ -0,0 +1,64 @@
+"""
+Never reuse transaction ids
+
+Revision ID: b3f1c9a2d4e7
+Revises: 6ccf38706796
+Create Date: 2026-10-19 09:12:40.118274
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f1c9a2d4e7'
+down_revision = '6ccf38706796'
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, transaction_type, category, amount, date, user_id, notes, import_batch_id"
+
+
+def rebuild(autoincrement):
+    """Recreate transactions with or without AUTOINCREMENT, keeping its rows, indexes and triggers.
+
+    SQLite cannot add AUTOINCREMENT to an existing table. Dropping the old table drops its
+    indexes and triggers (without firing them), so their SQL is read first and replayed;
+    the search view is dropped meanwhile so the rename does not trip over it.
+    """
+    connection = op.get_bind()
+    schema = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = 'transactions' AND type IN ('index', 'trigger') "
+        "AND sql IS NOT NULL").scalars().all()
+    view = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'view' AND name = 'transactions_search_content'").scalar()
+
+    op.execute("DROP VIEW IF EXISTS transactions_search_content")
+    op.execute(f"""CREATE TABLE transactions_rebuilt (
+        id INTEGER NOT NULL PRIMARY KEY{" AUTOINCREMENT" if autoincrement else ""},
+        transaction_type VARCHAR(20),
+        category VARCHAR(50),
+        amount INTEGER,
+        date DATE,
+        user_id INTEGER,
+        notes VARCHAR(500),
+        import_batch_id VARCHAR(12),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )""")
+    op.execute(f"INSERT INTO transactions_rebuilt ({COLUMNS}) SELECT {COLUMNS} FROM transactions")
+    op.execute("DROP TABLE transactions")
+    op.execute("ALTER TABLE transactions_rebuilt RENAME TO transactions")
+    for statement in schema + ([view] if view else []):
+        connection.exec_driver_sql(statement)
+
+
+def upgrade() -> None:
+    rebuild(autoincrement=True)
+    # Start after every id handed out so far, archived ones included
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'transactions'")
+    op.execute("""INSERT INTO sqlite_sequence (name, seq) SELECT 'transactions', MAX(id) FROM (
+        SELECT MAX(id) AS id FROM transactions UNION ALL SELECT MAX(id) FROM transactions_archive
+    ) HAVING MAX(id) IS NOT NULL""")
+
+
+def downgrade() -> None:
+    rebuild(autoincrement=False)
@@ -0,0 +1,71 @@
+"""
+Add per-user balances ledger maintained by triggers
+
+Revision ID: cb1cd555e01d
+Revises: aba17050b374
+Create Date: 2026-10-18 10:02:17.530218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cb1cd555e01d'
+down_revision = 'aba17050b374'
+branch_labels = None
+depends_on = None
+
+
+ADD_NEW_TO_BALANCE = """
+    INSERT INTO balances (user_id, total_income, total_expense, transaction_count)
+    SELECT NEW.user_id,
+           CASE WHEN NEW.transaction_type = 'income' THEN NEW.amount ELSE 0 END,
+           CASE WHEN NEW.transaction_type = 'expense' THEN NEW.amount ELSE 0 END,
+           1
+    WHERE NEW.user_id IS NOT NULL
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_income = total_income + excluded.total_income,
+        total_expense = total_expense + excluded.total_expense,
+        transaction_count = transaction_count + 1;
+"""
+REMOVE_OLD_FROM_BALANCE = """
+    UPDATE balances SET
+        total_income = total_income - CASE WHEN OLD.transaction_type = 'income' THEN OLD.amount ELSE 0 END,
+        total_expense = total_expense - CASE WHEN OLD.transaction_type = 'expense' THEN OLD.amount ELSE 0 END,
+        transaction_count = transaction_count - 1
+    WHERE user_id = OLD.user_id;
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'balances',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('total_income', sa.Float(), nullable=False),
+        sa.Column('total_expense', sa.Float(), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO balances (user_id, total_income, total_expense, transaction_count) "
+        "SELECT user_id, "
+        "COALESCE(SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END), 0), "
+        "COALESCE(SUM(CASE WHEN transaction_type = 'expense' THEN amount ELSE 0 END), 0), "
+        "COUNT(id) FROM transactions WHERE user_id IS NOT NULL GROUP BY user_id"
+    )
+    op.execute(f"""CREATE TRIGGER trg_transactions_balance_insert
+    AFTER INSERT ON transactions
+    BEGIN {ADD_NEW_TO_BALANCE} END""")
+    op.execute(f"""CREATE TRIGGER trg_transactions_balance_delete
+    AFTER DELETE ON transactions
+    BEGIN {REMOVE_OLD_FROM_BALANCE} END""")
+    op.execute(f"""CREATE TRIGGER trg_transactions_balance_update
+    AFTER UPDATE OF user_id, transaction_type, amount ON transactions
+    BEGIN {REMOVE_OLD_FROM_BALANCE} {ADD_NEW_TO_BALANCE} END""")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_transactions_balance_update")
+    op.execute("DROP TRIGGER IF EXISTS trg_transactions_balance_delete")
+    op.execute("DROP TRIGGER IF EXISTS trg_transactions_balance_insert")
+    op.drop_table('balances')
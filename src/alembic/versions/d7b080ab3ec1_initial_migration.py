@@ -22,20 +22,21 @@ def upgrade() -> None:
     # Check if the column already exists
     conn = op.get_bind()
     result = conn.execute(
-        "PRAGMA table_info(transactions) WHERE name='user_id'"
+        sa.text("SELECT 1 FROM pragma_table_info('transactions') WHERE name = 'user_id'")
     )
     column_exists = bool(result.first())
 
     if not column_exists:
-        op.add_column('transactions', sa.Column('user_id', sa.Integer(), nullable=True))
-        op.execute("UPDATE transactions SET user_id = NULL")
-        op.create_foreign_key(None, 'transactions', 'users', ['user_id'], ['id'])
+        # SQLite cannot ALTER constraints, so batch mode rebuilds the table with the key
+        with op.batch_alter_table('transactions', recreate='always') as batch_op:
+            batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_transactions_user_id_users', 'users', ['user_id'], ['id'])
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_constraint(None, 'transactions', type_='foreignkey')
-    op.drop_column('transactions', 'user_id')
-    op.drop_constraint(None, 'budgets', type_='foreignkey')
+    # Rebuilding the table without the column drops its foreign key as well
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_column('user_id')
     # ### end Alembic commands ###
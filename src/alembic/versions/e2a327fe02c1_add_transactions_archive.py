@@ -0,0 +1,59 @@
+"""
+Add the transactions archive
+
+Revision ID: e2a327fe02c1
+Revises: e74770795c19
+Create Date: 2026-10-18 16:10:12.843107
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a327fe02c1'
+down_revision = 'e74770795c19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('archived_before', sa.Date(), nullable=True))
+    op.create_table(
+        'transactions_archive',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('transaction_type', sa.String(length=20)),
+        sa.Column('category', sa.String(length=50)),
+        sa.Column('amount', sa.Integer()),
+        sa.Column('date', sa.Date()),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('notes', sa.String(length=500)),
+    )
+    op.create_index('ix_transactions_archive_user_id_date', 'transactions_archive', ['user_id', 'date'])
+
+
+ARCHIVED_OF_BALANCE = "FROM transactions_archive AS a WHERE a.user_id = balances.user_id"
+ARCHIVED_OF_SUMMARY = """FROM transactions_archive AS a WHERE a.user_id = monthly_summaries.user_id
+        AND strftime('%Y-%m', a.date) = monthly_summaries.year_month
+        AND COALESCE(a.category, '') = monthly_summaries.category
+        AND a.transaction_type = monthly_summaries.transaction_type"""
+
+
+def downgrade() -> None:
+    # Move archived rows back. The ledger already counts them and the insert triggers add
+    # them again, so take them out of balances and monthly summaries first.
+    op.execute(f"""UPDATE balances SET
+        total_income = total_income - (SELECT COALESCE(SUM(a.amount), 0) {ARCHIVED_OF_BALANCE}
+                                       AND a.transaction_type = 'income'),
+        total_expense = total_expense - (SELECT COALESCE(SUM(a.amount), 0) {ARCHIVED_OF_BALANCE}
+                                         AND a.transaction_type = 'expense'),
+        transaction_count = transaction_count - (SELECT COUNT(*) {ARCHIVED_OF_BALANCE})""")
+    op.execute(f"""UPDATE monthly_summaries SET
+        transaction_count = transaction_count - (SELECT COUNT(*) {ARCHIVED_OF_SUMMARY}),
+        total = total - (SELECT COALESCE(SUM(a.amount), 0) {ARCHIVED_OF_SUMMARY})""")
+    op.execute("""INSERT INTO transactions (id, transaction_type, category, amount, date, user_id, notes)
+    SELECT id, transaction_type, category, amount, date, user_id, notes FROM transactions_archive""")
+    op.drop_index('ix_transactions_archive_user_id_date', table_name='transactions_archive')
+    op.drop_table('transactions_archive')
+    # Not batch mode: recreating users would break the triggers that update it
+    op.execute("ALTER TABLE users DROP COLUMN archived_before")
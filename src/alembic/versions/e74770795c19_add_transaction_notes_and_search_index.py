@@ -0,0 +1,57 @@
+"""
+Add transaction notes and a full-text search index
+
+Revision ID: e74770795c19
+Revises: 5f0c2d9b7e41
+Create Date: 2026-10-18 15:02:37.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e74770795c19'
+down_revision = '5f0c2d9b7e41'
+branch_labels = None
+depends_on = None
+
+
+ADD_NEW_TO_SEARCH = """
+    INSERT INTO transactions_fts (rowid, owner, category, notes)
+    VALUES (NEW.id, '~' || NEW.user_id || '~', NEW.category, NEW.notes);
+"""
+REMOVE_OLD_FROM_SEARCH = """
+    INSERT INTO transactions_fts (transactions_fts, rowid, owner, category, notes)
+    VALUES ('delete', OLD.id, '~' || OLD.user_id || '~', OLD.category, OLD.notes);
+"""
+
+
+def upgrade() -> None:
+    # The trigram tokenizer needs SQLite 3.34 or newer
+    op.add_column('transactions', sa.Column('notes', sa.String(length=500), nullable=True))
+    op.execute("""CREATE VIEW transactions_search_content AS
+    SELECT id, '~' || user_id || '~' AS owner, category, notes FROM transactions""")
+    op.execute("""CREATE VIRTUAL TABLE transactions_fts USING fts5(
+        owner, category, notes,
+        content='transactions_search_content', content_rowid='id', tokenize='trigram')""")
+    op.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+    op.execute(f"""CREATE TRIGGER trg_transactions_search_insert
+    AFTER INSERT ON transactions
+    BEGIN {ADD_NEW_TO_SEARCH} END""")
+    op.execute(f"""CREATE TRIGGER trg_transactions_search_delete
+    AFTER DELETE ON transactions
+    BEGIN {REMOVE_OLD_FROM_SEARCH} END""")
+    op.execute(f"""CREATE TRIGGER trg_transactions_search_update
+    AFTER UPDATE OF user_id, category, notes ON transactions
+    BEGIN {REMOVE_OLD_FROM_SEARCH} {ADD_NEW_TO_SEARCH} END""")
+
+
+def downgrade() -> None:
+    for name in ('trg_transactions_search_insert', 'trg_transactions_search_delete',
+                 'trg_transactions_search_update'):
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS transactions_fts")
+    op.execute("DROP VIEW IF EXISTS transactions_search_content")
+    # A plain DROP COLUMN (SQLite 3.35+) keeps the table, and with it the other triggers
+    op.execute("ALTER TABLE transactions DROP COLUMN notes")
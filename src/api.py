@@ -0,0 +1,288 @@
+"""Local asyncio HTTP API over the same database as the CLI.
+
+Every request authenticates itself with ``Authorization: Bearer <token>`` (a token from
+``POST /login`` or ``main.py login --print-token``), so one process serves any number of
+users at once. Database work runs on an aiosqlite connection pool; the synchronous
+helpers shared with the CLI (listing, reports, auth) are reused through ``run_sync``.
+
+Needs the aiohttp and aiosqlite packages. Start it with ``python main.py serve``; for
+in-process use, ``aiohttp.test_utils.TestClient(TestServer(create_app()))``.
+
+    POST   /login                 {"username", "password"} -> {"token", "expires_at"}
+    POST   /logout
+    GET    /transactions          ?from&to&type&category&min_amount&max_amount&batch&page_size&after
+    POST   /transactions          {"type", "category", "amount", "date", "notes"} -> transaction + "alerts"
+    DELETE /transactions          the GET filters plus ?ids=1,2&dry_run -> {"deleted" or "matched"}
+    GET    /transactions/search   ?q&fuzzy&limit
+    DELETE /transactions/{id}
+    GET    /budgets
+    PUT    /budgets/{category}    {"amount"}
+    DELETE /budgets/{id}
+    GET    /balance
+    GET    /report                ?from&to&top
+"""
+import asyncio
+import datetime
+import json
+from decimal import Decimal
+from functools import partial
+
+from aiohttp import web
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from auth import hash_password, issue_token, needs_rehash, revoke_token, user_for_token, utcnow, verify_password
+from budgets import check_alerts, expense_deltas
+from db import make_async_engine
+from deletion import delete_transactions
+from importer import parse_row
+from listing import TransactionFilter, fetch_page
+from models import Balance, Budget, Transaction, User
+from money import parse_amount
+from options import format_cursor, parse_cursor
+from reports import cached_report, json_default
+from search import search
+from settings import (DEFAULT_API_POOL_SIZE, DEFAULT_PAGE_SIZE, DEFAULT_SEARCH_LIMIT, DEFAULT_TOKEN_TTL,
+                      DEFAULT_TOP_CATEGORIES)
+
+SESSIONS = web.AppKey("sessions", async_sessionmaker)
+MAX_PAGE_SIZE = 500
+
+routes = web.RouteTableDef()
+
+
+def json_response(data, status=200):
+    return web.json_response(data, status=status, dumps=partial(json.dumps, default=json_default))
+
+
+def error(status, message):
+    return json_response({"error": message}, status=status)
+
+
+def transaction_json(transaction):
+    return {
+        "id": transaction.id,
+        "date": transaction.date,
+        "type": transaction.transaction_type,
+        "category": transaction.category,
+        "amount": transaction.amount,
+        "notes": transaction.notes,
+    }
+
+
+def query_date(request, name):
+    value = request.query.get(name)
+    return None if not value else datetime.date.fromisoformat(value)
+
+
+def query_amount(request, name):
+    value = request.query.get(name)
+    return None if not value else parse_amount(value)
+
+
+def query_flag(request, name):
+    return request.query.get(name, "").lower() in ("1", "true", "yes")
+
+
+def query_filter(request):
+    ids = request.query.get("ids")
+    return TransactionFilter(
+        date_from=query_date(request, "from"),
+        date_to=query_date(request, "to"),
+        transaction_type=request.query.get("type"),
+        category=request.query.get("category"),
+        min_amount=query_amount(request, "min_amount"),
+        max_amount=query_amount(request, "max_amount"),
+        import_batch=request.query.get("batch"),
+        ids=tuple(int(value) for value in ids.split(",")) if ids else None,
+    )
+
+
+async def read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ValueError("the request body must be a JSON object")
+    if not isinstance(body, dict):
+        raise ValueError("the request body must be a JSON object")
+    return body
+
+
+def bearer_token(request):
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+
+
+def authenticated(handler):
+    """Resolve the bearer token to a user for this request only and pass both with an open session."""
+    async def wrapper(request):
+        token = bearer_token(request)
+        if token is None:
+            return error(401, "missing bearer token")
+        async with request.app[SESSIONS]() as session:
+            user = await session.run_sync(user_for_token, token)
+            if user is None:
+                return error(401, "the token has expired or was revoked")
+            return await handler(request, session, user)
+    return wrapper
+
+
+@web.middleware
+async def bad_requests(request, handler):
+    try:
+        return await handler(request)
+    except ValueError as exc:
+        return error(400, str(exc))
+
+
+@routes.post("/login")
+async def login(request):
+    body = await read_json(request)
+    username, password = body.get("username"), body.get("password")
+    if not isinstance(username, str) or not isinstance(password, str):
+        raise ValueError("username and password are required")
+    loop = asyncio.get_running_loop()
+    async with request.app[SESSIONS]() as session:
+        user = await session.scalar(select(User).where(User.username == username))
+        # bcrypt is slow on purpose; keep it off the event loop
+        if user is None or not await loop.run_in_executor(None, verify_password, password, user.password_hash):
+            return error(401, "invalid username or password")
+        if needs_rehash(user.password_hash):
+            user.password_hash = await loop.run_in_executor(None, hash_password, password)
+        token = await session.run_sync(issue_token, user.id)  # also commits the re-hash
+    return json_response({"token": token, "expires_at": utcnow() + DEFAULT_TOKEN_TTL}, status=201)
+
+
+@routes.post("/logout")
+@authenticated
+async def logout(request, session, user):
+    await session.run_sync(revoke_token, bearer_token(request))
+    return web.Response(status=204)
+
+
+@routes.get("/transactions")
+@authenticated
+async def list_transactions(request, session, user):
+    filters = query_filter(request)
+    page_size = max(1, min(int(request.query.get("page_size", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+    after = parse_cursor(request.query["after"]) if request.query.get("after") else None
+    rows, next_cursor = await session.run_sync(fetch_page, user.id, filters, after, page_size)
+    return json_response({
+        "transactions": [transaction_json(transaction) for transaction in rows],
+        "next": None if next_cursor is None else format_cursor(next_cursor),
+    })
+
+
+@routes.get("/transactions/search")
+@authenticated
+async def search_transactions(request, session, user):
+    limit = max(1, min(int(request.query.get("limit", DEFAULT_SEARCH_LIMIT)), MAX_PAGE_SIZE))
+    fuzzy = query_flag(request, "fuzzy")
+    rows = await session.run_sync(search, user.id, request.query.get("q", ""), fuzzy, limit)
+    return json_response({"transactions": [transaction_json(transaction) for transaction in rows]})
+
+
+@routes.post("/transactions")
+@authenticated
+async def add_transaction(request, session, user):
+    body = await read_json(request)
+    body.setdefault("date", datetime.date.today().isoformat())
+    row = parse_row(body, user.id)
+    transaction = Transaction(**row)
+    session.add(transaction)
+    await session.flush()
+    alerts = await session.run_sync(check_alerts, user.id, expense_deltas([row]))
+    await session.commit()
+    return json_response({**transaction_json(transaction), "alerts": [
+        {"category": alert.category, "period": alert.period, "threshold": alert.threshold,
+         "budget": alert.budget, "spent": alert.spent, "message": alert.message()}
+        for alert in alerts]}, status=201)
+
+
+@routes.delete("/transactions")
+@authenticated
+async def delete_matching_transactions(request, session, user):
+    dry_run = query_flag(request, "dry_run")
+    count = await session.run_sync(delete_transactions, user.id, query_filter(request), dry_run)
+    await session.commit()
+    return json_response({"matched" if dry_run else "deleted": count})
+
+
+@routes.delete("/transactions/{transaction_id:\\d+}")
+@authenticated
+async def delete_transaction(request, session, user):
+    result = await session.execute(delete(Transaction).where(
+        Transaction.user_id == user.id, Transaction.id == int(request.match_info["transaction_id"])))
+    await session.commit()
+    return web.Response(status=204) if result.rowcount else error(404, "no such transaction")
+
+
+@routes.get("/budgets")
+@authenticated
+async def list_budgets(request, session, user):
+    rows = await session.execute(
+        select(Budget.id, Budget.category, Budget.amount).where(Budget.user_id == user.id).order_by(Budget.id))
+    return json_response({"budgets": [{"id": budget_id, "category": category, "amount": amount}
+                                      for budget_id, category, amount in rows]})
+
+
+@routes.put("/budgets/{category}")
+@authenticated
+async def set_budget(request, session, user):
+    body = await read_json(request)
+    amount = parse_amount(body.get("amount"))
+    category = request.match_info["category"]
+    budget = await session.scalar(select(Budget).where(Budget.user_id == user.id, Budget.category == category))
+    if budget is None:
+        budget = Budget(user_id=user.id, category=category, amount=amount)
+        session.add(budget)
+    else:
+        budget.amount = amount
+    await session.commit()
+    return json_response({"id": budget.id, "category": budget.category, "amount": budget.amount})
+
+
+@routes.delete("/budgets/{budget_id:\\d+}")
+@authenticated
+async def delete_budget(request, session, user):
+    result = await session.execute(delete(Budget).where(
+        Budget.user_id == user.id, Budget.id == int(request.match_info["budget_id"])))
+    await session.commit()
+    return web.Response(status=204) if result.rowcount else error(404, "no such budget")
+
+
+@routes.get("/balance")
+@authenticated
+async def balance(request, session, user):
+    ledger = await session.get(Balance, user.id)
+    income, expense = (ledger.total_income, ledger.total_expense) if ledger else (Decimal(0), Decimal(0))
+    return json_response({
+        "total_income": income,
+        "total_expense": expense,
+        "balance": income - expense,
+        "transaction_count": ledger.transaction_count if ledger else 0,
+    })
+
+
+@routes.get("/report")
+@authenticated
+async def report(request, session, user):
+    top = int(request.query.get("top", DEFAULT_TOP_CATEGORIES))
+    result = await session.run_sync(
+        cached_report, user.id, query_date(request, "from"), query_date(request, "to"), top)
+    return json_response(result.to_dict())
+
+
+def create_app(url=None, pool_size=DEFAULT_API_POOL_SIZE):
+    """The aiohttp application; the engine is created on startup and disposed on cleanup."""
+    app = web.Application(middlewares=[bad_requests])
+    app.add_routes(routes)
+
+    async def engine_context(app):
+        engine = make_async_engine(url, pool_size=pool_size)
+        app[SESSIONS] = async_sessionmaker(engine, expire_on_commit=False)
+        yield
+        await engine.dispose()
+
+    app.cleanup_ctx.append(engine_context)
+    return app
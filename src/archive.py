@@ -0,0 +1,190 @@
+"""Archival of old transactions, to keep the hot transactions table small.
+
+``archive_transactions`` moves every transaction dated before a cutoff into
+transactions_archive, one database transaction per user, and records the cutoff in
+users.archived_before. Balances and monthly summaries keep counting the moved rows,
+so balances, reports over whole months and ``ledger reconcile`` are unchanged.
+
+Readers only look at the archive when a requested range needs it: ``sources`` splits a
+read into the hot table for dates on or after the user's cutoff, and the union of both
+tables for older dates, so the newest pages of a listing never touch the archive.
+Archived rows keep their ids, which transactions never hands out again (its ids are
+AUTOINCREMENT), and leave the search index: search.py scans a user's archive instead.
+
+``compact`` then merges the search index, refreshes the planner statistics and returns
+the freed pages to the file system (incrementally when the database uses auto_vacuum=INCREMENTAL, which new
+databases do).
+"""
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import case, delete, func, insert, select, text, union_all, update
+from sqlalchemy.dialects.sqlite import insert as upsert
+from sqlalchemy.orm import aliased
+
+from db import Session, get_engine
+from models import ArchivedTransaction, Balance, MonthlySummary, Transaction, User
+
+COLUMNS = [column.name for column in ArchivedTransaction.__table__.columns]
+
+
+@dataclass
+class ArchiveResult:
+    """Summary of an archival run."""
+    rows: int = 0
+    users: int = 0
+    elapsed: float = 0.0
+
+
+@dataclass
+class CompactResult:
+    """Pages of the database file before and after compaction."""
+    pages_before: int = 0
+    pages_after: int = 0
+    page_size: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def freed_bytes(self):
+        return (self.pages_before - self.pages_after) * self.page_size
+
+
+def archived_before(session, user_id):
+    """The user's archive cutoff, None when nothing of theirs was archived."""
+    return session.execute(select(User.archived_before).where(User.id == user_id)).scalar()
+
+
+_all_transactions = None
+
+
+def all_transactions():
+    """Transaction mapped over the union of the hot table and the archive, built once and reused."""
+    global _all_transactions
+    if _all_transactions is None:
+        both = union_all(
+            select(*(Transaction.__table__.c[name] for name in COLUMNS)),
+            select(*(ArchivedTransaction.__table__.c[name] for name in COLUMNS)),
+        ).subquery("all_transactions")
+        _all_transactions = aliased(Transaction, both)
+    return _all_transactions
+
+
+def sources(cutoff, date_from=None, newest_first=True):
+    """The (entity, clauses) pairs to read, in order, for transactions dated from ``date_from``.
+
+    Without an archive cutoff, or for a range starting on or after it, that is just the hot
+    table; otherwise the hot table's rows on or after the cutoff and the union's older rows.
+    """
+    if cutoff is None or (date_from is not None and date_from >= cutoff):
+        return [(Transaction, [])]
+    archived = all_transactions()
+    parts = [(Transaction, [Transaction.date >= cutoff]), (archived, [archived.date < cutoff])]
+    return parts if newest_first else parts[::-1]
+
+
+def add_to_ledger(session, user_id, entity, conditions, sign=1):
+    """Count the rows of ``entity`` meeting ``conditions`` into the user's balance and monthly summaries.
+
+    ``sign=-1`` takes them out instead. This is for the writes the triggers on transactions
+    cannot account for: rows moved into the archive, which must stay counted, and archived
+    rows being deleted.
+    """
+    key = (func.strftime('%Y-%m', entity.date), func.coalesce(entity.category, ''), entity.transaction_type)
+    summaries = session.execute(select(*key, func.count(entity.id), func.sum(entity.amount)).where(
+        *conditions, entity.transaction_type.isnot(None)).group_by(*key)).all()
+    income, expense, count = session.execute(select(
+        func.coalesce(func.sum(case((entity.transaction_type == 'income', entity.amount), else_=0)), 0),
+        func.coalesce(func.sum(case((entity.transaction_type == 'expense', entity.amount), else_=0)), 0),
+        func.count(entity.id),
+    ).where(*conditions)).one()
+
+    if summaries:
+        statement = upsert(MonthlySummary)
+        session.execute(statement.on_conflict_do_update(
+            index_elements=['user_id', 'year_month', 'category', 'transaction_type'],
+            set_={'transaction_count': MonthlySummary.transaction_count + statement.excluded.transaction_count,
+                  'total': MonthlySummary.total + statement.excluded.total},
+        ), [{'user_id': user_id, 'year_month': month, 'category': category, 'transaction_type': transaction_type,
+             'transaction_count': sign * rows, 'total': sign * total}
+            for month, category, transaction_type, rows, total in summaries])
+        if sign < 0:
+            session.execute(delete(MonthlySummary).where(
+                MonthlySummary.user_id == user_id, MonthlySummary.transaction_count <= 0))
+    session.execute(update(Balance).where(Balance.user_id == user_id).values(
+        total_income=Balance.total_income + sign * income,
+        total_expense=Balance.total_expense + sign * expense,
+        transaction_count=Balance.transaction_count + sign * count,
+    ))
+
+
+def archive_user(session, user_id, cutoff):
+    """Move one user's rows dated before ``cutoff`` into the archive; returns the count."""
+    moving = (Transaction.user_id == user_id, Transaction.date < cutoff)
+    moved = session.execute(insert(ArchivedTransaction).from_select(
+        COLUMNS, select(*(getattr(Transaction, name) for name in COLUMNS)).where(*moving))).rowcount
+    if not moved:
+        return 0
+
+    # The delete triggers take the rows out of the ledger, so count them in once more first
+    add_to_ledger(session, user_id, Transaction, moving)
+    session.execute(delete(Transaction).where(*moving))
+    session.execute(update(User).where(User.id == user_id, func.coalesce(User.archived_before, cutoff) <= cutoff)
+                    .values(archived_before=cutoff))
+    return moved
+
+
+def archive_transactions(cutoff, session_factory=Session):
+    """Archive every user's transactions dated before ``cutoff``, one database transaction per user."""
+    result = ArchiveResult()
+    started = time.perf_counter()
+    session = session_factory()
+    try:
+        user_ids = session.execute(select(User.id).order_by(User.id)).scalars().all()
+    finally:
+        session.close()
+
+    for user_id in user_ids:
+        session = session_factory()
+        try:
+            with session.begin():
+                moved = archive_user(session, user_id, cutoff)
+        finally:
+            session.close()
+        result.rows += moved
+        result.users += bool(moved)
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def pragma(connection, name):
+    return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def compact(engine=None, full=False):
+    """Merge the search index and ANALYZE, then free unused pages: incrementally, or with a full VACUUM when ``full`` is set.
+
+    A full VACUUM also switches older databases to auto_vacuum=INCREMENTAL, so later runs can
+    free pages without rewriting the whole file.
+    """
+    engine = engine or get_engine()
+    result = CompactResult()
+    started = time.perf_counter()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        result.page_size, result.pages_before = pragma(connection, "page_size"), pragma(connection, "page_count")
+        # Each archived row left a delete marker in transactions_fts, which later inserts
+        # would otherwise pay for while merging index segments
+        connection.execute(text("INSERT INTO transactions_fts (transactions_fts) VALUES ('optimize')"))
+        connection.execute(text("ANALYZE"))
+        if full:
+            connection.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.exec_driver_sql("VACUUM")
+        elif pragma(connection, "auto_vacuum") == 2:
+            # sqlite3 steps a statement without result rows only once, and each step of
+            # incremental_vacuum frees one page, so repeat it in a single transaction
+            connection.exec_driver_sql("BEGIN")
+            while pragma(connection, "freelist_count"):
+                connection.exec_driver_sql("PRAGMA incremental_vacuum")
+            connection.exec_driver_sql("COMMIT")
+        result.pages_after = pragma(connection, "page_count")
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,131 @@
+import datetime
+import hashlib
+import json
+import os
+import secrets
+
+from models import LoginSession, User
+from settings import (BCRYPT_ROUNDS_ENV, DEFAULT_BCRYPT_ROUNDS, DEFAULT_SESSION_FILE, DEFAULT_TOKEN_TTL,
+                      SESSION_FILE_ENV)
+
+
+def bcrypt_rounds():
+    """The configured bcrypt cost factor (4-31), $BUDGET_TRACKER_BCRYPT_ROUNDS or 12."""
+    rounds = int(os.environ.get(BCRYPT_ROUNDS_ENV, DEFAULT_BCRYPT_ROUNDS))
+    if not 4 <= rounds <= 31:
+        raise ValueError(f"{BCRYPT_ROUNDS_ENV} must be between 4 and 31, got {rounds}.")
+    return rounds
+
+
+def hash_password(password):
+    """Hash a plain-text password with a fresh salt at the configured cost."""
+    import bcrypt  # only password checks pay for loading bcrypt, token logins don't
+
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(bcrypt_rounds())).decode('utf-8')
+
+
+def verify_password(password, password_hash):
+    """Check a plain-text password against a stored bcrypt hash."""
+    import bcrypt
+
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def needs_rehash(password_hash):
+    """True when a hash ($2b$<cost>$...) was made with a different cost than the configured one."""
+    try:
+        return int(password_hash.split("$")[2]) != bcrypt_rounds()
+    except (IndexError, ValueError):
+        return True
+
+
+def authenticate(session, username, password):
+    """Return the user matching the credentials, or None when they don't match."""
+    user = session.query(User).filter_by(username=username).first()
+    if user is None:
+        return None
+    if not verify_password(password, user.password_hash):
+        return None
+    rehash_if_needed(session, user, password)
+    return user
+
+
+def rehash_if_needed(session, user, password):
+    """Re-hash a verified password when the configured bcrypt cost has changed."""
+    if needs_rehash(user.password_hash):
+        user.password_hash = hash_password(password)
+        session.commit()
+        session.refresh(user)  # callers keep using the user after the session closes
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def issue_token(session, user_id, ttl=DEFAULT_TOKEN_TTL):
+    """Create a login session and return its token; only the token's hash is stored."""
+    token = secrets.token_urlsafe(32)
+    now = utcnow()
+    session.add(LoginSession(user_id=user_id, token_hash=hash_token(token), created_at=now, expires_at=now + ttl))
+    session.commit()
+    return token
+
+
+def user_for_token(session, token):
+    """Return the user owning a live (unexpired, unrevoked) token, or None."""
+    return (
+        session.query(User)
+        .join(LoginSession, LoginSession.user_id == User.id)
+        .filter(
+            LoginSession.token_hash == hash_token(token),
+            LoginSession.revoked_at.is_(None),
+            LoginSession.expires_at > utcnow(),
+        )
+        .first()
+    )
+
+
+def revoke_token(session, token):
+    """Revoke a token; returns False when it was unknown or already revoked."""
+    revoked = session.query(LoginSession).filter(
+        LoginSession.token_hash == hash_token(token), LoginSession.revoked_at.is_(None),
+    ).update({LoginSession.revoked_at: utcnow()}, synchronize_session=False)
+    session.commit()
+    return bool(revoked)
+
+
+def session_file():
+    return os.environ.get(SESSION_FILE_ENV) or DEFAULT_SESSION_FILE
+
+
+def save_token(token, username, database_url):
+    """Cache a token in the session file, readable by the current user only."""
+    path = session_file()
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(path, 0o600)
+    with os.fdopen(descriptor, "w") as handle:
+        json.dump({"token": token, "username": username, "database_url": database_url}, handle)
+
+
+def load_token(database_url):
+    """The cached (token, username) for this database, or (None, None)."""
+    try:
+        with open(session_file()) as handle:
+            cached = json.load(handle)
+    except (OSError, ValueError):
+        return None, None
+    if not isinstance(cached, dict) or cached.get("database_url") != database_url:
+        return None, None
+    return cached.get("token"), cached.get("username")
+
+
+def forget_token():
+    try:
+        os.remove(session_file())
+    except FileNotFoundError:
+        pass
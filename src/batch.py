@@ -0,0 +1,110 @@
+"""Month-end batch: one JSON report per user, generated by a pool of worker processes.
+
+User ids are split into shards that the workers pick up one at a time. Each worker
+holds a single read-only connection for its whole life. Every report is written to
+``report-<user_id>.json`` through a temporary file and an atomic rename, so after a
+crash a re-run skips the finished users and redoes only the rest.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from db import make_engine
+from importer import chunked
+from models import User
+from reports import build_report, json_default
+from settings import DEFAULT_BATCH_SHARD_SIZE, DEFAULT_TOP_CATEGORIES
+
+
+@dataclass
+class BatchResult:
+    """Summary of a finished batch run."""
+    written: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def users_per_second(self):
+        return self.written / self.elapsed if self.elapsed else 0.0
+
+
+def report_path(output_dir, user_id):
+    return os.path.join(output_dir, f"report-{user_id}.json")
+
+
+def set_query_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+_connection = None
+
+
+def init_worker(url):
+    """Open the worker's one read-only connection."""
+    global _connection
+    engine = make_engine(url, pool_size=1)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", set_query_only)
+    _connection = engine.connect()
+
+
+def report_shard(user_ids, output_dir, date_from=None, date_to=None, top=DEFAULT_TOP_CATEGORIES):
+    """Write the reports of one shard; returns the (user_id, message) pairs that failed."""
+    errors = []
+    with Session(bind=_connection) as session:
+        for user_id in user_ids:
+            path = report_path(output_dir, user_id)
+            try:
+                report = build_report(session, user_id, date_from, date_to, top)
+                with open(path + ".tmp", "w", encoding="utf-8") as handle:
+                    json.dump(report.to_dict(), handle, default=json_default)
+                os.replace(path + ".tmp", path)
+            except Exception as error:
+                errors.append((user_id, f"{type(error).__name__}: {error}"))
+            finally:
+                session.rollback()  # end the read transaction so WAL checkpoints are not held back
+    return errors
+
+
+def pending_users(url, output_dir, resume=True):
+    """All user ids and, with ``resume``, those that still need a report."""
+    engine = make_engine(url)
+    with Session(engine) as session:
+        user_ids = session.execute(select(User.id).order_by(User.id)).scalars().all()
+    engine.dispose()
+    if not resume:
+        return user_ids, user_ids
+    return user_ids, [user_id for user_id in user_ids if not os.path.exists(report_path(output_dir, user_id))]
+
+
+def run_batch(url, output_dir, workers=None, shard_size=DEFAULT_BATCH_SHARD_SIZE, date_from=None, date_to=None,
+              top=DEFAULT_TOP_CATEGORIES, resume=True, progress=None):
+    """Generate every user's report into ``output_dir``; ``progress(count)`` is called per finished shard."""
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    user_ids, pending = pending_users(url, output_dir, resume)
+    result = BatchResult(skipped=len(user_ids) - len(pending))
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=init_worker,
+                             initargs=(url,)) as pool:
+        futures = {
+            pool.submit(report_shard, shard, output_dir, date_from, date_to, top): len(shard)
+            for shard in chunked(pending, shard_size)
+        }
+        for future in as_completed(futures):
+            errors = future.result()
+            result.written += futures[future] - len(errors)
+            result.errors.extend(errors)
+            if progress is not None:
+                progress(futures[future])
+
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,117 @@
+"""Reads and writes on the hot transactions table before and after archiving old rows.
+
+Fills a throwaway database with benchmarks/datagen.py (four years of transactions per
+user from 2020), times a set of everyday operations, archives everything dated before
+``--before`` with archive.py and times the same operations again:
+
+* the newest page of a listing and the snapshot behind the menu (hot table only)
+* a report whose range starts mid-month after the cutoff (hot table only)
+* a report and a listing page starting before the cutoff (hot table and archive)
+* inserting a chunk of new transactions, which also maintains the indexes and triggers
+
+Run from ``src``:  python benchmarks/bench_archive.py --users 100 --transactions 10000
+"""
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+import click
+from sqlalchemy import insert
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datagen  # noqa: E402
+import db  # noqa: E402
+from archive import archive_transactions, compact  # noqa: E402
+from listing import TransactionFilter, fetch_page  # noqa: E402
+from models import Base, Transaction  # noqa: E402
+from reports import build_report  # noqa: E402
+from snapshot import load_snapshot  # noqa: E402
+
+INSERT_CHUNK = 1000
+
+
+def operations(before):
+    old_from = datetime.date(before.year - 1, 3, 15)
+    recent_from = datetime.date(before.year, before.month, 15) + datetime.timedelta(days=62)
+    return {
+        "newest page": lambda session, user_id: fetch_page(session, user_id),
+        "snapshot": lambda session, user_id: load_snapshot(session, user_id),
+        "report, recent range": lambda session, user_id: build_report(session, user_id, recent_from),
+        "report, old range": lambda session, user_id: build_report(session, user_id, old_from),
+        "page of an old range": lambda session, user_id: fetch_page(
+            session, user_id, TransactionFilter(date_from=old_from, date_to=old_from + datetime.timedelta(days=90))),
+    }
+
+
+def time_operations(session, user_ids, before):
+    results = {}
+    for label, operation in operations(before).items():
+        timings = []
+        for user_id in user_ids:
+            started = time.perf_counter()
+            operation(session, user_id)
+            timings.append((time.perf_counter() - started) * 1e3)
+            session.expunge_all()
+        results[label] = (statistics.median(timings), max(timings))
+    return results
+
+
+def time_inserts(engine, user_ids, rounds=5):
+    """Rows per second of INSERT_CHUNK-row inserts spread over the given users."""
+    rows = [{"user_id": user_ids[index % len(user_ids)], "transaction_type": "expense", "category": "category0",
+             "amount": Decimal("9.99"), "date": datetime.date(2024, 1, 1), "notes": "benchmark insert"}
+            for index in range(INSERT_CHUNK)]
+    started = time.perf_counter()
+    for _ in range(rounds):
+        with engine.begin() as connection:
+            connection.execute(insert(Transaction), rows)
+    return rounds * INSERT_CHUNK / (time.perf_counter() - started)
+
+
+@click.command()
+@click.option("--users", default=100, show_default=True)
+@click.option("--transactions", default=10000, show_default=True, help="Transactions per user.")
+@click.option("--before", default="2023-01-01", show_default=True, help="Archive cutoff (YYYY-MM-DD).")
+@click.option("--samples", default=20, show_default=True, help="Random users timed per operation.")
+@click.option("--seed", default=42, show_default=True)
+def run(users, transactions, before, samples, seed):
+    before = datetime.date.fromisoformat(before)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        db.configure(f"sqlite:///{path}")
+        engine = db.get_engine()
+        Base.metadata.create_all(engine)
+        user_ids = datagen.generate(engine, users, transactions, seed=seed)
+        sample = random.Random(seed).sample(user_ids, min(samples, len(user_ids)))
+        click.echo(f"{users * transactions:,} transactions, database {os.path.getsize(path) / 2 ** 20:,.0f} MiB")
+
+        with db.Session() as session:
+            hot = time_operations(session, sample, before)
+        hot_inserts = time_inserts(engine, sample)
+
+        archived = archive_transactions(before)
+        compacted = compact(full=True)
+        click.echo(f"Archived {archived.rows:,} rows in {archived.elapsed:.1f} s, compacted in "
+                   f"{compacted.elapsed:.1f} s, database {os.path.getsize(path) / 2 ** 20:,.0f} MiB")
+
+        with db.Session() as session:
+            split = time_operations(session, sample, before)
+        split_inserts = time_inserts(engine, sample)
+
+        click.echo(f"  {'':<22} {'before p50/max ms':>20} {'after p50/max ms':>20}")
+        for label in hot:
+            click.echo(f"  {label:<22} {hot[label][0]:>11.2f} / {hot[label][1]:<7.2f}"
+                       f"{split[label][0]:>11.2f} / {split[label][1]:<7.2f}")
+        click.echo(f"  {'inserts':<22} {hot_inserts:>12,.0f} rows/s {split_inserts:>12,.0f} rows/s")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,42 @@
+"""Month-end batch reports with 1, 2, 4 and 8 worker processes.
+
+Run from ``src``:  python benchmarks/bench_batch.py --users 1000 --transactions 1000 --workers 1,2,4,8
+"""
+import os
+import sys
+import tempfile
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import run_batch  # noqa: E402
+from datagen import generate  # noqa: E402
+from db import make_engine  # noqa: E402
+from models import Base  # noqa: E402
+
+
+@click.command()
+@click.option("--users", default=1000, show_default=True)
+@click.option("--transactions", default=1000, show_default=True, help="Transactions per user.")
+@click.option("--workers", default="1,2,4,8", show_default=True, help="Comma separated worker counts.")
+@click.option("--shard-size", default=50, show_default=True)
+def run(users, transactions, workers, shard_size):
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = make_engine(url)
+        Base.metadata.create_all(engine)
+        generate(engine, users, transactions)
+        engine.dispose()
+
+        click.echo(f"{users} users x {transactions} transactions, {os.cpu_count()} CPUs")
+        baseline = None
+        for count in (int(value) for value in workers.split(",")):
+            result = run_batch(url, os.path.join(directory, f"out-{count}"), workers=count, shard_size=shard_size)
+            baseline = baseline or result.elapsed
+            click.echo(f"  {count} workers  {result.elapsed:7.2f} s  {result.users_per_second:8,.0f} users/s  "
+                       f"speedup {baseline / result.elapsed:4.2f}x")
+
+
+if __name__ == "__main__":
+    run()
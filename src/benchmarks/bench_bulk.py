@@ -0,0 +1,108 @@
+"""Per-object model helpers versus a unit of work versus the set-based bulk APIs.
+
+Each operation is applied to ``--rows`` transactions three ways: one helper call
+(and commit) per object, the same calls grouped in one ``unit_of_work()``, and a
+single bulk statement. ``--untuned`` uses SQLite's default journal and fsync
+settings, where every extra commit costs a sync to disk.
+
+Run from ``src``:  python benchmarks/bench_bulk.py --rows 5000
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+from models import Transaction, User, create_tables  # noqa: E402
+
+
+def row(user_id, index):
+    return {
+        "user_id": user_id,
+        "transaction_type": "expense" if index % 3 else "income",
+        "category": f"category{index % 12}",
+        "amount": Decimal(index % 500) + Decimal("0.25"),
+        "date": datetime.date(2024, 1, 1) + datetime.timedelta(days=index % 365),
+    }
+
+
+def insert_each(user_id, rows):
+    for index in range(rows):
+        Transaction(**row(user_id, index)).save()
+
+
+def insert_in_unit(user_id, rows):
+    with db.unit_of_work():
+        insert_each(user_id, rows)
+
+
+def insert_bulk(user_id, rows):
+    Transaction.bulk_create(row(user_id, index) for index in range(rows))
+
+
+def update_each(user_id, rows):
+    for transaction in Transaction.get_by_user(user_id):
+        transaction.update(amount=transaction.amount + 1)
+
+
+def update_in_unit(user_id, rows):
+    with db.unit_of_work():
+        update_each(user_id, rows)
+
+
+def update_bulk(user_id, rows):
+    Transaction.bulk_update({"id": transaction.id, "amount": transaction.amount + 1}
+                            for transaction in Transaction.get_by_user(user_id))
+
+
+def delete_each(user_id, rows):
+    for transaction in Transaction.get_by_user(user_id):
+        transaction.delete()
+
+
+def delete_in_unit(user_id, rows):
+    with db.unit_of_work():
+        delete_each(user_id, rows)
+
+
+def delete_bulk(user_id, rows):
+    Transaction.delete_where(user_id=user_id)
+
+
+STRATEGIES = (
+    ("per object", (insert_each, update_each, delete_each)),
+    ("unit of work", (insert_in_unit, update_in_unit, delete_in_unit)),
+    ("bulk", (insert_bulk, update_bulk, delete_bulk)),
+)
+
+
+@click.command()
+@click.option("--rows", default=5000, show_default=True)
+@click.option("--untuned", is_flag=True, help="SQLite's default journal mode and fsync settings.")
+def run(rows, untuned):
+    with tempfile.TemporaryDirectory() as directory:
+        db.configure(f"sqlite:///{os.path.join(directory, 'bench.db')}", tuned=not untuned)
+        create_tables()
+
+        click.echo(f"{rows} transactions, {'untuned' if untuned else 'tuned'} SQLite")
+        click.echo(f"{'strategy':<14} {'insert rows/s':>14} {'update rows/s':>14} {'delete rows/s':>14}")
+        for index, (label, operations) in enumerate(STRATEGIES):
+            user = User(f"bench{index}", "x", "bench@example.com")
+            user.save()
+            rates = []
+            for operation in operations:
+                started = time.perf_counter()
+                operation(user.id, rows)
+                rates.append(rows / (time.perf_counter() - started))
+            click.echo(f"{label:<14} " + " ".join(f"{rate:>14,.0f}" for rate in rates))
+        db.configure()
+
+
+if __name__ == "__main__":
+    run()
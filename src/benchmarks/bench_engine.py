@@ -0,0 +1,79 @@
+"""Write throughput with SQLite defaults versus the tuned engine from db.py.
+
+Each mode commits ``--commits`` single-row transactions (what add_transaction does)
+and then ``--bulk`` rows in one bulk insert (what the importer does).
+
+Run from ``src``:  python benchmarks/bench_engine.py --commits 2000 --bulk 200000
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+import click
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import make_engine  # noqa: E402
+from models import Base, Transaction, User  # noqa: E402
+
+
+def row(index):
+    return {
+        "user_id": 1,
+        "transaction_type": "expense" if index % 3 else "income",
+        "category": f"category{index % 12}",
+        "amount": float(index % 500),
+        "date": datetime.date(2024, 1, 1) + datetime.timedelta(days=index % 365),
+    }
+
+
+def run_mode(url, tuned, commits, bulk):
+    engine = make_engine(url, tuned=tuned)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    session.add(User(username="bench", password_hash="x", email="bench@example.com"))
+    session.commit()
+    session.close()
+
+    started = time.perf_counter()
+    for index in range(commits):
+        session = Session()
+        session.add(Transaction(**row(index)))
+        session.commit()
+        session.close()
+    single = commits / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    session = Session()
+    with session.begin():
+        session.execute(insert(Transaction), [row(index) for index in range(bulk)])
+    session.close()
+    bulk_rate = bulk / (time.perf_counter() - started)
+
+    engine.dispose()
+    return single, bulk_rate
+
+
+@click.command()
+@click.option("--commits", default=1000, show_default=True, help="Single-row commits per mode.")
+@click.option("--bulk", default=100000, show_default=True, help="Rows in the bulk insert per mode.")
+def run(commits, bulk):
+    with tempfile.TemporaryDirectory() as directory:
+        modes = (
+            ("file, SQLite defaults", f"sqlite:///{os.path.join(directory, 'default.db')}", False),
+            ("file, tuned pragmas", f"sqlite:///{os.path.join(directory, 'tuned.db')}", True),
+            ("in-memory", "sqlite://", True),
+        )
+        click.echo(f"{'mode':<24} {'commits/s':>12} {'bulk rows/s':>14}")
+        for label, url, tuned in modes:
+            single, bulk_rate = run_mode(url, tuned, commits, bulk)
+            click.echo(f"{label:<24} {single:>12,.0f} {bulk_rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,77 @@
+"""Export throughput and memory for CSV, JSONL and Parquet at growing table sizes.
+
+Each export runs twice in a forked child: once for throughput and once under
+tracemalloc for the peak Python heap. RSS is not used because SQLite's page cache
+and memory-mapped reads grow it with the database file, not with what the export
+holds; a flat heap peak across sizes shows that rows are streamed, not loaded.
+
+Run from ``src``:  python benchmarks/bench_export.py --sizes 100000,1000000,10000000
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import click
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datagen import generate  # noqa: E402
+from db import make_engine  # noqa: E402
+from export import export  # noqa: E402
+from models import Base  # noqa: E402
+from settings import EXPORT_FORMATS  # noqa: E402
+
+
+def run_export(url, path, file_format, trace, queue):
+    engine = make_engine(url)
+    session = sessionmaker(bind=engine)()
+    if trace:
+        tracemalloc.start()
+    result = export(session, path, 1, file_format=file_format)
+    peak = tracemalloc.get_traced_memory()[1] if trace else None
+    session.close()
+    engine.dispose()
+    queue.put((result.rows, result.elapsed, peak))
+
+
+def in_child(context, *args):
+    queue = context.SimpleQueue()
+    child = context.Process(target=run_export, args=args + (queue,))
+    child.start()
+    child.join()
+    return queue.get() if child.exitcode == 0 else None
+
+
+@click.command()
+@click.option("--sizes", default="100000,1000000", show_default=True,
+              help="Comma separated transaction counts, e.g. 100000,1000000,10000000.")
+@click.option("--formats", default=",".join(EXPORT_FORMATS), show_default=True)
+def run(sizes, formats):
+    context = multiprocessing.get_context("fork")
+    for size in (int(value) for value in sizes.split(",")):
+        with tempfile.TemporaryDirectory() as directory:
+            url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+            engine = make_engine(url)
+            Base.metadata.create_all(engine)
+            generate(engine, users=1, transactions=size, budgets=False)
+            engine.dispose()
+
+            click.echo(click.style(f"{size:,} transactions", fg="cyan", bold=True))
+            for file_format in formats.split(","):
+                path = os.path.join(directory, f"export.{file_format}")
+                timed = in_child(context, url, path, file_format, False)
+                traced = in_child(context, url, path, file_format, True)
+                if timed is None or traced is None:
+                    click.echo(f"  {file_format:<8} failed")
+                    continue
+                rows, elapsed, _ = timed
+                click.echo(f"  {file_format:<8} {elapsed:8.2f} s  {rows / elapsed:12,.0f} rows/s  "
+                           f"{os.path.getsize(path) / 2**20:9.1f} MiB  peak heap {traced[2] / 2**20:6.1f} MiB")
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,84 @@
+"""Query plans and timings of the per-user hot queries before and after the indexes.
+
+Run from ``src``:  python benchmarks/bench_indexes.py --users 200 --transactions 500
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+import click
+from sqlalchemy import create_engine, func, select, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datagen import generate  # noqa: E402
+from models import Base, Budget, Transaction, User  # noqa: E402
+
+
+def hot_queries(user_id):
+    return {
+        "balance (sum by type)": select(func.sum(Transaction.amount)).where(
+            Transaction.user_id == user_id, Transaction.transaction_type == "expense"),
+        "transactions by user and date": select(Transaction).where(
+            Transaction.user_id == user_id,
+            Transaction.date >= datetime.date(2022, 1, 1)).order_by(Transaction.date),
+        "transactions by user and category": select(Transaction).where(
+            Transaction.user_id == user_id, Transaction.category == "Groceries"),
+        "budget lookup": select(Budget).where(Budget.user_id == user_id, Budget.category == "Rent"),
+        "user lookup": select(User).where(User.username == f"user{user_id}"),
+    }
+
+
+def measure(engine, users, repeat):
+    results = {}
+    rng = random.Random(7)
+    sample = [rng.randint(1, users) for _ in range(repeat)]
+    with engine.connect() as conn:
+        for name, query in hot_queries(1).items():
+            compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+            plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+            started = time.perf_counter()
+            for user_id in sample:
+                conn.execute(hot_queries(user_id)[name]).all()
+            elapsed = (time.perf_counter() - started) / repeat
+            results[name] = (plan, elapsed)
+    return results
+
+
+@click.command()
+@click.option("--users", default=200, show_default=True)
+@click.option("--transactions", default=500, show_default=True, help="Transactions per user.")
+@click.option("--repeat", default=200, show_default=True, help="Queries timed per statement.")
+def run(users, transactions, repeat):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes]
+        with engine.begin() as conn:
+            for index in indexes:
+                index.drop(conn)
+        generate(engine, users, transactions)
+        click.echo(f"{users} users x {transactions} transactions = {users * transactions} rows")
+
+        before = measure(engine, users, repeat)
+        with engine.begin() as conn:
+            for index in indexes:
+                index.create(conn)
+            conn.execute(text("ANALYZE"))
+        after = measure(engine, users, repeat)
+        engine.dispose()
+
+    for name in before:
+        plan_before, time_before = before[name]
+        plan_after, time_after = after[name]
+        click.echo(click.style(name, fg="cyan", bold=True))
+        click.echo(f"  before: {time_before * 1e3:8.3f} ms  {' / '.join(plan_before)}")
+        click.echo(f"  after:  {time_after * 1e3:8.3f} ms  {' / '.join(plan_after)}")
+        click.echo(f"  speedup: {time_before / time_after:.1f}x")
+
+
+if __name__ == "__main__":
+    run()
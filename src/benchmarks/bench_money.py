@@ -0,0 +1,70 @@
+"""Float vs Decimal vs integer-cents aggregation over the same amounts.
+
+The float column is summed in SQL (fast, drifts), re-summed in Python Decimal the
+way reconciliation used to (exact, slow), and compared with an integer SUM over
+cents (exact and fast).
+
+Run from ``src``:  python benchmarks/bench_money.py --rows 1000000
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from money import from_cents  # noqa: E402
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return value, best
+
+
+@click.command()
+@click.option("--rows", default=1000000, show_default=True)
+@click.option("--seed", default=42, show_default=True)
+@click.option("--repeat", default=3, show_default=True, help="Runs per method; the best is reported.")
+def run(rows, seed, repeat):
+    rng = random.Random(seed)
+    cents = [rng.randrange(1, 500000) for _ in range(rows)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(os.path.join(directory, "bench.db"))
+        conn.execute("CREATE TABLE float_amounts (amount FLOAT)")
+        conn.execute("CREATE TABLE cent_amounts (amount INTEGER)")
+        conn.executemany("INSERT INTO float_amounts VALUES (?)", ((value / 100,) for value in cents))
+        conn.executemany("INSERT INTO cent_amounts VALUES (?)", ((value,) for value in cents))
+        conn.commit()
+
+        methods = {
+            "float SUM in SQL": lambda: Decimal(repr(
+                conn.execute("SELECT SUM(amount) FROM float_amounts").fetchone()[0])),
+            "Decimal re-sum in Python": lambda: sum(
+                (Decimal(repr(amount)) for amount, in conn.execute("SELECT amount FROM float_amounts")),
+                Decimal(0)),
+            "integer SUM over cents": lambda: from_cents(
+                conn.execute("SELECT SUM(amount) FROM cent_amounts").fetchone()[0]),
+        }
+        results = {name: timed(method, repeat) for name, method in methods.items()}
+        conn.close()
+
+    exact = from_cents(sum(cents))
+    click.echo(f"{rows} amounts, exact total {exact}")
+    for name, (total, elapsed) in results.items():
+        click.echo(click.style(name, fg="cyan", bold=True))
+        click.echo(f"  {elapsed * 1e3:9.2f} ms  total {total}  drift {total - exact}")
+
+
+if __name__ == "__main__":
+    run()
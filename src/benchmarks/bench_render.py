@@ -0,0 +1,105 @@
+"""Rows rendered per second: one styled echo per row versus render.py's buffered tables.
+
+Formats ``--rows`` synthetic transactions the way the menu used to (a click.echo of a
+click.style line per row) and with listing.transaction_table plus one render.show per
+page of ``--page-size`` rows, writing to:
+
+* a pseudo-terminal drained by a background thread, as when the menu runs in a terminal
+  (colors on, line-buffered stdout, no pager so only the writing is timed)
+* a file, as when the output is redirected (plain text)
+
+Run from ``src``:  python benchmarks/bench_render.py --rows 50000
+"""
+import datetime
+import io
+import os
+import pty
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from types import SimpleNamespace
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import render  # noqa: E402
+from listing import transaction_table  # noqa: E402
+
+
+def transactions(count):
+    return [SimpleNamespace(id=index, date=datetime.date(2024, 1, 1) + datetime.timedelta(days=index % 365),
+                            transaction_type="expense" if index % 3 else "income", category=f"category{index % 12}",
+                            amount=Decimal(index % 5000) / 4, notes=f"Merchant {index % 97} card payment #{index}")
+            for index in range(count)]
+
+
+def per_row(rows, page_size):
+    for transaction in rows:
+        click.echo(click.style(
+            f"ID: {transaction.id} | {transaction.date} | {transaction.transaction_type} | "
+            f"{transaction.category} | {transaction.amount}", fg="cyan"))
+
+
+def buffered(rows, page_size):
+    color = render.is_terminal()
+    for start in range(0, len(rows), page_size):
+        render.show(transaction_table(rows[start:start + page_size], color), pager=False)
+
+
+@contextmanager
+def terminal_stdout():
+    """Point sys.stdout at a pseudo-terminal whose other end is read and discarded."""
+    controller, terminal = pty.openpty()
+    reader = threading.Thread(target=drain, args=(controller,), daemon=True)
+    reader.start()
+    stdout, sys.stdout = sys.stdout, open(terminal, "w", buffering=1, closefd=False)
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+        os.close(terminal)
+        reader.join(timeout=1)
+        os.close(controller)
+
+
+def drain(descriptor):
+    try:
+        while os.read(descriptor, 1 << 16):
+            pass
+    except OSError:
+        pass
+
+
+@contextmanager
+def file_stdout(path):
+    stdout, sys.stdout = sys.stdout, io.open(path, "w", encoding="utf-8")
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+@click.command()
+@click.option("--rows", default=50000, show_default=True)
+@click.option("--page-size", default=1000, show_default=True, help="Rows per buffered write.")
+def run(rows, page_size):
+    data = transactions(rows)
+    with tempfile.TemporaryDirectory() as directory:
+        targets = {"terminal": terminal_stdout, "file": lambda: file_stdout(os.path.join(directory, "out.txt"))}
+        for target, redirect in targets.items():
+            for label, function in (("per-row echo", per_row), ("buffered table", buffered)):
+                with redirect():
+                    started = time.perf_counter()
+                    function(data, page_size)
+                    elapsed = time.perf_counter() - started
+                click.echo(f"  {target:<9} {label:<15} {rows / elapsed:>12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,86 @@
+"""Compare the summary-table report engine with aggregating transactions in SQL and
+with loading every row into Python.
+
+Run from ``src``:  python benchmarks/bench_reports.py --sizes 10000,1000000,10000000
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import click
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datagen import generate  # noqa: E402
+from models import Base, Budget, Transaction  # noqa: E402
+from reports import build_report, window  # noqa: E402
+
+
+def python_report(session):
+    """What generate_report used to do: load every row and walk it in Python."""
+    transactions = session.query(Transaction).filter_by(user_id=1).all()
+    budgets = session.query(Budget).filter_by(user_id=1).all()
+    spent = {}
+    for transaction in transactions:
+        if transaction.transaction_type == "expense":
+            spent[transaction.category] = spent.get(transaction.category, 0) + transaction.amount
+    return spent, budgets
+
+
+def transactions_report(session, user_id, date_from=None):
+    """What build_report did before monthly_summaries: GROUP BY over the transactions rows."""
+    month = func.strftime("%Y-%m", Transaction.date)
+    return session.execute(window(
+        select(month, Transaction.category, Transaction.transaction_type, func.sum(Transaction.amount))
+        .group_by(month, Transaction.category, Transaction.transaction_type),
+        user_id, date_from,
+    )).all()
+
+
+def timed(function):
+    tracemalloc.start()
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+@click.command()
+@click.option("--sizes", default="10000,1000000", show_default=True,
+              help="Comma separated transaction counts, e.g. 10000,1000000,10000000.")
+@click.option("--skip-python-above", default=1000000, show_default=True,
+              help="Skip the load-everything baseline above this many rows.")
+def run(sizes, skip_python_above):
+    for size in (int(value) for value in sizes.split(",")):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+            Base.metadata.create_all(engine)
+            generate(engine, users=1, transactions=size)
+            Session = sessionmaker(bind=engine)
+
+            click.echo(click.style(f"{size:,} transactions", fg="cyan", bold=True))
+            for label, date_from in (("all time", None), ("last 90 days", datetime.date(2023, 10, 3))):
+                for engine_label, report in (("summaries", build_report), ("GROUP BY", transactions_report)):
+                    session = Session()
+                    elapsed, peak = timed(lambda: report(session, 1, date_from=date_from))
+                    session.close()
+                    click.echo(f"  {engine_label + ', ' + label:<26} {elapsed * 1e3:10.1f} ms  "
+                               f"peak {peak / 1024:10.1f} KiB")
+
+            if size <= skip_python_above:
+                session = Session()
+                elapsed, peak = timed(lambda: python_report(session))
+                session.close()
+                click.echo(f"  {'Python baseline':<26} {elapsed * 1e3:10.1f} ms  peak {peak / 1024:10.1f} KiB")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,91 @@
+"""Search latency on a large transactions table: FTS5 trigram index versus LIKE scans.
+
+Fills a throwaway database with benchmarks/datagen.py (notes hold a merchant, a detail
+and a reference number), then times, for ``--samples`` random users each:
+
+* indexed substring and fuzzy searches through search.py
+* the same substring searches as LIKE over the user's rows (no full-text index),
+  which stops early for common words but reads every row of the user for rare ones
+
+Run from ``src``:  python benchmarks/bench_search.py --users 200 --transactions 10000
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import click
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datagen  # noqa: E402
+from db import make_engine  # noqa: E402
+from models import Base, Transaction  # noqa: E402
+from search import search  # noqa: E402
+
+COMMON_QUERIES = ["starbucks", "whole foods", "pizza", "refund"]
+RARE_QUERIES = ["#4242", "#77777 gift", "nothing like this"]
+FUZZY_QUERIES = ["starbuks", "netflx", "wole fods", "chipotel"]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def like_search(session, user_id, query, limit=20):
+    terms = [or_(Transaction.category.icontains(term), Transaction.notes.icontains(term)) for term in query.split()]
+    return session.execute(select(Transaction).where(Transaction.user_id == user_id, *terms)
+                           .order_by(Transaction.id.desc()).limit(limit)).scalars().all()
+
+
+def timed(function, session, user_ids, queries):
+    timings, hits = [], 0
+    for user_id in user_ids:
+        for query in queries:
+            started = time.perf_counter()
+            hits += len(function(session, user_id, query))
+            timings.append((time.perf_counter() - started) * 1e3)
+            session.expunge_all()
+    return timings, hits
+
+
+@click.command()
+@click.option("--users", default=200, show_default=True)
+@click.option("--transactions", default=10000, show_default=True, help="Transactions per user.")
+@click.option("--samples", default=20, show_default=True, help="Random users searched per method.")
+@click.option("--seed", default=42, show_default=True)
+def run(users, transactions, samples, seed):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        engine = make_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        started = time.perf_counter()
+        user_ids = datagen.generate(engine, users, transactions, seed=seed)
+        click.echo(f"{users * transactions:,} transactions generated in {time.perf_counter() - started:.0f} s, "
+                   f"database {os.path.getsize(path) / 2 ** 20:,.0f} MiB")
+
+        sample = random.Random(seed).sample(user_ids, min(samples, len(user_ids)))
+        methods = {
+            "indexed, common words": (search, COMMON_QUERIES),
+            "indexed, rare words": (search, RARE_QUERIES),
+            "indexed fuzzy": (lambda session, user_id, query: search(session, user_id, query, fuzzy=True),
+                              FUZZY_QUERIES),
+            "LIKE, common words": (like_search, COMMON_QUERIES),
+            "LIKE, rare words": (like_search, RARE_QUERIES),
+        }
+        with Session(engine) as session:
+            for label, (function, queries) in methods.items():
+                timings, hits = timed(function, session, sample, queries)
+                click.echo(f"  {label:<22} p50 {percentile(timings, 0.5):8.2f} ms  p95 {percentile(timings, 0.95):8.2f} ms"
+                           f"  mean {statistics.fmean(timings):8.2f} ms  {hits / len(timings):5.1f} hits/query")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,72 @@
+"""Startup cost of the CLI, with a regression threshold.
+
+Uses ``python -X importtime`` to measure the cumulative import time of main.py,
+times ``main.py --help`` end to end and checks that SQLAlchemy and bcrypt are
+not loaded just to build the command line. Exits with status 1 on regression.
+
+Run from ``src``:  python benchmarks/bench_startup.py --max-import-ms 100
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import click
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("sqlalchemy", "bcrypt", "models", "db")
+
+
+def python(*args):
+    return subprocess.run([sys.executable, *args], cwd=SRC, capture_output=True, text=True, check=True)
+
+
+def import_time_us():
+    """Cumulative import time of main.py in microseconds, as reported by -X importtime."""
+    stderr = python("-X", "importtime", "-c", "import main").stderr
+    for line in stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == "main":
+            return int(fields[1])
+    raise RuntimeError("main was not found in the -X importtime output")
+
+
+def wall_time_ms(args, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        python(*args)
+        timings.append((time.perf_counter() - started) * 1e3)
+    return statistics.median(timings)
+
+
+@click.command()
+@click.option("--runs", default=10, show_default=True)
+@click.option("--max-import-ms", default=100.0, show_default=True,
+              help="Fail when importing main takes longer than this.")
+def run(runs, max_import_ms):
+    imports = statistics.median(import_time_us() for _ in range(runs)) / 1e3
+    interpreter = wall_time_ms(["-c", "pass"], runs)
+    help_time = wall_time_ms(["main.py", "--help"], runs)
+    loaded = python("-c", "import sys, main; print(' '.join(m for m in %r if m in sys.modules))" % (HEAVY_MODULES,))
+    loaded = loaded.stdout.split()
+
+    click.echo(f"import main (cumulative):   {imports:8.1f} ms")
+    click.echo(f"python -c pass:             {interpreter:8.1f} ms")
+    click.echo(f"python main.py --help:      {help_time:8.1f} ms")
+    click.echo(f"heavy modules at startup:   {', '.join(loaded) or 'none'}")
+
+    failures = []
+    if imports > max_import_ms:
+        failures.append(f"importing main took {imports:.1f} ms, the limit is {max_import_ms:.1f} ms")
+    if loaded:
+        failures.append(f"{', '.join(loaded)} should only be imported by the commands that need them")
+    for failure in failures:
+        click.echo(click.style(f"REGRESSION: {failure}", fg="red"), err=True)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    run()
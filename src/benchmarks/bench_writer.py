@@ -0,0 +1,143 @@
+"""Writes/sec and error rate of many processes writing to one SQLite file, with and without the writer.
+
+Fills a throwaway database with benchmarks/datagen.py, then lets ``--processes``
+worker processes write for ``--duration`` seconds each: mostly tx add, with a budget
+set every tenth write, through writer.submit exactly as the commands do. That is
+done twice:
+
+* directly: every write is its own transaction, competing for the write lock
+* through ``main.py admin writer``, which commits the queued writes in groups
+
+Run from ``src``:  python benchmarks/bench_writer.py --processes 16 --duration 10
+"""
+import datetime
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datagen  # noqa: E402
+import db  # noqa: E402
+from models import Base  # noqa: E402
+from settings import WRITER_SOCKET_ENV  # noqa: E402
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+BUDGET_EVERY = 10  # every tenth write sets a budget
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def worker(url, socket_path, user_ids, duration, seed, barrier, results):
+    """Write for ``duration`` seconds once every worker is ready; puts (latencies in ms, error Counter)."""
+    from writer import submit
+
+    db.configure(url)
+    db.get_engine().connect().close()
+    if socket_path:
+        os.environ[WRITER_SOCKET_ENV] = socket_path
+    rng = random.Random(seed)
+    latencies, errors = [], Counter()
+    barrier.wait()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        user_id = rng.choice(user_ids)
+        started = time.perf_counter()
+        try:
+            if len(latencies) % BUDGET_EVERY == BUDGET_EVERY - 1:
+                submit("set_budget", user_id, category=f"category{rng.randrange(12)}", amount=rng.randrange(100, 5000))
+            else:
+                submit("add_transaction", user_id, transaction={
+                    "transaction_type": "expense", "category": f"category{rng.randrange(12)}",
+                    "amount": rng.randrange(1, 20000) / 100, "date": datetime.date(2024, 5, rng.randrange(1, 29)),
+                    "notes": "stress test"})
+        except Exception as error:
+            errors[f"{type(error).__name__}: {str(error).splitlines()[0][:60]}"] += 1
+        latencies.append((time.perf_counter() - started) * 1e3)
+    results.put((latencies, errors))
+
+
+def start_writer(url, socket_path, max_batch, max_latency):
+    process = subprocess.Popen(
+        [sys.executable, MAIN, "--db-url", url, "admin", "writer", "--socket", socket_path,
+         "--max-batch", str(max_batch), "--max-latency", str(max_latency)],
+        stderr=subprocess.PIPE, text=True)
+    deadline = time.monotonic() + 30
+    while not os.path.exists(socket_path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise click.ClickException(f"The writer did not start: {process.stderr.read()}")
+        time.sleep(0.05)
+    return process
+
+
+def stop_writer(process):
+    process.terminate()
+    _, log = process.communicate(timeout=30)
+    return log.strip().splitlines()[-1]
+
+
+def run_round(url, socket_path, user_ids, processes, duration, seed):
+    context = multiprocessing.get_context("spawn")
+    barrier, queue = context.Barrier(processes), context.Queue()
+    workers = [context.Process(target=worker, args=(url, socket_path, user_ids, duration, seed + index, barrier, queue))
+               for index in range(processes)]
+    for process in workers:
+        process.start()
+    results = [queue.get() for _ in workers]
+    for process in workers:
+        process.join()
+    latencies = [value for worker_latencies, _ in results for value in worker_latencies]
+    errors = sum((worker_errors for _, worker_errors in results), Counter())
+    return latencies, errors
+
+
+@click.command()
+@click.option("--processes", default=16, show_default=True, help="Concurrent writer processes.")
+@click.option("--duration", default=10.0, show_default=True, help="Seconds each round writes for.")
+@click.option("--users", default=50, show_default=True)
+@click.option("--transactions", default=1000, show_default=True, help="Transactions per user before the test.")
+@click.option("--max-batch", default=256, show_default=True, help="Passed to admin writer.")
+@click.option("--max-latency", default=2, show_default=True, help="Passed to admin writer, in milliseconds.")
+@click.option("--seed", default=42, show_default=True)
+def run(processes, duration, users, transactions, max_batch, max_latency, seed):
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        db.configure(url)
+        engine = db.get_engine()
+        Base.metadata.create_all(engine)
+        user_ids = datagen.generate(engine, users, transactions, seed=seed)
+        engine.dispose()
+
+        click.echo(f"{processes} processes writing for {duration:.0f} s each round")
+        click.echo(f"  {'':<8} {'writes/s':>10} {'errors':>8} {'error rate':>11} {'p50 ms':>8} {'p95 ms':>8}")
+        rounds = {"direct": None, "writer": os.path.join(directory, "writer.sock")}
+        for label, socket_path in rounds.items():
+            writer = start_writer(url, socket_path, max_batch, max_latency) if socket_path else None
+            try:
+                latencies, errors = run_round(url, socket_path, user_ids, processes, duration, seed)
+            finally:
+                summary = stop_writer(writer) if writer else None
+            failed = sum(errors.values())
+            click.echo(f"  {label:<8} {(len(latencies) - failed) / duration:>10,.0f} {failed:>8,} "
+                       f"{failed / max(len(latencies), 1):>11.2%} {statistics.median(latencies):>8.1f} "
+                       f"{percentile(latencies, 0.95):>8.1f}")
+            for message, count in errors.most_common(3):
+                click.echo(f"           {count:>6,} x {message}")
+            if summary:
+                click.echo(f"           {summary}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,108 @@
+"""Seeded synthetic data for the users, budgets and transactions tables.
+
+Scale is users x transactions per user x categories; the same seed always
+produces the same rows. Every generated user can log in with ``PASSWORD``.
+
+Run from ``src``:  python benchmarks/datagen.py --db-url sqlite:///bench.db --users 100 --transactions 10000
+"""
+import datetime
+import os
+import random
+import sys
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASE_CATEGORIES = ["Rent", "Groceries", "Transport", "Utilities", "Dining", "Health", "Salary", "Savings",
+                   "Entertainment", "Insurance", "Education", "Travel"]
+MERCHANTS = ["Starbucks", "Walmart", "Whole Foods", "Uber", "Lyft", "Netflix", "Spotify", "Shell", "CVS Pharmacy",
+             "Amazon", "IKEA", "Delta Airlines", "Marriott", "City Parking", "Planet Fitness", "Trader Joe's",
+             "Chipotle", "Domino's Pizza", "Apple Store", "Home Depot"]
+NOTE_DETAILS = ["weekly shop", "refund", "subscription", "card payment", "online order", "tip included",
+                "monthly plan", "gift", "business trip", "split with friends"]
+PASSWORD = "benchmark"
+START_DATE = datetime.date(2020, 1, 1)
+DAYS = 365 * 4
+BATCH = 50000
+
+
+def category_names(count):
+    return [BASE_CATEGORIES[index] if index < len(BASE_CATEGORIES) else f"Category {index + 1}"
+            for index in range(count)]
+
+
+def transaction_rows(rng, user_id, count, categories):
+    start = START_DATE.toordinal()
+    for _ in range(count):
+        income = rng.random() < 0.2
+        yield (
+            user_id,
+            "income" if income else "expense",
+            rng.choice(categories),
+            rng.randrange(50000, 500000) if income else rng.randrange(100, 50000),  # cents
+            datetime.date.fromordinal(start + rng.randrange(DAYS)).isoformat(),
+            f"{rng.choice(MERCHANTS)} {rng.choice(NOTE_DETAILS)} #{rng.randrange(100000)}",
+        )
+
+
+def generate(engine, users=10, transactions=1000, categories=8, seed=42, budgets=True, progress=None):
+    """Insert ``users`` users with ``transactions`` transactions each into an existing schema."""
+    import bcrypt
+
+    rng = random.Random(seed)
+    names = category_names(categories)
+    password_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(4)).decode("utf-8")
+
+    with engine.begin() as conn:
+        first_id = conn.exec_driver_sql("SELECT COALESCE(MAX(id), 0) + 1 FROM users").scalar()
+        user_ids = list(range(first_id, first_id + users))
+        conn.exec_driver_sql(
+            "INSERT INTO users (id, username, password_hash, email) VALUES (?, ?, ?, ?)",
+            [(user_id, f"user{user_id}", password_hash, f"user{user_id}@example.com") for user_id in user_ids],
+        )
+        if budgets:
+            conn.exec_driver_sql(
+                "INSERT INTO budgets (user_id, category, amount) VALUES (?, ?, ?)",
+                [(user_id, name, rng.randrange(10000, 500000, 5000))
+                 for user_id in user_ids for name in names if name != "Salary"],
+            )
+
+    for user_id in user_ids:
+        rows = transaction_rows(rng, user_id, transactions, names)
+        while True:
+            batch = [row for _, row in zip(range(BATCH), rows)]
+            if not batch:
+                break
+            with engine.begin() as conn:
+                conn.exec_driver_sql(
+                    "INSERT INTO transactions (user_id, transaction_type, category, amount, date, notes) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", batch)
+        if progress is not None:
+            progress(user_id)
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return user_ids
+
+
+@click.command()
+@click.option("--db-url", required=True, help="Database to fill; tables are created when missing.")
+@click.option("--users", default=10, show_default=True)
+@click.option("--transactions", default=1000, show_default=True, help="Transactions per user.")
+@click.option("--categories", default=8, show_default=True)
+@click.option("--seed", default=42, show_default=True)
+def run(db_url, users, transactions, categories, seed):
+    from db import make_engine
+    from models import Base
+
+    engine = make_engine(db_url)
+    Base.metadata.create_all(engine)
+    with click.progressbar(length=users, label="Generating") as bar:
+        generate(engine, users, transactions, categories, seed, progress=lambda user_id: bar.update(1))
+    engine.dispose()
+    click.echo(f"{users} users x {transactions} transactions, password {PASSWORD!r}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,179 @@
+"""Headless latency and memory benchmark of every user-facing operation.
+
+Fills a fresh database with benchmarks/datagen.py, then drives the interactive
+menu actions and the one-shot commands through click's test runner. Prints (or
+writes) JSON with p50/p95 latency and peak traced memory per operation, so two
+versions can be compared with a plain diff.
+
+Run from ``src``:  python benchmarks/harness.py --users 20 --transactions 5000 --output before.json
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import click
+from click.testing import CliRunner
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datagen  # noqa: E402
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+class Operation:
+    """One benchmarked action: ``run`` is timed, ``setup`` (optional) is not."""
+
+    def __init__(self, name, run, setup=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+
+    def measure(self, repeat):
+        timings = []
+        for _ in range(repeat):
+            if self.setup is not None:
+                self.setup()
+            started = time.perf_counter()
+            self.run()
+            timings.append((time.perf_counter() - started) * 1e3)
+
+        if self.setup is not None:
+            self.setup()
+        tracemalloc.start()
+        self.run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            "runs": repeat,
+            "p50_ms": round(percentile(timings, 0.50), 3),
+            "p95_ms": round(percentile(timings, 0.95), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "peak_kib": round(peak / 1024, 1),
+        }
+
+
+def interactive(function, answers=""):
+    """Run a menu action as if the user typed ``answers``; fail loudly on errors."""
+    runner = CliRunner()
+    command = click.command()(function)
+
+    def run():
+        result = runner.invoke(command, input=answers)
+        if result.exception is not None and not isinstance(result.exception, SystemExit):
+            raise result.exception
+    return run
+
+
+def command(cli, args):
+    runner = CliRunner()
+
+    def run():
+        result = runner.invoke(cli, args)
+        if result.exit_code != 0:
+            raise RuntimeError(f"{' '.join(args)} failed: {result.output}")
+    return run
+
+
+def build_operations(user_id, token):
+    import main
+    from db import Session
+    from models import Budget, User
+
+    session = Session()
+    main.authenticated_user = session.get(User, user_id)
+    session.close()
+
+    def recreate_budget():
+        session = Session()
+        session.query(Budget).filter_by(user_id=user_id, category="Benchmark").delete()
+        session.add(Budget(user_id=user_id, category="Benchmark", amount=100))
+        session.commit()
+        recreate_budget.budget_id = session.query(Budget.id).filter_by(user_id=user_id, category="Benchmark").scalar()
+        session.close()
+
+    def delete_budget():
+        interactive(main.delete_budget, f"{recreate_budget.budget_id}\n")()
+
+    token_args = ["--token", token]
+    return [
+        Operation("print_user_menu", interactive(main.print_user_menu)),
+        Operation("add_transaction", interactive(main.add_transaction, "expense\nGroceries\n12.50\n2024-05-01\n\n")),
+        Operation("view_transactions", interactive(main.view_transactions, "\nq\n")),
+        Operation("view_budget", interactive(main.view_budget)),
+        Operation("delete_budget", delete_budget, setup=recreate_budget),
+        Operation("generate_report", interactive(main.generate_report, "\n\n")),
+        Operation("cli tx list", command(main.cli, token_args + ["tx", "list"])),
+        Operation("cli tx list --all", command(main.cli, token_args + ["tx", "list", "--all"])),
+        Operation("cli budget list", command(main.cli, token_args + ["budget", "list"])),
+        Operation("cli report", command(main.cli, token_args + ["report"])),
+    ]
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@click.command()
+@click.option("--users", default=10, show_default=True)
+@click.option("--transactions", default=2000, show_default=True, help="Transactions per user.")
+@click.option("--categories", default=8, show_default=True)
+@click.option("--seed", default=42, show_default=True)
+@click.option("--repeat", default=20, show_default=True, help="Timed runs per operation.")
+@click.option("--only", multiple=True, help="Run only the named operations.")
+@click.option("--output", type=click.Path(dir_okay=False), help="Write the JSON here instead of stdout.")
+def run(users, transactions, categories, seed, repeat, only, output):
+    import db
+    from auth import issue_token
+    from models import Base
+
+    with tempfile.TemporaryDirectory() as directory:
+        db.configure(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(db.get_engine())
+        user_ids = datagen.generate(db.get_engine(), users, transactions, categories, seed)
+
+        session = db.Session()
+        token = issue_token(session, user_ids[0])
+        session.close()
+
+        results = {}
+        for operation in build_operations(user_ids[0], token):
+            if only and operation.name not in only:
+                continue
+            click.echo(f"{operation.name}...", err=True)
+            results[operation.name] = operation.measure(repeat)
+        db.configure()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "scale": {"users": users, "transactions_per_user": transactions, "categories": categories, "seed": seed},
+        },
+        "operations": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        with open(output, "w") as handle:
+            handle.write(text + "\n")
+    else:
+        click.echo(text)
+
+
+if __name__ == "__main__":
+    run()
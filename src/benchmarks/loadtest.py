@@ -0,0 +1,141 @@
+"""Load test of the HTTP API: concurrent clients, requests/sec and latency percentiles.
+
+Fills a throwaway database with benchmarks/datagen.py, starts ``main.py serve`` on it
+in a separate process, issues one token per user and lets ``--concurrency`` clients
+replay a read-heavy mix of requests for ``--duration`` seconds.
+
+Run from ``src``:  python benchmarks/loadtest.py --users 50 --transactions 2000 --concurrency 64
+"""
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datagen  # noqa: E402
+
+# (weight, method, path, JSON body)
+MIX = [
+    (30, "GET", "/balance", None),
+    (30, "GET", "/transactions?page_size=20", None),
+    (15, "GET", "/report", None),
+    (10, "GET", "/budgets", None),
+    (15, "POST", "/transactions", {"type": "expense", "category": "Groceries", "amount": "12.50",
+                                   "date": "2024-05-01"}),
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(base_url, timeout=30):
+    import aiohttp
+
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as client:
+        while True:
+            try:
+                async with client.get(base_url + "/balance"):
+                    return
+            except aiohttp.ClientConnectionError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+
+async def client_loop(client, base_url, tokens, deadline, rng, timings, failures):
+    weights = [weight for weight, *_ in MIX]
+    while time.monotonic() < deadline:
+        _, method, path, body = rng.choices(MIX, weights)[0]
+        headers = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+        started = time.perf_counter()
+        async with client.request(method, base_url + path, json=body, headers=headers) as response:
+            await response.read()
+            elapsed = (time.perf_counter() - started) * 1e3
+        timings.setdefault(f"{method} {path.split('?')[0]}", []).append(elapsed)
+        if response.status >= 400:
+            failures.append(response.status)
+
+
+async def load(base_url, tokens, concurrency, duration, seed):
+    import aiohttp
+
+    await wait_for_server(base_url)
+    timings, failures = {}, []
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        deadline = time.monotonic() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, base_url, tokens, deadline, random.Random(seed + index), timings, failures)
+            for index in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return timings, failures, elapsed
+
+
+def summary(values):
+    return (f"{len(values):8d}  p50 {percentile(values, 0.50):7.2f} ms  p95 {percentile(values, 0.95):7.2f} ms  "
+            f"p99 {percentile(values, 0.99):7.2f} ms  mean {statistics.fmean(values):7.2f} ms")
+
+
+@click.command()
+@click.option("--users", default=50, show_default=True)
+@click.option("--transactions", default=2000, show_default=True, help="Transactions per user.")
+@click.option("--concurrency", default=64, show_default=True, help="Concurrent clients.")
+@click.option("--duration", default=20.0, show_default=True, help="Seconds of load.")
+@click.option("--pool-size", default=8, show_default=True, help="Database connections of the server.")
+@click.option("--seed", default=42, show_default=True)
+def run(users, transactions, concurrency, duration, pool_size, seed):
+    from auth import issue_token
+    from db import make_engine
+    from models import Base
+    from sqlalchemy.orm import Session
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = make_engine(url)
+        Base.metadata.create_all(engine)
+        user_ids = datagen.generate(engine, users, transactions, seed=seed)
+        with Session(engine) as session:
+            tokens = [issue_token(session, user_id) for user_id in user_ids]
+        engine.dispose()
+
+        port = free_port()
+        main = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+        server = subprocess.Popen(
+            [sys.executable, main, "--db-url", url, "serve", "--port", str(port), "--pool-size", str(pool_size)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            timings, failures, elapsed = asyncio.run(
+                load(f"http://127.0.0.1:{port}", tokens, concurrency, duration, seed))
+        finally:
+            server.terminate()
+            server.wait()
+
+    everything = [value for values in timings.values() for value in values]
+    click.echo(f"{users} users x {transactions} transactions, {concurrency} clients, pool of {pool_size}")
+    click.echo(click.style(f"{len(everything) / elapsed:,.0f} requests/s, {len(failures)} failed", fg="cyan", bold=True))
+    click.echo(f"  {'all':<20} {summary(everything)}")
+    for name in sorted(timings):
+        click.echo(f"  {name:<20} {summary(timings[name])}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,115 @@
+"""Budget utilization and overrun alerts.
+
+Budgets apply per calendar month. The month's spend of a category is the expense row
+of monthly_summaries, which the triggers keep current on every insert, update and
+delete, so checking a budget is a primary-key lookup and never scans transactions.
+"""
+import datetime
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sqlalchemy import and_, func, select, tuple_
+
+from models import Budget, MonthlySummary
+from settings import DEFAULT_ALERT_THRESHOLDS
+
+
+@dataclass
+class BudgetStatus:
+    """Spend of one budgeted category in one month."""
+    budget_id: int
+    category: str
+    period: str
+    budget: Decimal
+    spent: Decimal
+
+    @property
+    def remaining(self):
+        return self.budget - self.spent
+
+    @property
+    def utilization(self):
+        return self.spent / self.budget if self.budget else None
+
+
+@dataclass
+class BudgetAlert:
+    """A write pushed a category's monthly spend past ``threshold`` (0.8 = 80%) of its budget."""
+    category: str
+    period: str
+    threshold: float
+    budget: Decimal
+    spent: Decimal
+
+    @property
+    def is_overrun(self):
+        return self.threshold >= 1
+
+    def message(self):
+        return (f"{self.category} is at {self.spent / self.budget:.0%} of its {self.period} budget "
+                f"({self.spent:.2f} of {self.budget:.2f}).")
+
+
+def period_of(date=None):
+    """The budget period (``YYYY-MM``) a date falls in, today's by default."""
+    return (date or datetime.date.today()).strftime('%Y-%m')
+
+
+def budget_status(session, user_id, period=None):
+    """Every budget of a user with its spend in ``period``, most used first."""
+    period = period or period_of()
+    rows = session.execute(
+        select(Budget.id, Budget.category, Budget.amount, func.coalesce(MonthlySummary.total, 0))
+        .outerjoin(MonthlySummary, and_(
+            MonthlySummary.user_id == Budget.user_id,
+            MonthlySummary.category == Budget.category,
+            MonthlySummary.year_month == period,
+            MonthlySummary.transaction_type == 'expense',
+        ))
+        .where(Budget.user_id == user_id)
+    ).all()
+    statuses = [BudgetStatus(budget_id, category, period, amount, Decimal(spent))
+                for budget_id, category, amount, spent in rows]
+    statuses.sort(key=lambda status: (-(status.utilization or 0), status.category))
+    return statuses
+
+
+def expense_deltas(rows):
+    """Sum the expense amounts of transaction mappings per (category, period)."""
+    deltas = {}
+    for row in rows:
+        if row["transaction_type"] == 'expense' and row.get("date") is not None:
+            key = (row["category"], period_of(row["date"]))
+            deltas[key] = deltas.get(key, Decimal(0)) + Decimal(row["amount"])
+    return deltas
+
+
+def check_alerts(session, user_id, deltas, thresholds=DEFAULT_ALERT_THRESHOLDS):
+    """Alerts for the thresholds crossed by writes that were just flushed.
+
+    ``deltas`` maps (category, period) to the expense amount the writes added. The spend
+    before the writes is the current summary total minus that amount, so a single query
+    of indexed lookups covers the keys however many rows the writes touched.
+    """
+    deltas = {key: amount for key, amount in deltas.items() if amount > 0}
+    if not deltas:
+        return []
+    rows = session.execute(
+        select(MonthlySummary.category, MonthlySummary.year_month, Budget.amount, MonthlySummary.total)
+        .join(Budget, and_(Budget.user_id == MonthlySummary.user_id, Budget.category == MonthlySummary.category))
+        .where(
+            MonthlySummary.user_id == user_id,
+            MonthlySummary.transaction_type == 'expense',
+            tuple_(MonthlySummary.category, MonthlySummary.year_month).in_(list(deltas)),
+        )
+    ).all()
+
+    alerts = []
+    for category, period, budget, after in sorted(rows):
+        if not budget:
+            continue
+        before = after - deltas[(category, period)]
+        crossed = [threshold for threshold in thresholds if before < budget * Decimal(str(threshold)) <= after]
+        if crossed:
+            alerts.append(BudgetAlert(category, period, max(crossed), budget, after))
+    return alerts
@@ -0,0 +1,128 @@
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from settings import database_url
+
+MEMORY_URLS = ("sqlite://", "sqlite:///:memory:")
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the single
+# writer, and with WAL synchronous=NORMAL only fsyncs at checkpoints while staying
+# durable against application crashes. auto_vacuum only takes effect on a database
+# without tables yet (or at the next VACUUM) and lets archive.compact free pages cheaply.
+SQLITE_PRAGMAS = (
+    ("auto_vacuum", "INCREMENTAL"),
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("foreign_keys", "ON"),
+    ("busy_timeout", 5000),
+    ("cache_size", -64000),  # in KiB, i.e. 64 MiB
+    ("mmap_size", 268435456),
+    ("temp_store", "MEMORY"),
+)
+
+
+def apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def make_engine(url=None, tuned=True, **kwargs):
+    """Create an engine; SQLite connections get the tuned pragmas unless ``tuned`` is False."""
+    url = database_url(url)
+    if url in MEMORY_URLS:
+        # One shared connection, otherwise every pooled connection sees its own empty database
+        kwargs.setdefault("poolclass", StaticPool)
+        kwargs.setdefault("connect_args", {"check_same_thread": False})
+    engine = create_engine(url, **kwargs)
+    if tuned and engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", apply_pragmas)
+    return engine
+
+
+def make_async_engine(url=None, tuned=True, pool_size=5, **kwargs):
+    """An asyncio engine for the same database; SQLite URLs get the aiosqlite driver."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = database_url(url)
+    if url in MEMORY_URLS:
+        kwargs.setdefault("poolclass", StaticPool)
+    elif url.startswith("sqlite:"):
+        kwargs.setdefault("pool_size", pool_size)
+    url = url.replace("sqlite:", "sqlite+aiosqlite:", 1) if url.startswith("sqlite:") else url
+    engine = create_async_engine(url, **kwargs)
+    if tuned and engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", apply_pragmas)
+    return engine
+
+
+class LazySessionmaker(sessionmaker):
+    """A sessionmaker that binds to the shared engine when the first session is created."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.kw["bind"] = get_engine()
+        return super().__call__(**local_kw)
+
+
+_engine = None
+_url = None
+_tuned = True
+Session = scoped_session(LazySessionmaker())
+
+
+def get_engine():
+    """The shared engine, created on first use."""
+    global _engine
+    if _engine is None:
+        _engine = make_engine(_url, tuned=_tuned)
+    return _engine
+
+
+def configure(url=None, tuned=True):
+    """Point the shared engine and Session at another database, e.g. from the --db-url flag."""
+    global _engine, _url, _tuned
+    Session.remove()
+    if _engine is not None:
+        _engine.dispose()
+    _engine, _url, _tuned = None, url, tuned
+    Session.configure(bind=None)
+
+
+@contextmanager
+def unit_of_work():
+    """A session whose changes are committed once, when the outermost block succeeds.
+
+    Nested blocks, and the model helpers called inside one, join the open unit of work
+    instead of committing on their own, so N changes cost one transaction. Objects stay
+    loaded after the commit so callers can keep using them.
+
+    When the caller already holds the thread's Session (it is in a transaction or has
+    objects loaded), the changes are only flushed into it: committing and closing it
+    stay with the caller, whose objects remain attached.
+    """
+    session = Session()
+    if session.info.get("unit_of_work"):
+        yield session
+        return
+    if session.in_transaction() or session.identity_map:
+        yield session
+        session.flush()
+        return
+
+    session.info["unit_of_work"] = True
+    expire_on_commit, session.expire_on_commit = session.expire_on_commit, False
+    try:
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.expire_on_commit = expire_on_commit
+        del session.info["unit_of_work"]
+        session.close()
@@ -0,0 +1,56 @@
+"""Delete a user's transactions or budgets by filter, one DELETE statement per call.
+
+The statements run in the caller's transaction, so a caller can count, confirm and
+delete atomically, and commits once. Balances, monthly summaries, the search index
+and the report cache follow through the triggers on transactions, exactly as for a
+single delete. ``dry_run`` only counts the matching rows.
+
+Archived transactions (see archive.py) match too. No triggers fire on the archive, so
+their share of the balance and monthly summaries is taken out explicitly and the
+user's data_version is bumped, which the triggers would otherwise have done.
+"""
+from sqlalchemy import delete, func, select, update
+
+from archive import add_to_ledger, archived_before
+from models import ArchivedTransaction, Budget, Transaction, User
+
+
+def delete_matching(session, model, conditions, dry_run=False):
+    """Delete the rows of ``model`` meeting every condition, or only count them on a dry run."""
+    if dry_run:
+        return session.execute(select(func.count()).select_from(model).where(*conditions)).scalar()
+    return session.execute(delete(model).where(*conditions)).rowcount
+
+
+def delete_transactions(session, user_id, filters, dry_run=False):
+    """Delete the user's transactions matching a TransactionFilter; returns the number of rows."""
+    clauses = filters.clauses()
+    if not clauses:
+        raise ValueError("Refusing to delete every transaction without a filter.")
+    deleted = delete_matching(session, Transaction, [Transaction.user_id == user_id, *clauses], dry_run)
+    if archived_before(session, user_id) is not None:
+        deleted += delete_archived(session, user_id, filters.clauses(ArchivedTransaction), dry_run)
+    return deleted
+
+
+def delete_archived(session, user_id, clauses, dry_run=False):
+    """Delete the user's archived transactions meeting ``clauses`` and take them out of the ledger."""
+    conditions = [ArchivedTransaction.user_id == user_id, *clauses]
+    matched = delete_matching(session, ArchivedTransaction, conditions, dry_run=True)
+    if dry_run or not matched:
+        return matched
+    add_to_ledger(session, user_id, ArchivedTransaction, conditions, sign=-1)
+    session.execute(update(User).where(User.id == user_id).values(data_version=User.data_version + 1))
+    return delete_matching(session, ArchivedTransaction, conditions)
+
+
+def delete_budgets(session, user_id, ids=None, categories=None, dry_run=False):
+    """Delete the user's budgets by id and/or category; returns the number of rows."""
+    clauses = []
+    if ids:
+        clauses.append(Budget.id.in_(ids))
+    if categories:
+        clauses.append(Budget.category.in_(categories))
+    if not clauses:
+        raise ValueError("Refusing to delete every budget without a filter.")
+    return delete_matching(session, Budget, [Budget.user_id == user_id, *clauses], dry_run)
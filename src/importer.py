@@ -0,0 +1,228 @@
+import csv
+import datetime
+import json
+import os
+import re
+import secrets
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+from sqlalchemy import insert, select
+
+from archive import archived_before, sources
+from budgets import check_alerts, expense_deltas
+from models import Transaction
+from money import parse_amount
+from settings import (DEFAULT_CHUNK_SIZE, DEFAULT_NATURAL_KEY, IMPORT_BATCH_ID_LENGTH, IMPORT_FORMATS as FORMATS,
+                      NOTES_MAX_LENGTH)
+
+KEY_FIELDS = ("transaction_type", "category", "amount", "date")
+
+
+class ImportAborted(RuntimeError):
+    """An error stopped an import after some chunks were committed; ``result`` counts what was."""
+
+    def __init__(self, error, result):
+        super().__init__(str(error))
+        self.result = result
+
+
+@dataclass
+class ImportResult:
+    """Summary of a finished import run."""
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list)
+    alerts: list = field(default_factory=list)
+    batch_id: str = None  # import_batch_id of the inserted rows, for `tx delete --batch`
+
+    @property
+    def processed(self):
+        return self.inserted + self.duplicates + self.invalid
+
+    @property
+    def rows_per_second(self):
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+
+def detect_format(path):
+    """Guess the file format from its extension."""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in ("json", "ndjson"):
+        return "jsonl"
+    if extension in ("qfx",):
+        return "ofx"
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot detect the format of {path}, please pass one of {', '.join(FORMATS)}.")
+    return extension
+
+
+def parse_row(raw, user_id):
+    """Validate one raw record and turn it into a transaction mapping."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"expected a record with named fields, got {type(raw).__name__}")
+    transaction_type = str(raw.get("transaction_type") or raw.get("type") or "").strip().lower()
+    if transaction_type not in ("income", "expense"):
+        raise ValueError(f"invalid transaction type {transaction_type!r}")
+
+    category = str(raw.get("category") or "").strip()
+    if not category:
+        raise ValueError("missing category")
+
+    amount = abs(parse_amount(raw.get("amount")))
+
+    date = raw.get("date")
+    if not isinstance(date, datetime.date):
+        date = datetime.datetime.strptime(str(date).strip(), "%Y-%m-%d").date()
+
+    notes = str(raw.get("notes") or raw.get("description") or raw.get("memo") or "").strip()
+
+    return {
+        "transaction_type": transaction_type,
+        "category": category[:50],
+        "amount": amount,
+        "date": date,
+        "user_id": user_id,
+        "notes": notes[:NOTES_MAX_LENGTH] or None,
+    }
+
+
+def read_csv(handle):
+    yield from csv.DictReader(handle)
+
+
+def read_jsonl(handle):
+    """Yield the non-blank lines; import_records decodes each with its row, so a bad line only skips itself."""
+    for line in handle:
+        line = line.strip()
+        if line:
+            yield line
+
+
+OFX_TRANSACTION = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.IGNORECASE | re.DOTALL)
+OFX_FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+def read_ofx(handle):
+    """Yield the fields of each <STMTTRN> block of an OFX/QFX statement; see ofx_record."""
+    for block in OFX_TRANSACTION.finditer(handle.read()):
+        yield {name.upper(): value.strip() for name, value in OFX_FIELD.findall(block.group(1))}
+
+
+def ofx_record(fields):
+    """Turn the fields of one OFX transaction into a record for parse_row."""
+    amount = parse_amount(fields.get("TRNAMT", "0"))
+    posted = fields.get("DTPOSTED", "")[:8]
+    return {
+        "transaction_type": "income" if amount >= 0 else "expense",
+        "category": fields.get("NAME") or fields.get("MEMO") or "Uncategorized",
+        "amount": amount,
+        "date": f"{posted[:4]}-{posted[4:6]}-{posted[6:8]}",
+        "notes": fields.get("MEMO") if fields.get("NAME") else None,
+    }
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl, "ofx": read_ofx}
+# Turn what a reader yields into a record for parse_row, inside the per-row error handling
+DECODERS = {"jsonl": json.loads, "ofx": ofx_record}
+
+
+def chunked(rows, size):
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def natural_key(row, fields):
+    return tuple(row[name] for name in fields)
+
+
+def existing_keys(session, user_id, fields):
+    """Load the natural keys already stored for a user, archived transactions included."""
+    keys = set()
+    for entity, _ in sources(archived_before(session, user_id)):
+        query = select(*(getattr(entity, name) for name in fields)).where(entity.user_id == user_id)
+        keys.update(tuple(row) for row in session.execute(query.execution_options(yield_per=DEFAULT_CHUNK_SIZE)))
+    return keys
+
+
+def import_records(session_factory, records, user_id, chunk_size=DEFAULT_CHUNK_SIZE,
+                   key=DEFAULT_NATURAL_KEY, progress=None, decode=None):
+    """Insert parsed records in chunks, one transaction per chunk, skipping duplicates.
+
+    ``key`` names the Transaction columns that identify a row; a record whose key
+    already exists for the user (or earlier in the same import) is skipped. ``decode``
+    turns each record into a mapping first; a record it or parse_row rejects is counted
+    in ``result.invalid``. Budget thresholds crossed by a chunk are collected in
+    ``result.alerts``. Every inserted row carries the run's ``result.batch_id``, so a bad
+    import can be deleted in one go; an error after the first committed chunk is raised
+    as ImportAborted, whose result holds that batch id.
+    """
+    for name in key:
+        if name not in KEY_FIELDS:
+            raise ValueError(f"Unknown natural key field {name!r}, choose from {', '.join(KEY_FIELDS)}.")
+
+    result = ImportResult(batch_id=secrets.token_hex(IMPORT_BATCH_ID_LENGTH // 2))
+    started = time.perf_counter()
+
+    session = session_factory()
+    try:
+        seen = existing_keys(session, user_id, key)
+    finally:
+        session.close()
+
+    try:
+        for chunk_index, chunk in enumerate(chunked(records, chunk_size)):
+            rows = []
+            for position, raw in enumerate(chunk, start=chunk_index * chunk_size + 1):
+                try:
+                    row = parse_row(decode(raw) if decode else raw, user_id)
+                except (ValueError, TypeError, AttributeError) as error:
+                    result.invalid += 1
+                    result.errors.append((position, str(error)))
+                    continue
+                row_key = natural_key(row, key)
+                if row_key in seen:
+                    result.duplicates += 1
+                    continue
+                seen.add(row_key)
+                row["import_batch_id"] = result.batch_id
+                rows.append(row)
+
+            if rows:
+                session = session_factory()
+                try:
+                    with session.begin():
+                        session.execute(insert(Transaction), rows)
+                        result.alerts.extend(check_alerts(session, user_id, expense_deltas(rows)))
+                finally:
+                    session.close()
+                result.inserted += len(rows)
+
+            result.elapsed = time.perf_counter() - started
+            if progress is not None:
+                progress(result)
+    except Exception as error:
+        if not result.inserted:
+            raise
+        result.elapsed = time.perf_counter() - started
+        raise ImportAborted(error, result) from error
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def import_file(session_factory, path, user_id, file_format=None, **options):
+    """Stream a CSV, JSONL or OFX file into the transactions table."""
+    file_format = file_format or detect_format(path)
+    if file_format not in READERS:
+        raise ValueError(f"Unsupported format {file_format!r}, choose from {', '.join(FORMATS)}.")
+    with open(path, newline="", encoding="utf-8") as handle:
+        records = READERS[file_format](handle)
+        return import_records(session_factory, records, user_id, decode=DECODERS.get(file_format), **options)
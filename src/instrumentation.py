@@ -0,0 +1,141 @@
+"""Per-command query counts, SQL time and profiles.
+
+``measure(command)`` wraps one CLI command or menu action. While it runs, SQLAlchemy
+engine events count every statement and time it, grouped by SQL text. At the end a
+one-line JSON record is written to the metrics log ($BUDGET_TRACKER_METRICS_LOG, a
+file path or ``-`` for stderr), and with ``--profile`` a readable summary goes to
+stderr and the cProfile stats of every command so far to the ``--profile-output``
+file (read it with ``python -m pstats``). When none of these is enabled nothing is
+hooked and ``measure`` costs nothing.
+"""
+import datetime
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from settings import METRICS_LOG_ENV, PROFILE_TOP_STATEMENTS
+
+SQL_PREVIEW = 200
+
+_profile = False
+_profile_output = None
+_profiler = None  # one cProfile.Profile for the whole process, so the menu's actions add up
+
+
+def preview(sql):
+    return " ".join(sql.split())[:SQL_PREVIEW]
+
+
+@dataclass
+class CommandStats:
+    """What one command did; ``statements`` maps SQL text to [count, seconds]."""
+    command: str
+    status: str = "ok"
+    queries: int = 0
+    sql_time: float = 0.0
+    elapsed: float = 0.0
+    user_id: int = None
+    statements: dict = field(default_factory=dict)
+
+    def slowest(self, count=PROFILE_TOP_STATEMENTS):
+        """The statements with the most total time, as (sql, executions, seconds)."""
+        ranked = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+        return [(sql, executions, seconds) for sql, (executions, seconds) in ranked[:count]]
+
+    def to_dict(self):
+        return {
+            "ts": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "command": self.command,
+            "status": self.status,
+            "user_id": self.user_id,
+            "elapsed_ms": round(self.elapsed * 1e3, 3),
+            "queries": self.queries,
+            "sql_ms": round(self.sql_time * 1e3, 3),
+            "slowest": [{"sql": preview(sql), "count": executions, "ms": round(seconds * 1e3, 3)}
+                        for sql, executions, seconds in self.slowest()],
+        }
+
+
+def configure(profile=False, profile_output=None):
+    """Set from the --profile and --profile-output flags."""
+    global _profile, _profile_output
+    _profile, _profile_output = profile or profile_output is not None, profile_output
+
+
+def enabled():
+    return _profile or bool(os.environ.get(METRICS_LOG_ENV))
+
+
+def write_log(stats):
+    target = os.environ.get(METRICS_LOG_ENV)
+    if not target:
+        return
+    line = json.dumps(stats.to_dict(), separators=(",", ":"))
+    if target == "-":
+        print(line, file=sys.stderr)
+        return
+    with open(target, "a", encoding="utf-8") as handle:
+        handle.write(line + "\n")
+
+
+def print_summary(stats):
+    print(f"{stats.command}: {stats.queries} queries, {stats.sql_time * 1e3:.1f} ms in SQL, "
+          f"{stats.elapsed * 1e3:.1f} ms total", file=sys.stderr)
+    for sql, executions, seconds in stats.slowest():
+        print(f"  {seconds * 1e3:8.2f} ms  {executions:5d}x  {preview(sql)}", file=sys.stderr)
+
+
+@contextmanager
+def measure(command):
+    """Record the statements and time of the enclosed block as one command."""
+    if not enabled():
+        yield None
+        return
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    stats = CommandStats(command)
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        stats.queries += 1
+        stats.sql_time += seconds
+        entry = stats.statements.setdefault(statement, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    global _profiler
+    profiler = None
+    if _profile_output is not None:
+        import cProfile
+
+        profiler = _profiler = _profiler or cProfile.Profile()
+    event.listen(Engine, "before_cursor_execute", before_execute)
+    event.listen(Engine, "after_cursor_execute", after_execute)
+    started = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield stats
+    except BaseException as error:
+        if getattr(error, "code", getattr(error, "exit_code", 1)):  # SystemExit(0) and click's Exit(0) succeed
+            stats.status = "error"
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        stats.elapsed = time.perf_counter() - started
+        event.remove(Engine, "before_cursor_execute", before_execute)
+        event.remove(Engine, "after_cursor_execute", after_execute)
+        write_log(stats)
+        if _profile:
+            print_summary(stats)
+        if profiler is not None:
+            profiler.dump_stats(_profile_output)
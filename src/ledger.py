@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sqlalchemy import case, delete, func, insert, select
+
+from archive import all_transactions
+from db import Session
+from models import Balance, MonthlySummary
+
+
+@dataclass
+class Drift:
+    """Difference between a stored ledger row of a user and their transactions.
+
+    ``key`` is None for the balances table and (month, category, type) for monthly summaries.
+    """
+    user_id: int
+    stored: tuple
+    actual: tuple
+    key: tuple = None
+
+
+def totals_query():
+    """Per-user (income, expense, count) computed from the transactions, archived ones included."""
+    transaction = all_transactions()
+    return select(
+        transaction.user_id,
+        func.coalesce(func.sum(case((transaction.transaction_type == 'income', transaction.amount), else_=0)), 0),
+        func.coalesce(func.sum(case((transaction.transaction_type == 'expense', transaction.amount), else_=0)), 0),
+        func.count(transaction.id),
+    ).where(transaction.user_id.isnot(None)).group_by(transaction.user_id)
+
+
+def find_drift(session):
+    """Compare every stored balance with a fresh aggregate over transactions."""
+    stored = {
+        row.user_id: (row.total_income, row.total_expense, row.transaction_count)
+        for row in session.execute(select(Balance)).scalars()
+    }
+    actual = {row[0]: tuple(row[1:]) for row in session.execute(totals_query())}
+
+    drift = []
+    for user_id in sorted(stored.keys() | actual.keys()):
+        stored_totals = stored.get(user_id, (Decimal(0), Decimal(0), 0))
+        actual_totals = actual.get(user_id, (Decimal(0), Decimal(0), 0))
+        if stored_totals != actual_totals:
+            drift.append(Drift(user_id, stored_totals, actual_totals))
+    return drift
+
+
+def summaries_query():
+    """Per (user, month, category, type) count and total computed from the transactions, archived ones included."""
+    transaction = all_transactions()
+    key = (
+        transaction.user_id,
+        func.strftime('%Y-%m', transaction.date),
+        func.coalesce(transaction.category, ''),
+        transaction.transaction_type,
+    )
+    return select(*key, func.count(transaction.id), func.sum(transaction.amount)).where(
+        transaction.user_id.isnot(None), transaction.date.isnot(None), transaction.transaction_type.isnot(None),
+    ).group_by(*key)
+
+
+def find_summary_drift(session):
+    """Compare every stored monthly summary with a fresh aggregate over transactions."""
+    stored = {
+        (row.user_id, row.year_month, row.category, row.transaction_type): (row.transaction_count, row.total)
+        for row in session.execute(select(MonthlySummary)).scalars()
+    }
+    actual = {tuple(row[:4]): tuple(row[4:]) for row in session.execute(summaries_query())}
+
+    drift = []
+    for key in sorted(stored.keys() | actual.keys()):
+        stored_totals = stored.get(key, (0, Decimal(0)))
+        actual_totals = actual.get(key, (0, Decimal(0)))
+        if stored_totals != actual_totals:
+            drift.append(Drift(key[0], stored_totals, actual_totals, key[1:]))
+    return drift
+
+
+def rebuild(session):
+    """Recompute the whole ledger and the monthly summaries from transactions, in the caller's transaction."""
+    session.execute(delete(Balance))
+    session.execute(insert(Balance).from_select(
+        ['user_id', 'total_income', 'total_expense', 'transaction_count'], totals_query()))
+    session.execute(delete(MonthlySummary))
+    session.execute(insert(MonthlySummary).from_select(
+        ['user_id', 'year_month', 'category', 'transaction_type', 'transaction_count', 'total'],
+        summaries_query()))
+
+
+def reconcile(session_factory=Session, repair=True):
+    """Check the ledger for drift and, unless ``repair`` is False, rebuild it."""
+    session = session_factory()
+    try:
+        with session.begin():
+            drift = find_drift(session) + find_summary_drift(session)
+            if repair:
+                rebuild(session)
+    finally:
+        session.close()
+    return drift
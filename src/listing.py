@@ -0,0 +1,98 @@
+import datetime
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sqlalchemy import select, tuple_
+
+from archive import archived_before, sources
+from models import Transaction
+from render import Column, table
+from settings import DEFAULT_PAGE_SIZE
+
+STREAM_BATCH_SIZE = 1000
+
+
+@dataclass
+class TransactionFilter:
+    """Optional restrictions on the transactions of one user."""
+    date_from: datetime.date = None
+    date_to: datetime.date = None
+    transaction_type: str = None
+    category: str = None
+    min_amount: Decimal = None
+    max_amount: Decimal = None
+    import_batch: str = None
+    ids: tuple = None
+
+    def clauses(self, entity=Transaction):
+        """Filter clauses on ``entity``, the Transaction class or an alias of it (see archive.py)."""
+        clauses = []
+        if self.date_from is not None:
+            clauses.append(entity.date >= self.date_from)
+        if self.date_to is not None:
+            clauses.append(entity.date <= self.date_to)
+        if self.transaction_type:
+            clauses.append(entity.transaction_type == self.transaction_type)
+        if self.category:
+            clauses.append(entity.category == self.category)
+        if self.min_amount is not None:
+            clauses.append(entity.amount >= self.min_amount)
+        if self.max_amount is not None:
+            clauses.append(entity.amount <= self.max_amount)
+        if self.import_batch:
+            clauses.append(entity.import_batch_id == self.import_batch)
+        if self.ids:
+            clauses.append(entity.id.in_(self.ids))
+        return clauses
+
+
+def transactions_query(user_id, filters=None, after=None, entity=Transaction, clauses=()):
+    """Newest-first transactions of a user, resuming after a (date, id) keyset cursor."""
+    query = select(entity).where(entity.user_id == user_id, *(filters or TransactionFilter()).clauses(entity), *clauses)
+    if after is not None:
+        query = query.where(tuple_(entity.date, entity.id) < tuple_(*after))
+    return query.order_by(entity.date.desc(), entity.id.desc())
+
+
+def page_queries(session, user_id, filters=None, after=None):
+    """transactions_query split at the user's archive cutoff, to be read in order.
+
+    The archive is only read once the hot table's rows on or after the cutoff are exhausted.
+    """
+    date_from = filters.date_from if filters is not None else None
+    return [transactions_query(user_id, filters, after, entity, clauses)
+            for entity, clauses in sources(archived_before(session, user_id), date_from)]
+
+
+def fetch_page(session, user_id, filters=None, after=None, page_size=DEFAULT_PAGE_SIZE):
+    """Return one page of transactions and the cursor of the next page (None on the last page)."""
+    rows = []
+    for query in page_queries(session, user_id, filters, after):
+        rows += session.execute(query.limit(page_size + 1 - len(rows))).scalars().all()
+        if len(rows) > page_size:
+            last = rows[page_size - 1]
+            return rows[:page_size], (last.date, last.id)
+    return rows, None
+
+
+def iter_transactions(session, user_id, filters=None, after=None, batch_size=STREAM_BATCH_SIZE):
+    """Stream every matching transaction without materializing the result set."""
+    for query in page_queries(session, user_id, filters, after):
+        yield from session.execute(query.execution_options(yield_per=batch_size)).scalars()
+
+
+TRANSACTION_COLUMNS = (Column("ID", ">"), Column("Date"), Column("Type"), Column("Category"), Column("Amount", ">"),
+                       Column("Notes"))
+
+
+def transaction_table(transactions, color=False):
+    """render.table lines for transactions, e.g. a page from fetch_page."""
+    return table(TRANSACTION_COLUMNS, [
+        (transaction.id, transaction.date, transaction.transaction_type, transaction.category, transaction.amount,
+         transaction.notes) for transaction in transactions], color)
+
+
+def format_transaction(transaction):
+    return "\t".join(str(value) for value in (
+        transaction.id, transaction.date, transaction.transaction_type, transaction.category, transaction.amount,
+        transaction.notes or ""))
@@ -1,21 +1,31 @@
+# Only click and the standard library load at startup; SQLAlchemy, the models and
+# bcrypt are imported inside the functions that need them.
 import click
+from contextlib import contextmanager
 from getpass import getpass
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine,func
-from models import User, Transaction, Budget
 import datetime
-import bcrypt
+import instrumentation
+import render
+from money import parse_amount
+from options import filter_options, parse_amount_option, parse_cursor_option, parse_date, parse_period
+from settings import (DATABASE_URL_ENV, DEFAULT_API_HOST, DEFAULT_API_POOL_SIZE, DEFAULT_API_PORT,
+                      DEFAULT_BATCH_SHARD_SIZE, DEFAULT_CHUNK_SIZE, DEFAULT_EXPORT_BATCH_SIZE, DEFAULT_NATURAL_KEY,
+                      DEFAULT_PAGE_SIZE, DEFAULT_ROW_GROUP_SIZE, DEFAULT_SEARCH_LIMIT, DEFAULT_SNAPSHOT_TRANSACTIONS,
+                      DEFAULT_TOKEN_TTL, DEFAULT_TOP_CATEGORIES, DEFAULT_WRITER_MAX_BATCH,
+                      DEFAULT_WRITER_MAX_LATENCY_MS, EXPORT_FORMATS, EXPORT_TABLES, IMPORT_FORMATS, TOKEN_ENV,
+                      WRITER_SOCKET_ENV, database_url)
 
 # Global variable to track the authenticated user
 authenticated_user = None
 
-Session = sessionmaker(bind=create_engine("sqlite:///budget_tracker.db"))
-
   
 
-@click.command()
 def register_user():
     """User registration functionality."""
+    from db import Session
+    from models import User
+    from auth import hash_password
+
     username = click.prompt(click.style("Enter your username", fg="cyan"))
     password = getpass(click.style("Enter your password:", fg="cyan"))
     email = click.prompt(click.style("Enter your email", fg="cyan"))
@@ -28,19 +38,21 @@ def register_user():
         session.close()
         return
 
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    hashed_password = hash_password(password)
     new_user = User(username=username, password_hash=hashed_password, email=email)
     session.add(new_user)
     session.commit()
     session.close()
 
     click.echo(click.style("Registration successful.", fg="green"))
-    main()  # Redirect to the login functionality after successful registration
 
 
-@click.command()
 def login():
     """Login functionality."""
+    from db import Session
+    from models import User
+    from auth import rehash_if_needed, verify_password
+
     username = click.prompt(click.style("Enter your username", fg="cyan"))
     password = getpass(click.style("Enter your password:", fg="cyan"))
 
@@ -50,22 +62,21 @@ def login():
     if user is None:
         click.echo(click.style("User not found. Please register first.", fg="red"))
         session.close()
-        main()
         return
 
-    if not bcrypt.checkpw(password.encode('utf-8'), user.password_hash.encode('utf-8')):
-        
+    if not verify_password(password, user.password_hash):
         click.echo(click.style("Incorrect password. Please try again.", fg="red"))
         session.close()
-        main()
         return
 
+    rehash_if_needed(session, user, password)
+
     # Store the authenticated user's information in the session or as a global variable
     global authenticated_user
     authenticated_user = user
 
+    session.close()
     click.echo(click.style("Login successful.", fg="green"))
-    show_user_menu()  # Show the user menu directly after successful login
 
 
 #user and login interface
@@ -76,13 +87,16 @@ def print_menu():
     click.echo(click.style("-------------------", fg="yellow", bold=True))
     click.echo(click.style("1. Register", fg="cyan"))
     click.echo(click.style("2. Login", fg="cyan"))
+    click.echo(click.style("3. Exit", fg="cyan"))
 
 def print_user_menu():
+    from db import Session
+    from models import Balance
+
     click.echo(click.style(f"Welcome, {authenticated_user.username}! 😄", fg="cyan", bold=True))
     session = Session()
-    total_income = session.query(func.sum(Transaction.amount)).filter_by(user_id=authenticated_user.id, transaction_type='income').scalar() or 0
-    total_expenses = session.query(func.sum(Transaction.amount)).filter_by(user_id=authenticated_user.id, transaction_type='expense').scalar() or 0
-    balance = total_income - total_expenses
+    ledger = session.get(Balance, authenticated_user.id)
+    balance = ledger.balance if ledger is not None else 0
     session.close()
     click.echo(click.style("-----------------------------", fg="yellow", bold=True))
     click.echo(click.style(f"Available Balance: {balance}", fg="green", bold=True))
@@ -94,42 +108,46 @@ def print_user_menu():
     click.echo(click.style("5. View all budgets", fg="bright_magenta"))
     click.echo(click.style("6. Delete budget", fg="bright_magenta"))
     click.echo(click.style("7. Generate report", fg="bright_magenta"))
-    click.echo(click.style("8. Logout", fg="bright_magenta"))
-    click.echo(click.style("9. Exit", fg="bright_magenta"))
+    click.echo(click.style("8. Import transactions", fg="bright_magenta"))
+    click.echo(click.style("9. Logout", fg="bright_magenta"))
+    click.echo(click.style("10. Exit", fg="bright_magenta"))
+
+@contextmanager
+def measure_menu(name):
+    """instrumentation.measure for a menu action, attributed to the user logged in before or after it."""
+    user = authenticated_user
+    with instrumentation.measure(f"menu {name}") as stats:
+        try:
+            yield
+        finally:
+            user = authenticated_user or user
+            if stats is not None and user is not None:
+                stats.user_id = user.id
 
 def show_user_menu():
-    
-    while True:
-        print_user_menu()
-        choice = click.prompt(click.style("Enter your choice (1-8): ", fg="yellow"))
-
-        if choice == "1":
-            add_transaction()
-        elif choice == "2":
-            view_transactions()
-        elif choice == "3":
-            delete_transaction()
-        elif choice == "4":
-            set_budget()
-        elif choice == "5":
-            view_budget()
-        elif choice == "6":
-             delete_budget()
-        elif choice == "7":
-            generate_report()
-        
-        elif choice == "8":
-            logout()
-            break  # Exit the user menu and return to the main menu
-        elif choice == "9":
-            exit_program()
-        else:
-            
+    """Run the logged-in menu until the user logs out; actions return here instead of recursing."""
+    while authenticated_user is not None:
+        with measure_menu("redraw"):
+            print_user_menu()
+        choice = click.prompt(click.style("Enter your choice (1-10): ", fg="yellow"))
+
+        action = USER_MENU_ACTIONS.get(choice)
+        if action is None:
             click.echo(click.style("Invalid choice. Please try again.", fg="red"))
+            continue
+        with measure_menu(action.__name__):
+            action()
+
 
+def echo_alerts(alerts, err=False):
+    """Print budget alerts, overruns in red and warnings in yellow."""
+    for alert in alerts:
+        click.echo(click.style(alert.message(), fg="red" if alert.is_overrun else "yellow"), err=err)
 
 
 def add_transaction():
+    from writer import WriterError, submit
+
     if authenticated_user is None:
         click.echo(click.style("Please login first.", fg="red"))
         return
@@ -139,84 +157,211 @@ def add_transaction():
         transaction_type = click.prompt(click.style("Type (income/expense): ", fg="cyan"))
         category = click.prompt(click.style("Category: ", fg="cyan"))
         amount_str = click.prompt(click.style("Amount: ", fg="cyan"))
-        amount = float(amount_str.replace(",", ""))
+        amount = parse_amount(amount_str)
         date_str = click.prompt(click.style("Date (YYYY-MM-DD): ", fg="cyan"))
         date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+        notes = click.prompt(click.style("Notes (optional): ", fg="cyan"), default="", show_default=False).strip()
 
-        transaction = Transaction(transaction_type=transaction_type, category=category, amount=amount, date=date, user_id=authenticated_user.id)
-        session = Session()
-        session.add(transaction)
-        session.commit()
-        session.close()
+        result = submit("add_transaction", authenticated_user.id, transaction=dict(
+            transaction_type=transaction_type, category=category, amount=amount, date=date, notes=notes))
 
         click.echo("Transaction added successfully!")
+        echo_alerts(result.alerts)
     except ValueError:
         click.echo(click.style("Invalid input format. Please try again.", fg="red"))
+    except WriterError as error:
+        click.echo(click.style(str(error), fg="red"))
+
+def import_transactions():
+    """Bulk import transactions from a CSV, JSONL or OFX file."""
+    from db import Session
+    from importer import ImportAborted, import_file
+
+    if authenticated_user is None:
+        click.echo(click.style("Please login first.", fg="red"))
+        return
+
+    path = click.prompt(click.style("Path to the file: ", fg="cyan"))
+    file_format = click.prompt(click.style("Format (csv/jsonl/ofx, blank to detect): ", fg="cyan"), default="", show_default=False)
+    key = click.prompt(click.style("Duplicate key fields: ", fg="cyan"), default=",".join(DEFAULT_NATURAL_KEY))
+
+    def report_progress(result):
+        click.echo(f"{result.processed} rows processed ({result.rows_per_second:,.0f} rows/s)")
+
+    try:
+        result = import_file(Session, path, authenticated_user.id, file_format=file_format or None,
+                             key=tuple(name.strip() for name in key.split(",") if name.strip()),
+                             progress=report_progress)
+    except ImportAborted as error:
+        click.echo(click.style(f"Import failed after {error.result.inserted} transactions: {error}", fg="red"))
+        click.echo(click.style(f"Import batch ID: {error.result.batch_id} (delete the whole import with it)", fg="cyan"))
+        return
+    except (OSError, ValueError) as error:
+        click.echo(click.style(f"Import failed: {error}", fg="red"))
+        return
+
+    for position, error in result.errors[:10]:
+        click.echo(click.style(f"Row {position} skipped: {error}", fg="red"))
+    click.echo(click.style(
+        f"Imported {result.inserted} transactions, skipped {result.duplicates} duplicates and "
+        f"{result.invalid} invalid rows in {result.elapsed:.2f}s ({result.rows_per_second:,.0f} rows/s).",
+        fg="green"))
+    if result.inserted:
+        click.echo(click.style(f"Import batch ID: {result.batch_id} (delete the whole import with it)", fg="cyan"))
+    echo_alerts(result.alerts)
+
+def prompt_date(label):
+    value = click.prompt(click.style(f"{label} (YYYY-MM-DD, blank for none): ", fg="cyan"), default="", show_default=False)
+    return datetime.datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+
+def prompt_amount(label):
+    value = click.prompt(click.style(f"{label} (blank for none): ", fg="cyan"), default="", show_default=False)
+    return parse_amount(value) if value else None
+
+
+def read_transaction_filter():
+    """Ask for every filter, each prompt can be left blank; raises ValueError on invalid input."""
+    from listing import TransactionFilter
+
+    return TransactionFilter(
+        date_from=prompt_date("From date"),
+        date_to=prompt_date("To date"),
+        transaction_type=click.prompt(click.style("Type (income/expense, blank for any): ", fg="cyan"), default="", show_default=False) or None,
+        category=click.prompt(click.style("Category (blank for any): ", fg="cyan"), default="", show_default=False) or None,
+        min_amount=prompt_amount("Minimum amount"),
+        max_amount=prompt_amount("Maximum amount"),
+        import_batch=click.prompt(click.style("Import batch ID (blank for any): ", fg="cyan"), default="", show_default=False).strip() or None,
+    )
+
+
+def prompt_transaction_filter():
+    """Ask whether to filter and for optional filters; invalid input shows everything."""
+    from listing import TransactionFilter
+
+    if not click.confirm(click.style("Filter the transactions?", fg="cyan"), default=False):
+        return TransactionFilter()
+    try:
+        return read_transaction_filter()
+    except ValueError:
+        click.echo(click.style("Invalid filter, showing all transactions.", fg="red"))
+        return TransactionFilter()
+
+
+def browse_transactions(filters, prompt_for_id=False):
+    """Show transactions one page at a time; optionally let the user pick one by ID."""
+    from db import Session
+    from listing import fetch_page, transaction_table
+
+    color = render.is_terminal()
+    session = Session()
+    cursor = None
+    try:
+        while True:
+            transactions, cursor = fetch_page(session, authenticated_user.id, filters, cursor)
+            lines = transaction_table(transactions, color)
+            if cursor is None:
+                lines.append(render.style("------------------------", color, fg="yellow"))
+            # The menu pages by itself, one page per prompt
+            render.show(lines, pager=False)
+            if cursor is None:
+                break
+            label = "Enter for the next page, an ID to select it, or q to stop" if prompt_for_id else "Enter for the next page or q to stop"
+            answer = click.prompt(click.style(label, fg="yellow"), default="", show_default=False).strip()
+            if answer.lower() == "q":
+                return None
+            if answer and prompt_for_id:
+                return answer
+    finally:
+        session.close()
+    return None
 
-    show_user_menu()
 
 def view_transactions():
+    from db import Session
+    from models import Transaction
+
     if authenticated_user is None:
         click.echo(click.style("Please login first.", fg="red"))
         return
     
     
     click.echo(click.style("*********************", fg="yellow"))
-    click.echo(click.style("Viewing all transactions:", fg="cyan"))
+    click.echo(click.style("Viewing transactions:", fg="cyan"))
     click.echo(click.style("*********************", fg="yellow"))
-    
+
     session = Session()
-    transactions = session.query(Transaction).filter_by(user_id=authenticated_user.id).all()
+    has_transactions = session.query(Transaction.id).filter_by(user_id=authenticated_user.id).first() is not None
     session.close()
-
-    if not transactions:
+    if not has_transactions:
         click.echo(click.style("No transactions found ,please add one.", fg="red"))
         return
 
-    for transaction in transactions:
-        click.echo(click.style(f"ID: {transaction.id}", fg="cyan"))
-        click.echo(click.style(f"Type: {transaction.transaction_type}", fg="cyan"))
-        click.echo(click.style(f"Category: {transaction.category}", fg="cyan"))
-        click.echo(click.style(f"Amount: {transaction.amount}", fg="cyan"))
-        click.echo(click.style(f"Date: {transaction.date}", fg="cyan"))
-        click.echo(click.style("------------------------", fg="yellow"))
-        
+    browse_transactions(prompt_transaction_filter())
         
 
 def delete_transaction():
-    """Delete a transaction from the database."""
+    """Delete a transaction picked from the list, or every transaction matching a filter."""
+    from db import Session
+    from deletion import delete_transactions
+    from models import Transaction
+    from listing import TransactionFilter
+
     session = Session()
-    transactions = session.query(Transaction).filter_by(user_id=authenticated_user.id).all()
+    has_transactions = session.query(Transaction.id).filter_by(user_id=authenticated_user.id).first() is not None
+    session.close()
 
-    if not transactions:
+    if not has_transactions:
         click.echo(click.style("No transactions found.", fg="yellow"))
-        session.close()
-        show_user_menu()
         return
 
-    click.echo("Available transactions:")
-    for transaction in transactions:
-        click.echo(f"Transaction ID: {transaction.id} | Amount: {transaction.amount} | Category: {transaction.category}")
+    mode = click.prompt(click.style("Delete (1) one transaction or (2) every transaction matching a filter", fg="cyan"),
+                        type=click.Choice(["1", "2"]), default="1")
+    if mode == "2":
+        while True:
+            try:
+                filters = read_transaction_filter()
+                break
+            except ValueError:
+                click.echo(click.style("Invalid filter, nothing will be deleted. Enter the filter again.", fg="red"))
+        if not filters.clauses():
+            click.echo(click.style("No filter given, nothing was deleted.", fg="yellow"))
+            return
+        session = Session()
+        with session.begin():
+            matched = delete_transactions(session, authenticated_user.id, filters, dry_run=True)
+        session.close()
+        if not matched or not click.confirm(click.style(f"Delete {matched} transactions?", fg="yellow")):
+            click.echo(click.style("Nothing was deleted.", fg="yellow"))
+            return
+    else:
+        click.echo("Available transactions:")
+        transaction_id = browse_transactions(TransactionFilter(), prompt_for_id=True)
+        if transaction_id is None:
+            transaction_id = click.prompt(click.style("Enter the ID of the transaction you want to delete", fg="cyan"))
+        try:
+            filters = TransactionFilter(ids=(int(transaction_id),))
+        except ValueError:
+            click.echo(click.style("Transaction not found.", fg="red"))
+            return
 
-    transaction_id = click.prompt(click.style("Enter the ID of the transaction you want to delete", fg="cyan"))
+    session = Session()
+    with session.begin():
+        deleted = delete_transactions(session, authenticated_user.id, filters)
+    session.close()
 
-    transaction = session.query(Transaction).filter_by(user_id=authenticated_user.id, id=transaction_id).first()
-    if transaction is None:
+    if not deleted:
         click.echo(click.style("Transaction not found.", fg="red"))
-        session.close()
-        show_user_menu()
         return
 
-    session.delete(transaction)
-    session.commit()
-    session.close()
-
-    click.echo(click.style("Transaction deleted successfully.", fg="green"))
-    show_user_menu()
+    click.echo(click.style(f"Deleted {deleted} transactions." if mode == "2" else "Transaction deleted successfully.",
+                           fg="green"))
 
 
 def set_budget():
     """Set the budget for the authenticated user."""
+    from writer import WriterError, submit
+
     if authenticated_user is None:
         click.echo(click.style("Please login first.", fg="red"))
         return
@@ -224,74 +369,99 @@ def set_budget():
     click.echo(click.style("Set Budget:", fg="cyan"))
     category = click.prompt(click.style("Enter the budget category: ", fg="cyan"))
     amount_str = click.prompt(click.style("Enter the budget amount: ", fg="cyan"))
-    amount = float(amount_str.replace(",", ""))
+    try:
+        amount = parse_amount(amount_str)
+    except ValueError:
+        click.echo(click.style("Invalid input format. Please try again.", fg="red"))
+        return
 
-    session = Session()
-    existing_budget = session.query(Budget).filter_by(user_id=authenticated_user.id, category=category).first()
+    try:
+        result = submit("set_budget", authenticated_user.id, category=category, amount=amount)
+    except WriterError as error:
+        click.echo(click.style(str(error), fg="red"))
+        return
 
-    if existing_budget:
-        existing_budget.amount = amount
-        click.echo(click.style("Budget updated successfully.", fg="green"))
-    else:
-        new_budget = Budget(user_id=authenticated_user.id, category=category, amount=amount)
-        session.add(new_budget)
+    if result.created:
         click.echo(click.style("Budget set successfully.", fg="green"))
-
-    session.commit()
-    session.close()
+    else:
+        click.echo(click.style("Budget updated successfully.", fg="green"))
     
 def view_budget():
     """View the budget for the authenticated user."""
+    from budgets import budget_status
+    from db import Session
+
     if authenticated_user is None:
         click.echo(click.style("Please login first.", fg="red"))
         return
 
     session = Session()
-    budgets = session.query(Budget).filter_by(user_id=authenticated_user.id).all()
+    budgets = budget_status(session, authenticated_user.id)
+    session.close()
 
-    if budgets:
-        click.echo(click.style("viewing all Budgets:", fg="cyan"))
-        for budget in budgets:
-            click.echo(click.style(f"ID: {budget.id}, Category: {budget.category}, Amount: {budget.amount}", fg="cyan"))
-    else:
+    if not budgets:
         click.echo(click.style("No budgets found. Please add one", fg="cyan"))
+        return
+    color = render.is_terminal()
+    render.show([
+        render.style(f"viewing all Budgets ({budgets[0].period}):", color, fg="cyan"),
+        *budget_status_table(budgets, color),
+    ])
+
+def budget_status_table(budgets, color=False):
+    """render.table lines for BudgetStatus rows, overrun budgets in red."""
+    columns = (render.Column("ID", ">"), render.Column("Category"), render.Column("Amount", ">"),
+               render.Column("Spent", ">"), render.Column("Remaining", ">"), render.Column("Used", ">"))
+    return render.table(columns, [
+        (budget.budget_id, budget.category, budget.budget, budget.spent, budget.remaining,
+         "-" if budget.utilization is None else f"{budget.utilization:.0%}") for budget in budgets
+    ], color, row_styles=[{"fg": "red"} if budget.remaining < 0 else None for budget in budgets])
 
-    session.close()
 
 def delete_budget():
-    """Delete a budget."""
+    """Delete one or more budgets picked by ID."""
+    from db import Session
+    from deletion import delete_budgets
+    from models import Budget
+
     session = Session()
     budgets = session.query(Budget).filter_by(user_id=authenticated_user.id).all()
 
     if not budgets:
         click.echo(click.style("No budgets found.", fg="yellow"))
         session.close()
-        show_user_menu()
         return
-    click.echo("Available budgets:")
-    for budget in budgets:
-        click.echo(f"Budget ID: {budget.id} | Category: {budget.category} | Amount: {budget.amount}")
+    render.show(["Available budgets:", *render.table(
+        (render.Column("ID", ">"), render.Column("Category"), render.Column("Amount", ">")),
+        [(budget.id, budget.category, budget.amount) for budget in budgets], render.is_terminal())])
 
-    budget_id = click.prompt(click.style("Enter the ID of the budget you want to delete", fg="cyan"))
+    session.close()
 
-    budget = session.query(Budget).filter_by(id=budget_id).first()
-    if budget is None:
-        click.echo(click.style("Budget not found.", fg="red"))
-        session.close()
-        show_user_menu()
-        return
+    answer = click.prompt(click.style("Enter the IDs of the budgets you want to delete (comma-separated)", fg="cyan"))
+    try:
+        budget_ids = {int(part) for part in answer.replace(",", " ").split()}
+    except ValueError:
+        budget_ids = set()
 
-    session.delete(budget)
-    session.commit()
+    session = Session()
+    with session.begin():
+        deleted = delete_budgets(session, authenticated_user.id, ids=budget_ids) if budget_ids else 0
     session.close()
 
-    click.echo(click.style("Budget deleted successfully.", fg="green"))
-    show_user_menu()
+    if not deleted:
+        click.echo(click.style("Budget not found.", fg="red"))
+        return
+
+    click.echo(click.style("Budget deleted successfully." if deleted == 1 else f"Deleted {deleted} budgets.", fg="green"))
 
     
 @click.option("--user-id", type=int, help="User ID for generating the report")
 def generate_report(user_id=None):
     """Generate a report of transactions and budgets for a specific user."""
+    from db import Session
+    from reports import cached_report
+    from snapshot import load_snapshot
+
     if authenticated_user is None:
         click.echo(click.style("Please login first.", fg="red"))
         return
@@ -300,42 +470,68 @@ def generate_report(user_id=None):
         click.echo(click.style("You are not authorized to access this report.", fg="red"))
         return
 
+    user_id = authenticated_user.id if user_id is None else user_id
+    try:
+        date_from = prompt_date("From date")
+        date_to = prompt_date("To date")
+    except ValueError:
+        click.echo(click.style("Invalid input format. Please try again.", fg="red"))
+        return
+
     session = Session()
-    if user_id is None:
-        transactions = session.query(Transaction).filter_by(user_id=authenticated_user.id).all()
-        budgets = session.query(Budget).filter_by(user_id=authenticated_user.id).all()
-        click.echo(click.style(f"Report for User ID: {authenticated_user.id}", fg="cyan"))
-    else:
-        transactions = session.query(Transaction).filter_by(user_id=user_id).all()
-        budgets = session.query(Budget).filter_by(user_id=user_id).all()
-        click.echo(click.style(f"Report for User ID: {user_id}", fg="cyan"))
+    snapshot = load_snapshot(session, user_id, date_from, date_to)
+    report = cached_report(session, user_id, date_from, date_to, budgets=snapshot.budget_amounts)
     session.close()
+    print_report(report, snapshot)
+
 
-    if not transactions and not budgets:
-        click.echo(click.style("No transactions or budgets made.", fg="red"))
+def print_report(report, snapshot=None):
+    """Print a Report; with a UserSnapshot also the balance and the most recent transactions."""
+    from listing import transaction_table
+
+    color = render.is_terminal()
+    lines = [render.style(f"Report for User ID: {report.user_id}", color, fg="cyan")]
+    if snapshot is not None:
+        lines.append(render.style(f"{snapshot.user.username}, balance: {snapshot.total_balance:.2f}", color, fg="cyan"))
+    if report.is_empty:
+        lines.append(render.style("No transactions or budgets made.", color, fg="red"))
+        render.show(lines)
         return
 
-    if transactions:
-        click.echo(click.style("Transactions:", fg="cyan"))
-        for transaction in transactions:
-            click.echo(f"ID: {transaction.id}")
-            click.echo(f"Type: {transaction.transaction_type}")
-            click.echo(f"Category: {transaction.category}")
-            click.echo(f"Amount: {transaction.amount}")
-            click.echo(f"Date: {transaction.date}")
-            click.echo("------------------------")
-    else:
-        click.echo("No transactions found.")
-
-    if budgets:
-        click.echo(click.style("Budgets:", fg="cyan"))
-        for budget in budgets:
-            click.echo(f"ID: {budget.id}")
-            click.echo(f"Category: {budget.category}")
-            click.echo(f"Amount: {budget.amount}")
-            click.echo("------------------------")
+    lines += [
+        render.style(f"Total income: {report.total_income:.2f}", color, fg="green"),
+        render.style(f"Total expenses: {report.total_expense:.2f}", color, fg="red"),
+        render.style(f"Net: {report.total_income - report.total_expense:.2f}", color, fg="cyan", bold=True),
+    ]
+
+    if report.months:
+        lines.append(render.style("Monthly summary:", color, fg="cyan"))
+        lines += render.table(
+            (render.Column("Month"), render.Column("Income", ">"), render.Column("Expenses", ">"),
+             render.Column("Net", ">")),
+            [(month.month, f"{month.income:.2f}", f"{month.expense:.2f}", f"{month.net:.2f}") for month in report.months],
+            color)
     else:
-        click.echo("No budgets found.")
+        lines.append("No transactions found.")
+
+    if report.categories:
+        lines.append(render.style("Spending by category:", color, fg="cyan"))
+        lines += render.table(
+            (render.Column("Category"), render.Column("Spent", ">"), render.Column("Budget", ">"),
+             render.Column("Used", ">")),
+            [(item.category, f"{item.spent:.2f}", "-" if item.budget is None else f"{item.budget:.2f}",
+              "-" if item.budget is None else f"{item.utilization or 0:.0%}") for item in report.categories],
+            color, row_styles=[None if item.budget is None else {"fg": "red" if item.spent > item.budget else "green"}
+                               for item in report.categories])
+
+    if report.top_categories:
+        lines.append(render.style("Top categories: " + ", ".join(item.category for item in report.top_categories),
+                                  color, fg="cyan"))
+
+    if snapshot is not None and snapshot.transactions:
+        lines.append(render.style("Recent transactions:", color, fg="cyan"))
+        lines += transaction_table(snapshot.transactions, color)
+    render.show(lines)
 
 
 def logout():
@@ -343,7 +539,6 @@ def logout():
     global authenticated_user
     authenticated_user = None
     click.echo(click.style("Logged out successfully.", fg="green"))
-    main() # returns to the menu
 
 def exit_program():
     """Exit the program."""
@@ -352,22 +547,540 @@ def exit_program():
 
 
 
-def main():
-   
+USER_MENU_ACTIONS = {
+    "1": add_transaction,
+    "2": view_transactions,
+    "3": delete_transaction,
+    "4": set_budget,
+    "5": view_budget,
+    "6": delete_budget,
+    "7": generate_report,
+    "8": import_transactions,
+    "9": logout,  # Exits the loop and returns to the main menu
+    "10": exit_program,
+}
 
+
+def main():
+    """Interactive menu: a single flat loop that switches between the login and user menus."""
     while True:
-       
+        if authenticated_user is not None:
+            show_user_menu()
+            continue
+
         print_menu()
-        choice = click.prompt(click.style("Enter your choice (1-2): ", fg="yellow"))
+        choice = click.prompt(click.style("Enter your choice (1-3): ", fg="yellow"))
 
         if choice == "1":
-            register_user()
+            with measure_menu("register_user"):
+                register_user()
         elif choice == "2":
-            login()
-            if authenticated_user is not None:
-                show_user_menu()  # Show the user menu if login is successful
-            break  # Exit the main loop after successful login
+            with measure_menu("login"):
+                login()
+        elif choice == "3":
+            exit_program()
         else:
             click.echo(click.style("Invalid choice. Please try again.", fg="red"))
+
+
+# Non-interactive commands: each one runs once and exits, for cron jobs and shell pipelines
+
+def current_user(ctx, cached=True):
+    """Authenticate once per invocation.
+
+    A token ($BUDGET_TRACKER_TOKEN or, unless ``cached`` is False, the one cached by
+    ``login``) is a single indexed lookup. The cached token is used when no --username
+    is given or it names the same user; otherwise, or once it has expired,
+    --username/--password fall back to a full bcrypt check.
+    """
+    from db import Session
+    from auth import authenticate, load_token, user_for_token
+
+    options = ctx.find_root().obj
+    if options.get("user") is not None:
+        return options["user"]
+
+    session = Session()
+    try:
+        token = options["token"]
+        if not token and cached:
+            cached, cached_username = load_token(database_url(options["db_url"]))
+            if cached and (not options["username"] or options["username"] == cached_username):
+                token = cached
+        if token:
+            options["user"] = user_for_token(session, token)
+            if options["user"] is not None:
+                return options["user"]
+            if options["token"] or not options["username"]:
+                raise click.ClickException("The session token has expired or was revoked, please log in again.")
+
+        if not options["username"]:
+            raise click.UsageError("Run the login command or pass --username (or set BUDGET_TRACKER_USERNAME).")
+        password = options["password"]
+        if password is None:
+            password = click.prompt("Password", hide_input=True, err=True)
+        options["user"] = authenticate(session, options["username"], password)
+        if options["user"] is None:
+            raise click.ClickException("Invalid username or password.")
+        return options["user"]
+    finally:
+        session.close()
+
+
+class InstrumentedCommand(click.Command):
+    """Runs the command under instrumentation.measure, named by its path, e.g. ``tx list``."""
+
+    def invoke(self, ctx):
+        with instrumentation.measure(ctx.command_path.partition(" ")[2]) as stats:
+            try:
+                return super().invoke(ctx)
+            finally:
+                user = (ctx.find_root().obj or {}).get("user")
+                if stats is not None and user is not None:
+                    stats.user_id = user.id
+
+
+class InstrumentedGroup(click.Group):
+    command_class = InstrumentedCommand
+    group_class = type  # subgroups are InstrumentedGroups too
+
+
+@click.group(cls=InstrumentedGroup, invoke_without_command=True)
+@click.option("--username", envvar="BUDGET_TRACKER_USERNAME", help="Account used by the non-interactive commands.")
+@click.option("--password", envvar="BUDGET_TRACKER_PASSWORD", help="Password of that account (prompted when omitted).")
+@click.option("--token", envvar=TOKEN_ENV, help="Session token printed by the login command.")
+@click.option("--db-url", envvar=DATABASE_URL_ENV, help="SQLAlchemy URL of the database, e.g. sqlite:///other.db.")
+@click.option("--profile", is_flag=True, help="Print the query count, SQL time and slowest statements of each command.")
+@click.option("--profile-output", type=click.Path(dir_okay=False),
+              help="Also write cProfile stats to this file (read it with python -m pstats).")
+@click.pass_context
+def cli(ctx, username, password, token, db_url, profile, profile_output):
+    """Budget Tracker CLI. Without a command it starts the interactive menu.
+
+    Set BUDGET_TRACKER_METRICS_LOG to a file (or - for stderr) to append one JSON line per command.
+    """
+    instrumentation.configure(profile, profile_output)
+    if db_url:
+        import db
+
+        db.configure(db_url)
+    ctx.obj = {"username": username, "password": password, "token": token, "user": None, "db_url": db_url}
+    if ctx.invoked_subcommand is None:
+        main()
+
+
+@cli.command("login")
+@click.option("--days", default=DEFAULT_TOKEN_TTL.days, show_default=True, help="Days until the token expires.")
+@click.option("--print-token", is_flag=True, help="Print the token instead of caching it in the session file.")
+@click.pass_context
+def login_command(ctx, days, print_token):
+    """Check the password once and cache a session token for the following commands."""
+    from db import Session
+    from auth import issue_token, save_token
+
+    options = ctx.find_root().obj
+    if not options["username"]:
+        options["username"] = click.prompt("Username", err=True)
+    options["token"] = None
+    user = current_user(ctx, cached=False)
+    session = Session()
+    token = issue_token(session, user.id, datetime.timedelta(days=days))
+    session.close()
+    if print_token:
+        click.echo(token)
+        return
+    save_token(token, user.username, database_url(options["db_url"]))
+    click.echo(f"Logged in as {user.username} for {days} days.", err=True)
+
+
+@cli.command("logout")
+@click.pass_context
+def logout_command(ctx):
+    """Revoke the cached (or given) session token."""
+    from db import Session
+    from auth import forget_token, load_token, revoke_token
+
+    token = ctx.find_root().obj["token"] or load_token(database_url(ctx.find_root().obj["db_url"]))[0]
+    if token:
+        session = Session()
+        revoke_token(session, token)
+        session.close()
+    forget_token()
+    click.echo("Logged out.", err=True)
+
+
+@cli.group()
+def tx():
+    """Add, list, search, import and delete transactions."""
+
+
+@tx.command("add")
+@click.option("--type", "transaction_type", type=click.Choice(["income", "expense"]), required=True)
+@click.option("--category", required=True)
+@click.option("--amount", callback=parse_amount_option, required=True)
+@click.option("--date", callback=parse_date, help="YYYY-MM-DD, defaults to today.")
+@click.option("--notes", help="Free text, e.g. the merchant; searchable with tx search.")
+@click.pass_context
+def tx_add(ctx, transaction_type, category, amount, date, notes):
+    """Record one transaction; budget alerts go to stderr."""
+    from writer import WriterError, submit
+
+    user = current_user(ctx)
+    try:
+        result = submit("add_transaction", user.id, transaction=dict(
+            transaction_type=transaction_type, category=category, amount=amount,
+            date=date or datetime.date.today(), notes=notes))
+    except WriterError as error:
+        raise click.ClickException(str(error))
+    click.echo(result.id)
+    echo_alerts(result.alerts, err=True)
+
+
+@tx.command("list")
+@filter_options
+@click.option("--page-size", default=DEFAULT_PAGE_SIZE, show_default=True)
+@click.option("--after", callback=parse_cursor_option, help="Cursor printed at the end of the previous page.")
+@click.option("--all", "stream_all", is_flag=True, help="Stream every matching row instead of one page.")
+@click.pass_context
+def tx_list(ctx, page_size, after, stream_all, **filters):
+    """List transactions newest first as tab-separated rows."""
+    from db import Session
+    from listing import TransactionFilter, fetch_page, format_transaction, iter_transactions
+    from options import format_cursor
+
+    user = current_user(ctx)
+    criteria = TransactionFilter(**filters)
+    session = Session()
+    try:
+        if stream_all:
+            render.stream(map(format_transaction, iter_transactions(session, user.id, criteria, after)))
+            return
+
+        rows, next_cursor = fetch_page(session, user.id, criteria, after, page_size)
+        render.show([format_transaction(transaction) for transaction in rows])
+        if next_cursor is not None:
+            click.echo(f"Next page: --after {format_cursor(next_cursor)}", err=True)
+    finally:
+        session.close()
+
+
+@tx.command("search")
+@click.argument("query")
+@click.option("--fuzzy", is_flag=True, help="Tolerate misspellings instead of requiring every word.")
+@click.option("--limit", default=DEFAULT_SEARCH_LIMIT, show_default=True)
+@click.pass_context
+def tx_search(ctx, query, fuzzy, limit):
+    """Find transactions whose category or notes contain QUERY, as tab-separated rows."""
+    from db import Session
+    from listing import format_transaction
+    from search import search
+
+    user = current_user(ctx)
+    session = Session()
+    results = search(session, user.id, query, fuzzy=fuzzy, limit=limit)
+    render.show([format_transaction(transaction) for transaction in results])
+    session.close()
+
+
+@tx.command("delete")
+@click.argument("transaction_ids", nargs=-1, type=int)
+@filter_options
+@click.option("--dry-run", is_flag=True, help="Only count the transactions that would be deleted.")
+@click.pass_context
+def tx_delete(ctx, transaction_ids, dry_run, **filters):
+    """Delete transactions by ID and/or filter (e.g. --batch for a whole import) in one statement."""
+    from db import Session
+    from deletion import delete_transactions
+    from listing import TransactionFilter
+
+    user = current_user(ctx)
+    session = Session()
+    try:
+        with session.begin():
+            deleted = delete_transactions(session, user.id, TransactionFilter(**filters, ids=transaction_ids),
+                                          dry_run=dry_run)
+    except ValueError as error:
+        raise click.UsageError("Give transaction IDs or at least one filter option.") from error
+    finally:
+        session.close()
+    click.echo(f"{'Would delete' if dry_run else 'Deleted'} {deleted} transactions.")
+    # Like before filters existed, naming IDs that are not found is an error
+    by_id_only = transaction_ids and all(value is None for value in filters.values())
+    if by_id_only and deleted != len(set(transaction_ids)):
+        raise SystemExit(1)
+
+
+@tx.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "file_format", type=click.Choice(IMPORT_FORMATS), help="Detected from the extension by default.")
+@click.option("--key", default=",".join(DEFAULT_NATURAL_KEY), show_default=True, help="Fields that identify duplicates.")
+@click.option("--chunk-size", default=DEFAULT_CHUNK_SIZE, show_default=True)
+@click.pass_context
+def tx_import(ctx, path, file_format, key, chunk_size):
+    """Bulk import a CSV, JSONL or OFX file."""
+    from db import Session
+    from importer import ImportAborted, import_file
+
+    user = current_user(ctx)
+    try:
+        result = import_file(Session, path, user.id, file_format=file_format, chunk_size=chunk_size,
+                             key=tuple(name.strip() for name in key.split(",") if name.strip()))
+    except ImportAborted as error:
+        click.echo(f"Imported {error.result.inserted} transactions before the error. "
+                   f"Undo with: tx delete --batch {error.result.batch_id}", err=True)
+        raise click.ClickException(str(error))
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    for position, error in result.errors:
+        click.echo(f"Row {position} skipped: {error}", err=True)
+    click.echo(f"Imported {result.inserted} transactions, skipped {result.duplicates} duplicates and "
+               f"{result.invalid} invalid rows in {result.elapsed:.2f}s ({result.rows_per_second:,.0f} rows/s).")
+    if result.inserted:
+        click.echo(f"Undo with: tx delete --batch {result.batch_id}", err=True)
+    echo_alerts(result.alerts, err=True)
+
+
+@cli.group()
+def budget():
+    """Set, list and delete budgets."""
+
+
+@budget.command("set")
+@click.argument("category")
+@click.argument("amount", callback=parse_amount_option)
+@click.pass_context
+def budget_set(ctx, category, amount):
+    """Create or update the budget of a category."""
+    from writer import WriterError, submit
+
+    user = current_user(ctx)
+    try:
+        submit("set_budget", user.id, category=category, amount=amount)
+    except WriterError as error:
+        raise click.ClickException(str(error))
+
+
+@budget.command("list")
+@click.pass_context
+def budget_list(ctx):
+    """List budgets as tab-separated rows."""
+    from db import Session
+    from models import Budget
+
+    user = current_user(ctx)
+    session = Session()
+    rows = session.query(Budget.id, Budget.category, Budget.amount).filter_by(user_id=user.id)
+    render.show([f"{budget_id}\t{category}\t{amount}" for budget_id, category, amount in rows])
+    session.close()
+
+
+@budget.command("status")
+@click.option("--period", callback=parse_period, help="Month (YYYY-MM), defaults to the current one.")
+@click.pass_context
+def budget_status_command(ctx, period):
+    """List budgets with their spend in a month as tab-separated rows, most used first."""
+    from budgets import budget_status
+    from db import Session
+
+    user = current_user(ctx)
+    session = Session()
+    lines = []
+    for status in budget_status(session, user.id, period):
+        utilization = "-" if status.utilization is None else f"{status.utilization:.0%}"
+        lines.append(f"{status.budget_id}\t{status.category}\t{status.period}\t{status.budget}\t{status.spent}\t"
+                     f"{status.remaining}\t{utilization}")
+    session.close()
+    render.show(lines)
+
+
+@budget.command("delete")
+@click.argument("budget_ids", nargs=-1, type=int)
+@click.option("--category", "categories", multiple=True, help="Delete the budget of this category, repeatable.")
+@click.option("--dry-run", is_flag=True, help="Only count the budgets that would be deleted.")
+@click.pass_context
+def budget_delete(ctx, budget_ids, categories, dry_run):
+    """Delete budgets by ID and/or category in one statement."""
+    from db import Session
+    from deletion import delete_budgets
+
+    user = current_user(ctx)
+    session = Session()
+    try:
+        with session.begin():
+            deleted = delete_budgets(session, user.id, budget_ids, categories, dry_run=dry_run)
+    except ValueError as error:
+        raise click.UsageError("Give budget IDs or --category.") from error
+    finally:
+        session.close()
+    click.echo(f"{'Would delete' if dry_run else 'Deleted'} {deleted} budgets.")
+    named = set(budget_ids) if not categories else set(categories) if not budget_ids else None
+    if named is not None and deleted != len(named):
+        raise SystemExit(1)
+
+
+@cli.command("report")
+@click.option("--from", "date_from", callback=parse_date, help="Earliest date (YYYY-MM-DD).")
+@click.option("--to", "date_to", callback=parse_date, help="Latest date (YYYY-MM-DD).")
+@click.option("--top", default=DEFAULT_TOP_CATEGORIES, show_default=True)
+@click.option("--recent", default=DEFAULT_SNAPSHOT_TRANSACTIONS, show_default=True,
+              help="Most recent transactions of the period to list, 0 for none.")
+@click.option("--cache-stats", is_flag=True, help="Print report cache hits and misses to stderr.")
+@click.pass_context
+def report_command(ctx, date_from, date_to, top, recent, cache_stats):
+    """Print the aggregated report."""
+    from db import Session
+    from report_cache import get_cache
+    from reports import cached_report
+    from snapshot import load_snapshot
+
+    user = current_user(ctx)
+    session = Session()
+    snapshot = load_snapshot(session, user.id, date_from, date_to, limit=recent)
+    report = cached_report(session, user.id, date_from, date_to, top=top, budgets=snapshot.budget_amounts)
+    session.close()
+    print_report(report, snapshot)
+    if cache_stats:
+        click.echo(" ".join(f"{name}={value}" for name, value in get_cache().stats().items()), err=True)
+
+
+@cli.command("export")
+@click.argument("table", type=click.Choice(EXPORT_TABLES))
+@click.argument("path", type=click.Path(dir_okay=False, allow_dash=True))
+@filter_options
+@click.option("--format", "file_format", type=click.Choice(EXPORT_FORMATS), help="Detected from the extension by default.")
+@click.option("--batch-size", default=DEFAULT_EXPORT_BATCH_SIZE, show_default=True, help="Rows fetched per round trip.")
+@click.option("--row-group-size", default=DEFAULT_ROW_GROUP_SIZE, show_default=True, help="Rows per Parquet row group.")
+@click.pass_context
+def export_command(ctx, table, path, file_format, batch_size, row_group_size, **filters):
+    """Stream transactions or budgets to a CSV, JSONL or Parquet file ("-" for stdout)."""
+    from db import Session
+    from export import export
+    from listing import TransactionFilter
+
+    if table == "budgets" and any(value is not None for value in filters.values()):
+        raise click.UsageError("The filter options only apply to transactions.")
+    user = current_user(ctx)
+    session = Session()
+    try:
+        result = export(session, path, user.id, table, file_format, TransactionFilter(**filters),
+                        batch_size=batch_size, row_group_size=row_group_size)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    finally:
+        session.close()
+    click.echo(f"Exported {result.rows} {table} in {result.elapsed:.2f}s ({result.rows_per_second:,.0f} rows/s).",
+               err=True)
+
+
+@cli.command("serve")
+@click.option("--host", default=DEFAULT_API_HOST, show_default=True)
+@click.option("--port", default=DEFAULT_API_PORT, show_default=True)
+@click.option("--pool-size", default=DEFAULT_API_POOL_SIZE, show_default=True, help="Database connections kept open.")
+@click.pass_context
+def serve_command(ctx, host, port, pool_size):
+    """Run the HTTP API (needs aiohttp and aiosqlite); clients log in with POST /login."""
+    try:
+        from aiohttp import web
+        from api import create_app
+    except ImportError as error:
+        raise click.ClickException(f"The HTTP API needs aiohttp and aiosqlite ({error}).")
+
+    web.run_app(create_app(ctx.find_root().obj["db_url"], pool_size=pool_size), host=host, port=port)
+
+
+@cli.group()
+def admin():
+    """Jobs over every user; they need access to the database file, not a login."""
+
+
+@admin.command("reports")
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option("--from", "date_from", callback=parse_date, help="Earliest date (YYYY-MM-DD).")
+@click.option("--to", "date_to", callback=parse_date, help="Latest date (YYYY-MM-DD).")
+@click.option("--top", default=DEFAULT_TOP_CATEGORIES, show_default=True)
+@click.option("--workers", type=int, help="Worker processes, defaults to the number of CPUs.")
+@click.option("--shard-size", default=DEFAULT_BATCH_SHARD_SIZE, show_default=True, help="Users per work unit.")
+@click.option("--overwrite", is_flag=True, help="Regenerate reports that already exist instead of resuming.")
+@click.pass_context
+def admin_reports(ctx, output_dir, date_from, date_to, top, workers, shard_size, overwrite):
+    """Write report-<user_id>.json for every user into OUTPUT_DIR."""
+    from batch import pending_users, run_batch
+
+    url = database_url(ctx.find_root().obj["db_url"])
+    user_ids, pending = pending_users(url, output_dir, resume=not overwrite)
+    with click.progressbar(length=len(pending), label="Reports") as bar:
+        result = run_batch(url, output_dir, workers, shard_size, date_from, date_to, top,
+                           resume=not overwrite, progress=bar.update)
+    for user_id, error in result.errors:
+        click.echo(f"User {user_id} failed: {error}", err=True)
+    click.echo(f"Wrote {result.written} reports, skipped {result.skipped} finished ones, {len(result.errors)} failed "
+               f"in {result.elapsed:.2f}s ({result.users_per_second:,.0f} users/s).")
+    if result.errors:
+        raise SystemExit(1)
+
+
+@admin.command("archive")
+@click.option("--before", "cutoff", required=True, callback=parse_date,
+              help="Archive transactions dated before this day (YYYY-MM-DD).")
+@click.option("--full-vacuum", is_flag=True,
+              help="Rewrite the whole file with VACUUM instead of freeing pages incrementally.")
+def admin_archive(cutoff, full_vacuum):
+    """Move old transactions into the archive table, then ANALYZE and vacuum the database."""
+    from archive import archive_transactions, compact
+
+    result = archive_transactions(cutoff)
+    click.echo(f"Archived {result.rows} transactions of {result.users} users dated before {cutoff} "
+               f"in {result.elapsed:.2f}s.")
+    compacted = compact(full=full_vacuum)
+    click.echo(f"Compacted the database in {compacted.elapsed:.2f}s, freed {compacted.freed_bytes / 2 ** 20:,.1f} MiB.")
+
+
+@admin.command("writer")
+@click.option("--socket", "path", envvar=WRITER_SOCKET_ENV, required=True, type=click.Path(dir_okay=False),
+              help="Unix socket to listen on; commands use it when BUDGET_TRACKER_WRITER_SOCKET names it.")
+@click.option("--max-batch", default=DEFAULT_WRITER_MAX_BATCH, show_default=True, help="Most writes per commit.")
+@click.option("--max-latency", default=DEFAULT_WRITER_MAX_LATENCY_MS, show_default=True,
+              help="Milliseconds to wait for more writes before committing.")
+def admin_writer(path, max_batch, max_latency):
+    """Commit the transactions and budgets of concurrent commands in groups, until interrupted."""
+    from writer import WriterError, serve
+
+    click.echo(f"Committing writes sent to {path} in groups of up to {max_batch}, press Ctrl+C to stop.", err=True)
+    try:
+        committer = serve(path, max_batch, max_latency / 1000)
+    except WriterError as error:
+        raise click.ClickException(str(error))
+    click.echo(f"Committed {committer.writes} writes in {committer.commits} group commits.", err=True)
+
+
+@cli.group()
+def ledger():
+    """Maintenance of the balance ledger."""
+
+
+@ledger.command("reconcile")
+@click.option("--check-only", is_flag=True, help="Report drift without rebuilding the ledger.")
+def ledger_reconcile(check_only):
+    """Rebuild the balance ledger and monthly summaries from transactions and report any drift."""
+    from ledger import reconcile
+
+    drift = reconcile(repair=not check_only)
+    if not drift:
+        click.echo(click.style("Ledger is consistent with transactions.", fg="green"))
+        return
+
+    for entry in drift:
+        if entry.key is None:
+            label = "stored income/expense/count"
+        else:
+            label = "{} {} {} stored count/total".format(*entry.key)
+        click.echo(click.style(
+            f"User ID: {entry.user_id} | {label}: {entry.stored} | actual: {entry.actual}", fg="yellow"))
+    if check_only:
+        click.echo(click.style(f"{len(drift)} ledger rows drifted.", fg="red"))
+        raise SystemExit(1)
+    click.echo(click.style(f"Rebuilt the ledger, {len(drift)} rows were corrected.", fg="green"))
+
+
 if __name__ == "__main__":
-    main()
+    cli()
@@ -1,22 +1,92 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import event, Column, Integer, String, Date, DateTime, ForeignKey, Index, DDL, LargeBinary, delete, insert, update
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, scoped_session, relationship
-import bcrypt
-
-engine = create_engine('sqlite:///budget_tracker.db')
-Base = declarative_base()
-Session = scoped_session(sessionmaker(bind=engine))
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 
+from db import get_engine, unit_of_work
+from money import from_cents, to_cents
+from settings import IMPORT_BATCH_ID_LENGTH, NOTES_MAX_LENGTH
 
+Base = declarative_base()
 
 
-class User(Base):
+class Money(TypeDecorator):
+    """An amount stored as integer cents and returned as a two-place Decimal.
+
+    SUM() over a Money column is an exact integer sum in SQLite and comes back as a Decimal.
+    """
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_cents(value)
+
+
+class BulkOperations:
+    """Set-based writes: each call is one SQL statement, committed once (or as part of an open unit_of_work).
+
+    Filters are column=value keywords, where a list, tuple or set value means IN, plus any
+    SQLAlchemy criteria; a call without any refuses to touch every row.
+    """
+
+    @classmethod
+    def bulk_create(cls, rows):
+        """Insert column mappings with one executemany; returns the number of rows."""
+        rows = list(rows)
+        if rows:
+            with unit_of_work() as session:
+                session.execute(insert(cls), rows)
+        return len(rows)
+
+    @classmethod
+    def bulk_update(cls, rows):
+        """Update rows by primary key; every mapping holds ``id`` and the new values."""
+        rows = list(rows)
+        if rows:
+            with unit_of_work() as session:
+                session.execute(update(cls), rows)
+        return len(rows)
+
+    @classmethod
+    def update_where(cls, values, *criteria, **filters):
+        """Set ``values`` on every matching row; returns the number of rows updated."""
+        with unit_of_work() as session:
+            return session.execute(update(cls).where(*cls._conditions(criteria, filters)).values(**values)).rowcount
+
+    @classmethod
+    def delete_where(cls, *criteria, **filters):
+        """Delete every matching row; returns the number of rows deleted."""
+        with unit_of_work() as session:
+            return session.execute(delete(cls).where(*cls._conditions(criteria, filters))).rowcount
+
+    @classmethod
+    def _conditions(cls, criteria, filters):
+        conditions = list(criteria)
+        for name, value in filters.items():
+            column = getattr(cls, name)
+            conditions.append(column.in_(value) if isinstance(value, (list, tuple, set)) else column == value)
+        if not conditions:
+            raise ValueError(f"Refusing to change every row of {cls.__tablename__} without a filter.")
+        return conditions
+
+
+class User(BulkOperations, Base):
     __tablename__ = 'users'
+    __table_args__ = (
+        Index('ix_users_username', 'username', unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     username = Column(String)
     password_hash = Column(String)
     email = Column(String)
+    # Bumped by triggers on every write to the user's transactions or budgets
+    data_version = Column(Integer, nullable=False, default=0, server_default='0')
+    # Transactions dated before this day may live in transactions_archive (see archive.py)
+    archived_before = Column(Date)
 
     transactions = relationship("Transaction", back_populates="user")
     budgets = relationship("Budget", back_populates="user")
@@ -34,56 +104,49 @@ class User(Base):
 
     def save(self):
         """Save the user to the database."""
-        session = Session()
-        session.add(self)
-        session.commit()
-        session.close()
+        with unit_of_work() as session:
+            session.add(self)
 
     def update(self, **kwargs):
         """Update the user with new values."""
-        session = Session()
-        for key, value in kwargs.items():
-            setattr(self, key, value)
-        session.commit()
-        session.close()
+        with unit_of_work() as session:
+            session.add(self)
+            for key, value in kwargs.items():
+                setattr(self, key, value)
 
     def delete(self):
         """Delete the user from the database."""
-        session = Session()
-        session.delete(self)
-        session.commit()
-        session.close()
+        with unit_of_work() as session:
+            session.delete(self)
 
     @staticmethod
     def get_all():
         """Retrieve all users from the database."""
-        session = Session()
-        users = session.query(User).all()
-        session.close()
-        return users
+        with unit_of_work() as session:
+            return session.query(User).all()
 
     @staticmethod
     def get_by_id(user_id):
         """Retrieve a user by their ID from the database."""
-        session = Session()
-        user = session.query(User).get(user_id)
-        session.close()
-        return user
+        with unit_of_work() as session:
+            return session.query(User).get(user_id)
 
     @staticmethod
     def get_by_username(username):
         """Retrieve a user by their username from the database."""
-        session = Session()
-        user = session.query(User).filter_by(username=username).first()
-        session.close()
+        with unit_of_work() as session:
+            return session.query(User).filter_by(username=username).first()
 
 
-class Budget(Base):
+class Budget(BulkOperations, Base):
     __tablename__ = 'budgets'
+    __table_args__ = (
+        Index('uq_budgets_user_id_category', 'user_id', 'category', unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     category = Column(String)
-    amount = Column(Float)
+    amount = Column(Money)
     user_id = Column(Integer, ForeignKey('users.id'))
     user = relationship("User", back_populates="budgets")
     
@@ -91,116 +154,297 @@ class Budget(Base):
 
     def save(self):
         """Save the budget to the database."""
-        session = Session()
-        session.add(self)
-        session.commit()
-        session.close()
+        with unit_of_work() as session:
+            session.add(self)
 
     def update(self, **kwargs):
         """Update the budget with new values."""
-        session = Session()
-        for key, value in kwargs.items():
-            setattr(self, key, value)
-        session.commit()
-        session.close()
+        with unit_of_work() as session:
+            session.add(self)
+            for key, value in kwargs.items():
+                setattr(self, key, value)
 
     def delete(self):
         """Delete the budget from the database."""
-        session = Session()
-        session.delete(self)
-        session.commit()
-        session.close()
+        with unit_of_work() as session:
+            session.delete(self)
 
     @staticmethod
     def get_all():
         """Retrieve all budgets from the database."""
-        session = Session()
-        budgets = session.query(Budget).all()
-        session.close()
-        return budgets
+        with unit_of_work() as session:
+            return session.query(Budget).all()
 
     @staticmethod
     def get_by_id(budget_id):
         """Retrieve a budget by its ID from the database."""
-        session = Session()
-        budget = session.query(Budget).get(budget_id)
-        session.close()
-        return budget
+        with unit_of_work() as session:
+            return session.query(Budget).get(budget_id)
 
 
-class Transaction(Base):
+class Transaction(BulkOperations, Base):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        Index('ix_transactions_user_id_transaction_type', 'user_id', 'transaction_type'),
+        Index('ix_transactions_user_id_date', 'user_id', 'date'),
+        Index('ix_transactions_user_id_category', 'user_id', 'category'),
+        Index('ix_transactions_user_id_import_batch_id', 'user_id', 'import_batch_id'),
+        # Never hand out an id again, e.g. one that now lives in transactions_archive
+        {'sqlite_autoincrement': True},
+    )
     id = Column(Integer, primary_key=True)
     transaction_type = Column(String(20))  # Rename 'transaction_type' to 'type'
     category = Column(String(50))
-    amount = Column(Float)
+    amount = Column(Money)
     date = Column(Date)
     user_id = Column(Integer, ForeignKey('users.id'))
-    
+    notes = Column(String(NOTES_MAX_LENGTH))  # free text, searchable through transactions_fts
+    import_batch_id = Column(String(IMPORT_BATCH_ID_LENGTH))  # set by importer.py, one per import run
+
     user = relationship("User", back_populates="transactions")
 
-    def __init__(self, transaction_type, category, amount, date,user_id):
+    def __init__(self, transaction_type, category, amount, date,user_id, notes=None):
         self.transaction_type = transaction_type
         self.category = category
         self.amount = amount
         self.date = date
         self.user_id = user_id
+        self.notes = notes
 
     def save(self):
         """Save the transaction to the database."""
-        session = Session()
-        session.add(self)
-        session.commit()
-        session.close()
+        with unit_of_work() as session:
+            session.add(self)
 
     def update(self, **kwargs):
         """Update the transaction with new values."""
-        session = Session()
-        for key, value in kwargs.items():
-            setattr(self, key, value)
-        session.commit()
-        session.close()
+        with unit_of_work() as session:
+            session.add(self)
+            for key, value in kwargs.items():
+                setattr(self, key, value)
 
     def delete(self):
         """Delete the transaction from the database."""
-        session = Session()
-        session.delete(self)
-        session.commit()
-        session.close()
+        with unit_of_work() as session:
+            session.delete(self)
 
     @staticmethod
     def get_all():
         """Retrieve all transactions from the database."""
-        session = Session()
-        transactions = session.query(Transaction).all()
-        session.close()
-        return transactions
+        with unit_of_work() as session:
+            return session.query(Transaction).all()
 
     @staticmethod
     def get_by_id(transaction_id):
         """Retrieve a transaction by its ID from the database."""
-        session = Session()
-        transaction = session.query(Transaction).get(transaction_id)
-        session.close()
-        return transaction
+        with unit_of_work() as session:
+            return session.query(Transaction).get(transaction_id)
 
     @staticmethod
     def get_by_category(category):
         """Retrieve transactions by category from the database."""
-        session = Session()
-        transactions = session.query(Transaction).filter_by(category=category).all()
-        session.close()
-        return transactions
+        with unit_of_work() as session:
+            return session.query(Transaction).filter_by(category=category).all()
 
     @staticmethod
     def get_by_user(user_id):
         """Retrieve transactions by user from the database."""
-        session = Session()
-        transactions = session.query(Transaction).join(User).filter(User.id == user_id).all()
-        session.close()
-        return transactions
+        with unit_of_work() as session:
+            return session.query(Transaction).filter_by(user_id=user_id).all()
+
+
+class ArchivedTransaction(Base):
+    """A transaction moved out of the hot table by archive.py, keeping its id.
+
+    No triggers fire on this table: balances and monthly summaries already include its rows.
+    """
+    __tablename__ = 'transactions_archive'
+    __table_args__ = (
+        Index('ix_transactions_archive_user_id_date', 'user_id', 'date'),
+    )
+    id = Column(Integer, primary_key=True)
+    transaction_type = Column(String(20))
+    category = Column(String(50))
+    amount = Column(Money)
+    date = Column(Date)
+    user_id = Column(Integer, ForeignKey('users.id'))
+    notes = Column(String(NOTES_MAX_LENGTH))
+    import_batch_id = Column(String(IMPORT_BATCH_ID_LENGTH))
+
+
+class Balance(Base):
+    """Running income/expense totals per user, maintained by triggers on transactions."""
+    __tablename__ = 'balances'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    total_income = Column(Money, nullable=False, default=0)
+    total_expense = Column(Money, nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+
+    @property
+    def balance(self):
+        return self.total_income - self.total_expense
+
+    @staticmethod
+    def get_by_user(user_id):
+        """Retrieve the balance of a user, zero when they have no transactions yet."""
+        with unit_of_work() as session:
+            balance = session.get(Balance, user_id)
+        return balance or Balance(user_id=user_id, total_income=0, total_expense=0, transaction_count=0)
+
+
+class MonthlySummary(Base):
+    """Count and total of a user's transactions per month, category and type, maintained by triggers."""
+    __tablename__ = 'monthly_summaries'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    year_month = Column(String(7), primary_key=True)  # YYYY-MM
+    category = Column(String(50), primary_key=True)  # '' for transactions without one
+    transaction_type = Column(String(20), primary_key=True)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    total = Column(Money, nullable=False, default=0)
+
+
+class LoginSession(Base):
+    """A revocable login token; only the SHA-256 of the token is stored."""
+    __tablename__ = 'login_sessions'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    token_hash = Column(String(64), nullable=False, unique=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime)
+
+    user = relationship("User")
+
+
+class ReportCacheEntry(Base):
+    """A report result as JSON (Report.to_dict), valid while the user's data_version is unchanged."""
+    __tablename__ = 'report_cache'
+    __table_args__ = (
+        Index('uq_report_cache_user_id_cache_key', 'user_id', 'cache_key', unique=True),
+        Index('ix_report_cache_used_at', 'used_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    cache_key = Column(String, nullable=False)
+    data_version = Column(Integer, nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+    used_at = Column(DateTime, nullable=False)
+
+
+# Keep the balances table in step with every write to transactions, whether it comes
+# from the ORM helpers, a bulk insert or plain SQL.
+_ADD_NEW_TO_BALANCE = """
+    INSERT INTO balances (user_id, total_income, total_expense, transaction_count)
+    SELECT NEW.user_id,
+           CASE WHEN NEW.transaction_type = 'income' THEN NEW.amount ELSE 0 END,
+           CASE WHEN NEW.transaction_type = 'expense' THEN NEW.amount ELSE 0 END,
+           1
+    WHERE NEW.user_id IS NOT NULL
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_income = total_income + excluded.total_income,
+        total_expense = total_expense + excluded.total_expense,
+        transaction_count = transaction_count + 1;
+"""
+_REMOVE_OLD_FROM_BALANCE = """
+    UPDATE balances SET
+        total_income = total_income - CASE WHEN OLD.transaction_type = 'income' THEN OLD.amount ELSE 0 END,
+        total_expense = total_expense - CASE WHEN OLD.transaction_type = 'expense' THEN OLD.amount ELSE 0 END,
+        transaction_count = transaction_count - 1
+    WHERE user_id = OLD.user_id;
+"""
+BALANCE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_balance_insert
+    AFTER INSERT ON transactions
+    BEGIN {_ADD_NEW_TO_BALANCE} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_balance_delete
+    AFTER DELETE ON transactions
+    BEGIN {_REMOVE_OLD_FROM_BALANCE} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_balance_update
+    AFTER UPDATE OF user_id, transaction_type, amount ON transactions
+    BEGIN {_REMOVE_OLD_FROM_BALANCE} {_ADD_NEW_TO_BALANCE} END""",
+]
+
+# Same for the monthly summaries; rows whose count drops to zero are removed so the
+# table only ever holds the months and categories that have transactions.
+_ADD_NEW_TO_SUMMARY = """
+    INSERT INTO monthly_summaries (user_id, year_month, category, transaction_type, transaction_count, total)
+    SELECT NEW.user_id, strftime('%Y-%m', NEW.date), COALESCE(NEW.category, ''), NEW.transaction_type, 1, NEW.amount
+    WHERE NEW.user_id IS NOT NULL AND NEW.date IS NOT NULL AND NEW.transaction_type IS NOT NULL
+    ON CONFLICT (user_id, year_month, category, transaction_type) DO UPDATE SET
+        transaction_count = transaction_count + 1,
+        total = total + excluded.total;
+"""
+_SUMMARY_OF_OLD = """user_id = OLD.user_id AND year_month = strftime('%Y-%m', OLD.date)
+        AND category = COALESCE(OLD.category, '') AND transaction_type = OLD.transaction_type"""
+_REMOVE_OLD_FROM_SUMMARY = f"""
+    UPDATE monthly_summaries SET
+        transaction_count = transaction_count - 1,
+        total = total - OLD.amount
+    WHERE {_SUMMARY_OF_OLD};
+    DELETE FROM monthly_summaries WHERE {_SUMMARY_OF_OLD} AND transaction_count <= 0;
+"""
+SUMMARY_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_summary_insert
+    AFTER INSERT ON transactions
+    BEGIN {_ADD_NEW_TO_SUMMARY} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_summary_delete
+    AFTER DELETE ON transactions
+    BEGIN {_REMOVE_OLD_FROM_SUMMARY} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_summary_update
+    AFTER UPDATE OF user_id, transaction_type, category, amount, date ON transactions
+    BEGIN {_REMOVE_OLD_FROM_SUMMARY} {_ADD_NEW_TO_SUMMARY} END""",
+]
+
+# Every write to a user's transactions or budgets bumps users.data_version, which
+# invalidates their cached reports (see report_cache.py).
+_BUMP_DATA_VERSION = "UPDATE users SET data_version = data_version + 1 WHERE id IN ({users});"
+DATA_VERSION_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_data_version_{action}
+    AFTER {action.upper()} ON {table}
+    BEGIN {_BUMP_DATA_VERSION.format(users=users)} END"""
+    for table in ('transactions', 'budgets')
+    for action, users in (('insert', 'NEW.user_id'), ('delete', 'OLD.user_id'),
+                          ('update', 'OLD.user_id, NEW.user_id'))
+]
+# Full-text search over category and notes (see search.py). The FTS5 table uses the
+# trigram tokenizer for substring and fuzzy matching, and indexes the owner as a
+# '~<user_id>~' token so a search only ever reads the documents of one user. It stores
+# no text of its own: the view supplies the columns for rebuilds.
+SEARCH_DDL = [
+    """CREATE VIEW IF NOT EXISTS transactions_search_content AS
+    SELECT id, '~' || user_id || '~' AS owner, category, notes FROM transactions""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        owner, category, notes,
+        content='transactions_search_content', content_rowid='id', tokenize='trigram')""",
+]
+_ADD_NEW_TO_SEARCH = """
+    INSERT INTO transactions_fts (rowid, owner, category, notes)
+    VALUES (NEW.id, '~' || NEW.user_id || '~', NEW.category, NEW.notes);
+"""
+_REMOVE_OLD_FROM_SEARCH = """
+    INSERT INTO transactions_fts (transactions_fts, rowid, owner, category, notes)
+    VALUES ('delete', OLD.id, '~' || OLD.user_id || '~', OLD.category, OLD.notes);
+"""
+SEARCH_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_search_insert
+    AFTER INSERT ON transactions
+    BEGIN {_ADD_NEW_TO_SEARCH} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_search_delete
+    AFTER DELETE ON transactions
+    BEGIN {_REMOVE_OLD_FROM_SEARCH} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_search_update
+    AFTER UPDATE OF user_id, category, notes ON transactions
+    BEGIN {_REMOVE_OLD_FROM_SEARCH} {_ADD_NEW_TO_SEARCH} END""",
+]
+for trigger in BALANCE_TRIGGERS + SUMMARY_TRIGGERS + DATA_VERSION_TRIGGERS + SEARCH_DDL + SEARCH_TRIGGERS:
+    # DDL() applies %-formatting to its statement, hence the escaping for strftime()
+    event.listen(Base.metadata, 'after_create', DDL(trigger.replace('%', '%%')).execute_if(dialect='sqlite'))
 
 
 def create_tables():
-    Base.metadata.create_all(engine)
+    Base.metadata.create_all(get_engine())
 
@@ -0,0 +1,40 @@
+"""Money amounts: stored as integer cents, handled in Python as two-place Decimals.
+
+Only the standard library is used so the CLI can parse amounts without loading SQLAlchemy.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+CENTS = Decimal("0.01")
+MAX_CENTS = 2 ** 63 - 1  # SQLite INTEGER is a signed 64-bit integer
+
+
+def parse_amount(value):
+    """Parse user input such as ``"1,234.5"`` into a Decimal rounded to cents.
+
+    Raises ValueError for anything that is not a number or whose cents do not fit in the
+    signed 64-bit INTEGER they are stored as.
+    """
+    if isinstance(value, float):
+        value = repr(value)
+    try:
+        amount = Decimal(str(value).replace(",", "").strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"invalid amount {value!r}")
+    try:
+        amount = amount.quantize(CENTS, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"amount {value!r} is too large")
+    if abs(amount) * 100 > MAX_CENTS:
+        raise ValueError(f"amount {value!r} is too large")
+    return amount
+
+
+def to_cents(value):
+    """Integer minor units for a Decimal, int, float or numeric string."""
+    return int(parse_amount(value) * 100)
+
+
+def from_cents(cents):
+    return Decimal(int(cents)).scaleb(-2)
@@ -0,0 +1,69 @@
+"""Click parameter callbacks and option sets shared by the commands in main.py."""
+import datetime
+
+import click
+
+import money
+
+
+def parse_date(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise click.BadParameter("use the YYYY-MM-DD format")
+
+
+def parse_period(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m").strftime("%Y-%m")
+    except ValueError:
+        raise click.BadParameter("use the YYYY-MM format")
+
+
+def parse_amount_option(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return money.parse_amount(value)
+    except ValueError as error:
+        raise click.BadParameter(str(error))
+
+
+def format_cursor(cursor):
+    date, transaction_id = cursor
+    return f"{date.isoformat()}:{transaction_id}"
+
+
+def parse_cursor(cursor):
+    """Turn a ``YYYY-MM-DD:id`` cursor back into a (date, id) pair."""
+    date_str, _, id_str = cursor.rpartition(":")
+    return datetime.datetime.strptime(date_str, "%Y-%m-%d").date(), int(id_str)
+
+
+def parse_cursor_option(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return parse_cursor(value)
+    except ValueError:
+        raise click.BadParameter("use the cursor printed after the previous page")
+
+
+def filter_options(command):
+    """Attach the transaction filter options to a click command."""
+    options = [
+        click.option("--from", "date_from", callback=parse_date, help="Earliest date (YYYY-MM-DD)."),
+        click.option("--to", "date_to", callback=parse_date, help="Latest date (YYYY-MM-DD)."),
+        click.option("--type", "transaction_type", type=click.Choice(["income", "expense"])),
+        click.option("--category"),
+        click.option("--min-amount", callback=parse_amount_option),
+        click.option("--max-amount", callback=parse_amount_option),
+        click.option("--batch", "import_batch", help="Import batch ID printed by tx import."),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
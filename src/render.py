@@ -0,0 +1,84 @@
+"""Aligned tables written in one piece, through a pager on a terminal.
+
+Screens build their whole page as a list of lines and hand it to ``show``, which writes
+it with a single call instead of one styled echo per row. On a terminal, output taller
+than the window goes through ``click.echo_via_pager``; when stdout is redirected the
+lines are written plain, without ANSI styling or a pager. ``stream`` does the same for
+row iterators too long to hold in memory, RENDER_BATCH_ROWS lines per write.
+
+Only click and the standard library are imported, like main.py's other top-level imports.
+"""
+import itertools
+import shutil
+import sys
+from dataclasses import dataclass
+
+import click
+
+from settings import RENDER_BATCH_ROWS
+
+SEPARATOR = "  "
+
+
+@dataclass
+class Column:
+    """A table column; ``align`` is a format alignment, ">" for amounts."""
+    title: str
+    align: str = "<"
+
+
+def is_terminal():
+    return sys.stdout.isatty()
+
+
+def style(text, color, **styles):
+    """click.style when ``color`` is set, the plain text otherwise."""
+    return click.style(text, **styles) if color else text
+
+
+def cell(value):
+    return "" if value is None else str(value)
+
+
+def table(columns, rows, color=False, row_styles=None):
+    """Lines of an aligned table: the header, a rule and one line per row.
+
+    Widths fit the longest cell of each column in ``rows``; ``row_styles`` optionally gives
+    click.style keywords per row, applied when ``color`` is set.
+    """
+    cells = [[cell(value) for value in row] for row in rows]
+    by_column = list(zip(*cells)) if cells else [()] * len(columns)
+    widths = [max([len(column.title), *map(len, values)]) for column, values in zip(columns, by_column)]
+    line = SEPARATOR.join(f"{{:{column.align}{width}}}" for column, width in zip(columns, widths)).format
+
+    lines = [style(line(*(column.title for column in columns)).rstrip(), color, bold=True),
+             SEPARATOR.join("-" * width for width in widths)]
+    if row_styles is None:
+        lines.extend(line(*values).rstrip() for values in cells)
+        return lines
+    for values, styles in zip(cells, row_styles):
+        text = line(*values).rstrip()
+        lines.append(style(text, color, **styles) if styles else text)
+    return lines
+
+
+def show(lines, pager=True):
+    """Write ``lines`` with one call, through the pager when on a terminal and taller than it."""
+    if not lines:
+        return
+    text = "\n".join(lines)
+    if pager and is_terminal() and len(lines) >= shutil.get_terminal_size().lines - 1:
+        click.echo_via_pager(text + "\n")
+    else:
+        click.echo(text, color=is_terminal())
+
+
+def stream(lines, pager=True, batch_size=RENDER_BATCH_ROWS):
+    """``show`` for an iterator of lines: paged on a terminal, else written batch_size lines at a time."""
+    lines = iter(lines)
+    batches = iter(lambda: list(itertools.islice(lines, batch_size)), [])
+    if pager and is_terminal():
+        click.echo_via_pager("\n".join(batch) + "\n" for batch in batches)
+        return
+    for batch in batches:
+        click.echo("\n".join(batch))
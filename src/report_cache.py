@@ -0,0 +1,165 @@
+"""Report results cached by (user, report type, parameters, data version).
+
+Every write to a user's transactions or budgets bumps ``users.data_version``
+(see the triggers in models.py), so a cached result is never served after the
+data changed: its key simply stops matching and it ages out of the cache.
+
+Results live in an in-process LRU and, in "disk" mode, also in the
+``report_cache`` table so that separate CLI invocations can share them. Rows hold
+``Report.to_dict()`` as JSON, and every write to the table runs in a short session of
+its own, so the caller's session is never committed. A disk hit stays read-only unless
+the row's ``used_at`` is older than REPORT_CACHE_TOUCH_INTERVAL, which keeps eviction
+close to least recently used without a write per report.
+"""
+import json
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from auth import utcnow
+from models import ReportCacheEntry, User
+from reports import Report, json_default
+from settings import (DEFAULT_REPORT_CACHE_MODE, DEFAULT_REPORT_CACHE_ROWS, DEFAULT_REPORT_CACHE_SIZE,
+                      REPORT_CACHE_ENV, REPORT_CACHE_MODES, REPORT_CACHE_TOUCH_INTERVAL)
+
+
+def data_version(session, user_id):
+    return session.execute(select(User.data_version).where(User.id == user_id)).scalar() or 0
+
+
+class ReportCache:
+    """A size-bounded LRU of report results with hit/miss counters.
+
+    ``maxsize`` bounds the in-process entries; ``disk_rows`` (0 disables it) bounds the
+    ``report_cache`` table, least recently used rows are deleted first.
+    """
+
+    def __init__(self, maxsize=DEFAULT_REPORT_CACHE_SIZE, disk_rows=0):
+        self.maxsize = maxsize
+        self.disk_rows = disk_rows
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_build(self, session, user_id, kind, params, build):
+        """Return the cached result for the current data version, calling ``build()`` on a miss."""
+        if self.maxsize <= 0 and not self.disk_rows:
+            self.misses += 1
+            return build()
+        version = data_version(session, user_id)
+        key = (user_id, kind, params, version)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        value = self.load(session, user_id, kind, params, version) if self.disk_rows else None
+        if value is not None:
+            self.hits += 1
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            value = build()
+            if self.disk_rows:
+                self.store(session, user_id, kind, params, version, value)
+        self.remember(key, value)
+        return value
+
+    def remember(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = value
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def load(self, session, user_id, kind, params, version):
+        entry = session.execute(select(ReportCacheEntry).where(
+            ReportCacheEntry.user_id == user_id,
+            ReportCacheEntry.cache_key == cache_key(kind, params),
+            ReportCacheEntry.data_version == version,
+        )).scalar()
+        if entry is None:
+            return None
+        try:
+            value = Report.from_dict(json.loads(entry.payload))
+        except (ValueError, KeyError, TypeError):
+            # Written by an older version of the code (pickled, or another layout); rebuild and overwrite it
+            return None
+        now = utcnow()
+        if entry.used_at < now - REPORT_CACHE_TOUCH_INTERVAL:
+            with cache_writes(session) as writer:
+                writer.execute(update(ReportCacheEntry).where(ReportCacheEntry.id == entry.id).values(used_at=now))
+        return value
+
+    def store(self, session, user_id, kind, params, version, value):
+        key = cache_key(kind, params)
+        with cache_writes(session) as writer:
+            writer.execute(delete(ReportCacheEntry).where(
+                ReportCacheEntry.user_id == user_id, ReportCacheEntry.cache_key == key))
+            writer.add(ReportCacheEntry(
+                user_id=user_id, cache_key=key, data_version=version,
+                payload=json.dumps(value.to_dict(), default=json_default).encode(), used_at=utcnow(),
+            ))
+            writer.flush()
+            excess = writer.execute(select(func.count(ReportCacheEntry.id))).scalar() - self.disk_rows
+            if excess > 0:
+                oldest = select(ReportCacheEntry.id).order_by(ReportCacheEntry.used_at).limit(excess)
+                writer.execute(delete(ReportCacheEntry).where(ReportCacheEntry.id.in_(oldest)))
+                self.evictions += excess
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+        }
+
+
+@contextmanager
+def cache_writes(session):
+    """A short transaction on the caller's engine but not its session, for the report_cache table.
+
+    The cache is only an optimization: when another process holds the write lock past the
+    busy timeout, the write is skipped rather than failing the report.
+    """
+    writer = Session(bind=session.get_bind())
+    try:
+        with writer.begin():
+            yield writer
+    except OperationalError:
+        pass
+    finally:
+        writer.close()
+
+
+def cache_key(kind, params):
+    return repr((kind, params))
+
+
+_cache = None
+
+
+def get_cache():
+    """The process-wide cache, configured from $BUDGET_TRACKER_REPORT_CACHE (off, memory or disk)."""
+    global _cache
+    if _cache is None:
+        mode = os.environ.get(REPORT_CACHE_ENV, DEFAULT_REPORT_CACHE_MODE)
+        if mode not in REPORT_CACHE_MODES:
+            raise ValueError(f"{REPORT_CACHE_ENV} must be one of {', '.join(REPORT_CACHE_MODES)}")
+        _cache = ReportCache(
+            maxsize=0 if mode == "off" else DEFAULT_REPORT_CACHE_SIZE,
+            disk_rows=DEFAULT_REPORT_CACHE_ROWS if mode == "disk" else 0,
+        )
+    return _cache
@@ -0,0 +1,247 @@
+import datetime
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from archive import archived_before, sources
+from models import Budget, MonthlySummary, Transaction
+from money import CENTS
+from settings import DEFAULT_TOP_CATEGORIES
+
+
+@dataclass
+class CategorySpend:
+    """Expenses in one category compared with its budget (None when no budget is set)."""
+    category: str
+    spent: Decimal
+    budget: Decimal = None
+
+    @property
+    def remaining(self):
+        return None if self.budget is None else self.budget - self.spent
+
+    @property
+    def utilization(self):
+        if not self.budget:
+            return None
+        return self.spent / self.budget
+
+
+@dataclass
+class MonthlyTotal:
+    """Income and expenses of one calendar month, ``month`` is ``YYYY-MM``."""
+    month: str
+    income: Decimal
+    expense: Decimal
+
+    @property
+    def net(self):
+        return self.income - self.expense
+
+
+@dataclass
+class Report:
+    user_id: int
+    date_from: datetime.date = None
+    date_to: datetime.date = None
+    categories: list = field(default_factory=list)
+    months: list = field(default_factory=list)
+    top_categories: list = field(default_factory=list)
+
+    @property
+    def total_income(self):
+        return sum((month.income for month in self.months), Decimal(0))
+
+    @property
+    def total_expense(self):
+        return sum((month.expense for month in self.months), Decimal(0))
+
+    @property
+    def is_empty(self):
+        return not self.categories and not self.months
+
+    def to_dict(self):
+        """Plain dicts and lists, serializable with ``json.dumps(..., default=json_default)``."""
+        return {
+            "user_id": self.user_id,
+            "from": self.date_from,
+            "to": self.date_to,
+            "total_income": self.total_income,
+            "total_expense": self.total_expense,
+            "months": [{"month": month.month, "income": month.income, "expense": month.expense, "net": month.net}
+                       for month in self.months],
+            "categories": [{"category": item.category, "spent": item.spent, "budget": item.budget,
+                            "remaining": item.remaining} for item in self.categories],
+            "top_categories": [item.category for item in self.top_categories],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """The report back from ``to_dict`` output, after a JSON round trip."""
+        def amount(value):
+            return None if value is None else Decimal(value)
+
+        def date(value):
+            return None if value is None else datetime.date.fromisoformat(value)
+
+        categories = [CategorySpend(item["category"], amount(item["spent"]), amount(item["budget"]))
+                      for item in data["categories"]]
+        by_name = {item.category: item for item in categories}
+        return cls(
+            user_id=data["user_id"],
+            date_from=date(data["from"]),
+            date_to=date(data["to"]),
+            categories=categories,
+            months=[MonthlyTotal(item["month"], amount(item["income"]), amount(item["expense"]))
+                    for item in data["months"]],
+            top_categories=[by_name[name] for name in data["top_categories"]],
+        )
+
+
+def json_default(value):
+    """JSON encoding of amounts ("12.50") and dates ("2024-05-01")."""
+    if isinstance(value, Decimal):
+        return str(value.quantize(CENTS))
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def window(query, user_id, date_from=None, date_to=None, entity=Transaction):
+    """Restrict a transactions query to a user and an optional date range (uses the user/date index)."""
+    query = query.where(entity.user_id == user_id)
+    if date_from is not None:
+        query = query.where(entity.date >= date_from)
+    if date_to is not None:
+        query = query.where(entity.date <= date_to)
+    return query
+
+
+def month_start(date):
+    return date.replace(day=1)
+
+
+def month_end(date):
+    return (date.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - datetime.timedelta(days=1)
+
+
+def split_window(date_from=None, date_to=None):
+    """Split a date range into whole months and the partial months at either end.
+
+    Returns ``(months, partial)``: ``months`` is a (first, last) pair of ``YYYY-MM`` bounds, either
+    of which is None when open-ended, or None when the range holds no whole month; ``partial`` lists
+    the leftover (from, to) date ranges.
+    """
+    partial = []
+    whole_from, whole_to = date_from, date_to
+    if date_from is not None and date_from.day != 1:
+        head_end = month_end(date_from) if date_to is None else min(month_end(date_from), date_to)
+        partial.append((date_from, head_end))
+        whole_from = month_end(date_from) + datetime.timedelta(days=1)
+    if date_to is not None and date_to != month_end(date_to):
+        if whole_from is None or month_start(date_to) >= whole_from:
+            partial.append((month_start(date_to), date_to))
+        whole_to = month_start(date_to) - datetime.timedelta(days=1)
+
+    partial = [(start, end) for start, end in partial if start <= end]
+    if whole_from is not None and whole_to is not None and whole_from > whole_to:
+        return None, partial
+    return (
+        None if whole_from is None else whole_from.strftime('%Y-%m'),
+        None if whole_to is None else whole_to.strftime('%Y-%m'),
+    ), partial
+
+
+def summary_rows(session, user_id, date_from=None, date_to=None):
+    """(month, category, type, count, total) for a user's transactions in the range.
+
+    Whole months are read from monthly_summaries, so the cost grows with months x categories;
+    only the partial months at the edges of the range touch the transactions table, and the
+    archive too when they start before the user's archive cutoff.
+    """
+    months, partial = split_window(date_from, date_to)
+    rows = []
+    if months is not None:
+        query = select(
+            MonthlySummary.year_month, MonthlySummary.category, MonthlySummary.transaction_type,
+            MonthlySummary.transaction_count, MonthlySummary.total,
+        ).where(MonthlySummary.user_id == user_id)
+        first_month, last_month = months
+        if first_month is not None:
+            query = query.where(MonthlySummary.year_month >= first_month)
+        if last_month is not None:
+            query = query.where(MonthlySummary.year_month <= last_month)
+        rows.extend(session.execute(query).all())
+    cutoff = archived_before(session, user_id) if partial else None
+    for start, end in partial:
+        for entity, clauses in sources(cutoff, start):
+            key = (
+                func.strftime('%Y-%m', entity.date),
+                func.coalesce(entity.category, ''),
+                entity.transaction_type,
+            )
+            rows.extend(session.execute(window(
+                select(*key, func.count(entity.id), func.sum(entity.amount)).where(*clauses).group_by(*key),
+                user_id, start, end, entity,
+            )).all())
+    return rows
+
+
+def category_spend(session, user_id, date_from=None, date_to=None, rows=None, budgets=None):
+    """Expense totals per category, joined with the user's budgets, biggest spend first.
+
+    ``budgets`` maps category to amount when the caller already has them, e.g. from a snapshot.
+    """
+    if rows is None:
+        rows = summary_rows(session, user_id, date_from, date_to)
+    spent = {}
+    for _, category, transaction_type, _, total in rows:
+        if transaction_type == 'expense':
+            spent[category] = spent.get(category, Decimal(0)) + total
+    if budgets is None:
+        budgets = session.execute(select(Budget.category, Budget.amount).where(Budget.user_id == user_id)).all()
+    budgets = dict(budgets)
+
+    categories = [CategorySpend(category, total, budgets.pop(category, None)) for category, total in spent.items()]
+    categories.extend(CategorySpend(category, Decimal(0), amount) for category, amount in budgets.items())
+    categories.sort(key=lambda item: (-item.spent, item.category))
+    return categories
+
+
+def monthly_totals(session, user_id, date_from=None, date_to=None, rows=None):
+    """Income and expense rollups per month, oldest first."""
+    if rows is None:
+        rows = summary_rows(session, user_id, date_from, date_to)
+    months = {}
+    for month, _, transaction_type, _, total in rows:
+        totals = months.setdefault(month, MonthlyTotal(month, Decimal(0), Decimal(0)))
+        if transaction_type == 'income':
+            totals.income += total
+        elif transaction_type == 'expense':
+            totals.expense += total
+    return [months[month] for month in sorted(months)]
+
+
+def build_report(session, user_id, date_from=None, date_to=None, top=DEFAULT_TOP_CATEGORIES, budgets=None):
+    """Aggregate a user's monthly summaries and budgets and return a compact Report."""
+    rows = summary_rows(session, user_id, date_from, date_to)
+    categories = category_spend(session, user_id, rows=rows, budgets=budgets)
+    return Report(
+        user_id=user_id,
+        date_from=date_from,
+        date_to=date_to,
+        categories=categories,
+        months=monthly_totals(session, user_id, rows=rows),
+        top_categories=[item for item in categories if item.spent > 0][:top],
+    )
+
+
+def cached_report(session, user_id, date_from=None, date_to=None, top=DEFAULT_TOP_CATEGORIES, cache=None,
+                  budgets=None):
+    """build_report, served from the report cache while the user's data is unchanged."""
+    from report_cache import get_cache
+
+    cache = get_cache() if cache is None else cache
+    return cache.get_or_build(session, user_id, "report", (date_from, date_to, top),
+                              lambda: build_report(session, user_id, date_from, date_to, top, budgets))
@@ -0,0 +1,108 @@
+"""Search a user's transactions by category and notes.
+
+Both modes read the transactions_fts index (FTS5, trigram tokenizer) restricted to the
+user's owner token, so the cost depends on the user's matches and not on the size of
+the table:
+
+* substring (the default): every word of at least three characters must occur in the
+  category or the notes, case-insensitively, which also covers prefixes. Shorter words
+  are applied as plain substring filters on the matched rows, and only a query made of
+  nothing but short words falls back to scanning the user's rows.
+* fuzzy: rows sharing trigrams with the words are ranked by the index, and the best
+  FUZZY_CANDIDATES are re-scored in Python by how closely their words resemble the
+  query, so "starbuks" or "grocerys" still find their rows.
+
+Results are newest first (by insertion) for substring searches and most similar first
+for fuzzy ones. Archived transactions (see archive.py) leave the index; for a user with
+an archive, the same conditions are applied to their archived rows with plain substring
+scans, after the indexed matches in substring mode and among the candidates in fuzzy mode.
+"""
+from difflib import SequenceMatcher
+
+from sqlalchemy import literal_column, or_, select, table, text
+
+from archive import archived_before
+from models import ArchivedTransaction, Transaction
+from settings import DEFAULT_SEARCH_LIMIT, FUZZY_CANDIDATES, FUZZY_MIN_SIMILARITY
+
+TRIGRAM = 3
+
+
+def phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def match_expression(user_id, terms, operator="AND"):
+    """An FTS5 query for ``terms`` in the category or notes of one user's transactions."""
+    return f'owner:"~{int(user_id)}~" AND {{category notes}}:({f" {operator} ".join(phrase(term) for term in terms)})'
+
+
+def fts_hits(expression, order_by="rowid DESC", limit=None):
+    """Subquery of the matching transaction ids."""
+    hits = (select(literal_column("rowid").label("id"))
+            .select_from(table("transactions_fts"))
+            .where(text("transactions_fts MATCH :expression").bindparams(expression=expression))
+            .order_by(text(order_by)))
+    return (hits if limit is None else hits.limit(limit)).subquery()
+
+
+def substring_clauses(terms, entity=Transaction):
+    return [or_(entity.category.icontains(term, autoescape=True),
+                entity.notes.icontains(term, autoescape=True)) for term in terms]
+
+
+def archived_matches(session, user_id, clauses, limit):
+    """The user's archived transactions meeting ``clauses``, newest first, read without an index."""
+    return session.execute(select(ArchivedTransaction).where(ArchivedTransaction.user_id == user_id, *clauses)
+                           .order_by(ArchivedTransaction.id.desc()).limit(limit)).scalars().all()
+
+
+def trigrams(term):
+    term = term.lower()
+    return {term[index:index + TRIGRAM] for index in range(len(term) - TRIGRAM + 1)}
+
+
+def similarity(terms, transaction):
+    """Mean over the query words of the best SequenceMatcher ratio against any word of the row."""
+    words = f"{transaction.category or ''} {transaction.notes or ''}".lower().split()
+    if not words:
+        return 0.0
+    return sum(max(SequenceMatcher(None, term.lower(), word).ratio() for word in words) for term in terms) / len(terms)
+
+
+def search(session, user_id, query, fuzzy=False, limit=DEFAULT_SEARCH_LIMIT):
+    """The user's transactions matching ``query``; see the module docstring for the two modes."""
+    terms = query.split()
+    if not terms:
+        return []
+    indexed = [term for term in terms if len(term) >= TRIGRAM]
+    has_archive = archived_before(session, user_id) is not None
+
+    if fuzzy and indexed:
+        grams = sorted(set().union(*map(trigrams, indexed)))
+        candidates = fts_hits(match_expression(user_id, grams, "OR"), order_by="rank", limit=FUZZY_CANDIDATES)
+        rows = session.execute(select(Transaction).join(candidates, candidates.c.id == Transaction.id)
+                               .where(Transaction.user_id == user_id)).scalars().all()
+        if has_archive:
+            rows += archived_matches(session, user_id, [or_(*substring_clauses(grams, ArchivedTransaction))],
+                                     FUZZY_CANDIDATES)
+        scored = [(similarity(terms, row), row) for row in rows]
+        scored = [item for item in scored if item[0] >= FUZZY_MIN_SIMILARITY]
+        scored.sort(key=lambda item: (-item[0], -item[1].id))
+        return [row for _, row in scored[:limit]]
+
+    statement = select(Transaction).where(
+        Transaction.user_id == user_id, *substring_clauses(term for term in terms if len(term) < TRIGRAM))
+    if indexed:
+        hits = fts_hits(match_expression(user_id, indexed))
+        statement = statement.join(hits, hits.c.id == Transaction.id)
+    rows = session.execute(statement.order_by(Transaction.id.desc()).limit(limit)).scalars().all()
+    if has_archive and len(rows) < limit:
+        rows += archived_matches(session, user_id, substring_clauses(terms, ArchivedTransaction), limit - len(rows))
+    return rows
+
+
+def rebuild_index(session):
+    """Rebuild transactions_fts from the transactions table, e.g. after restoring a backup."""
+    session.execute(text("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')"))
+    session.commit()
@@ -0,0 +1,56 @@
+"""Names and defaults shared by the CLI and the modules behind it.
+
+Only the standard library is imported here, so the command line can be built
+(and ``--help`` answered) without loading SQLAlchemy or bcrypt.
+"""
+import datetime
+import os
+
+DATABASE_URL_ENV = "BUDGET_TRACKER_DB_URL"
+DEFAULT_DATABASE_URL = "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "budget_tracker.db")
+
+BCRYPT_ROUNDS_ENV = "BUDGET_TRACKER_BCRYPT_ROUNDS"
+DEFAULT_BCRYPT_ROUNDS = 12
+TOKEN_ENV = "BUDGET_TRACKER_TOKEN"
+SESSION_FILE_ENV = "BUDGET_TRACKER_SESSION_FILE"
+DEFAULT_SESSION_FILE = os.path.join(os.path.expanduser("~"), ".budget_tracker", "session.json")
+DEFAULT_TOKEN_TTL = datetime.timedelta(days=7)
+
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_SNAPSHOT_TRANSACTIONS = 10
+RENDER_BATCH_ROWS = 1000  # lines per write when streaming a listing
+NOTES_MAX_LENGTH = 500
+DEFAULT_SEARCH_LIMIT = 20
+FUZZY_CANDIDATES = 200  # best-ranked trigram matches re-scored in Python
+FUZZY_MIN_SIMILARITY = 0.75
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_NATURAL_KEY = ("date", "amount", "category")
+IMPORT_BATCH_ID_LENGTH = 12  # hex characters
+IMPORT_FORMATS = ("csv", "jsonl", "ofx")
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+EXPORT_TABLES = ("transactions", "budgets")
+DEFAULT_EXPORT_BATCH_SIZE = 10000
+DEFAULT_ROW_GROUP_SIZE = 100000
+DEFAULT_TOP_CATEGORIES = 5
+DEFAULT_ALERT_THRESHOLDS = (0.8, 1.0)  # fractions of a monthly budget
+DEFAULT_BATCH_SHARD_SIZE = 50
+DEFAULT_API_HOST = "127.0.0.1"
+DEFAULT_API_PORT = 8080
+DEFAULT_API_POOL_SIZE = 8
+REPORT_CACHE_ENV = "BUDGET_TRACKER_REPORT_CACHE"
+REPORT_CACHE_MODES = ("off", "memory", "disk")
+DEFAULT_REPORT_CACHE_MODE = "memory"
+DEFAULT_REPORT_CACHE_SIZE = 128
+DEFAULT_REPORT_CACHE_ROWS = 1000
+REPORT_CACHE_TOUCH_INTERVAL = datetime.timedelta(hours=1)  # how stale a disk entry's used_at may get
+WRITER_SOCKET_ENV = "BUDGET_TRACKER_WRITER_SOCKET"
+DEFAULT_WRITER_MAX_BATCH = 256  # writes per group commit
+DEFAULT_WRITER_MAX_LATENCY_MS = 2  # longest wait for more writes before committing
+DEFAULT_WRITER_TIMEOUT = 30  # seconds a client waits for its write to be committed
+METRICS_LOG_ENV = "BUDGET_TRACKER_METRICS_LOG"
+PROFILE_TOP_STATEMENTS = 5
+
+
+def database_url(url=None):
+    """The URL to use: an explicit one, then $BUDGET_TRACKER_DB_URL, then the file next to the code."""
+    return url or os.environ.get(DATABASE_URL_ENV) or DEFAULT_DATABASE_URL
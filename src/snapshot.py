@@ -0,0 +1,71 @@
+"""Everything a screen needs about one user, loaded up front in a fixed number of queries.
+
+``load_snapshot`` issues SNAPSHOT_QUERIES statements however many budgets and
+transactions the user has: the user joined to their balance, their budgets (selectin)
+and the newest ``limit`` transactions of a date window, plus one when those reach back
+into the user's archive. The objects are fully loaded, so they can be used after the
+session is closed; touching a relationship that was not loaded raises instead of
+quietly running another query per row.
+"""
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from sqlalchemy import select
+from sqlalchemy.orm import raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from archive import sources
+from models import Balance, User
+from settings import DEFAULT_SNAPSHOT_TRANSACTIONS
+
+SNAPSHOT_QUERIES = 3
+
+
+@dataclass
+class UserSnapshot:
+    """A user with their balance, budgets and most recent transactions, newest first."""
+    user: User
+    balance: Balance
+    budgets: list = field(default_factory=list)
+    transactions: list = field(default_factory=list)
+
+    @property
+    def budget_amounts(self):
+        return {budget.category: budget.amount for budget in self.budgets}
+
+    @property
+    def total_balance(self):
+        return self.balance.balance if self.balance is not None else Decimal(0)
+
+
+def load_snapshot(session, user_id, date_from=None, date_to=None, limit=DEFAULT_SNAPSHOT_TRANSACTIONS):
+    """Load a UserSnapshot, or None when the user does not exist."""
+    row = session.execute(
+        select(User, Balance)
+        .outerjoin(Balance, Balance.user_id == User.id)
+        .where(User.id == user_id)
+        .options(selectinload(User.budgets), raiseload("*", sql_only=True))
+    ).first()
+    if row is None:
+        return None
+    user, balance = row
+
+    transactions = []
+    # Older rows come from the archive only when the hot table cannot fill the window
+    for entity, clauses in sources(user.archived_before, date_from):
+        if len(transactions) >= limit:
+            break
+        query = select(entity).where(entity.user_id == user_id, *clauses)
+        if date_from is not None:
+            query = query.where(entity.date >= date_from)
+        if date_to is not None:
+            query = query.where(entity.date <= date_to)
+        transactions += session.execute(
+            query.order_by(entity.date.desc(), entity.id.desc()).limit(limit - len(transactions))
+            .options(raiseload("*", sql_only=True))
+        ).scalars().all()
+
+    # Point the children back at the loaded user so the reverse side works once detached too
+    for child in [*user.budgets, *transactions]:
+        set_committed_value(child, "user", user)
+    return UserSnapshot(user, balance, sorted(user.budgets, key=lambda budget: budget.category), transactions)
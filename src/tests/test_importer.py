@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from db import make_engine
+from importer import ImportAborted, import_file, import_records
+from models import Base, Transaction, User
+
+
+@pytest.fixture
+def session_factory():
+    engine = make_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add(User("importer", "x", "importer@example.com"))
+        session.commit()
+    yield factory
+    engine.dispose()
+
+
+def stored(session_factory):
+    with session_factory() as session:
+        return session.scalar(select(func.count()).select_from(Transaction))
+
+
+def test_malformed_jsonl_line_only_skips_itself(session_factory, tmp_path):
+    path = tmp_path / "rows.jsonl"
+    path.write_text('{"type": "expense", "category": "A", "amount": "1", "date": "2024-06-01"}\n'
+                    '{bad json\n'
+                    '[1, 2]\n'
+                    '{"type": "expense", "category": "B", "amount": "2", "date": "2024-06-01"}\n')
+    result = import_file(session_factory, str(path), 1, chunk_size=1)
+    assert (result.inserted, result.invalid) == (2, 2)
+    assert [position for position, _ in result.errors] == [2, 3]
+    assert stored(session_factory) == 2
+
+
+def test_bad_ofx_amount_only_skips_its_transaction(session_factory, tmp_path):
+    path = tmp_path / "statement.ofx"
+    path.write_text("<OFX><STMTTRN><DTPOSTED>20240601<TRNAMT>-5.00<NAME>Shop</STMTTRN>"
+                    "<STMTTRN><DTPOSTED>20240602<TRNAMT>abc<NAME>Bad</STMTTRN></OFX>")
+    result = import_file(session_factory, str(path), 1)
+    assert (result.inserted, result.invalid) == (1, 1)
+    assert result.errors == [(2, "invalid amount 'abc'")]
+
+
+def test_error_after_a_committed_chunk_reports_the_batch(session_factory):
+    def records():
+        yield {"type": "expense", "category": "A", "amount": "1", "date": "2024-06-01"}
+        raise OSError("read failed")
+
+    with pytest.raises(ImportAborted) as aborted:
+        import_records(session_factory, records(), 1, chunk_size=1)
+    assert aborted.value.result.inserted == 1
+    with session_factory() as session:
+        assert session.scalar(select(Transaction.import_batch_id)) == aborted.value.result.batch_id
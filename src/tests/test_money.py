@@ -0,0 +1,26 @@
+from decimal import Decimal
+
+import pytest
+
+from money import parse_amount, to_cents
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1,234.5", Decimal("1234.50")),
+    ("12.345", Decimal("12.35")),
+    (0.1, Decimal("0.10")),
+    ("92233720368547758.07", Decimal("92233720368547758.07")),
+])
+def test_parse_amount(value, expected):
+    assert parse_amount(value) == expected
+
+
+@pytest.mark.parametrize("value", ["abc", "", "nan", "inf", "1e30", 1e30, "1e20", "92233720368547758.08",
+                                   "-92233720368547758.08"])
+def test_parse_amount_rejects(value):
+    with pytest.raises(ValueError):
+        parse_amount(value)
+
+
+def test_to_cents_fits_sqlite_integer():
+    assert to_cents("-92233720368547758.07") == -(2 ** 63 - 1)
@@ -0,0 +1,86 @@
+"""The exact number of SQL statements of the snapshot loader and the report.
+
+Loads snapshots of users with no data and with many budgets and transactions, then
+touches every attribute and relationship the screens use after the session is closed.
+The query count must not depend on the amount of data, and nothing may lazy-load.
+"""
+import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from db import make_engine
+from models import Base, Budget, Transaction, User
+from report_cache import ReportCache
+from reports import cached_report
+from snapshot import load_snapshot
+
+USERS = {"empty": (0, 0), "busy": (12, 5000)}  # budgets, transactions
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "after_cursor_execute", self.after_execute)
+
+    def after_execute(self, *args):
+        self.count += 1
+
+
+def seed(session, username, budgets, transactions):
+    user = User(username, "x", f"{username}@example.com")
+    session.add(user)
+    session.flush()
+    session.add_all(Budget(user_id=user.id, category=f"category{index}", amount=Decimal(100)) for index in range(budgets))
+    session.add_all(Transaction("expense", f"category{index % max(budgets, 1)}", Decimal(index % 50),
+                                datetime.date(2024, 1, 1) + datetime.timedelta(days=index % 365), user.id)
+                    for index in range(transactions))
+    session.commit()
+    return user.id
+
+
+def touch(snapshot):
+    values = [snapshot.user.username, snapshot.total_balance]
+    for budget in snapshot.budgets:
+        values += [budget.category, budget.amount, budget.user.username]
+    for transaction in snapshot.transactions:
+        values += [transaction.date, transaction.amount, transaction.user.username]
+    return values
+
+
+@pytest.fixture(scope="module")
+def database():
+    engine = make_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        users = {name: seed(session, name, *sizes) for name, sizes in USERS.items()}
+    yield engine, users, QueryCounter(engine)
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name", USERS)
+def test_snapshot(database, name):
+    engine, users, counter = database
+    with Session(engine) as session:
+        counter.count = 0
+        snapshot = load_snapshot(session, users[name])
+        assert counter.count == 3
+
+    counter.count = 0
+    touch(snapshot)
+    assert counter.count == 0
+
+
+@pytest.mark.parametrize("name", USERS)
+def test_report(database, name):
+    """The snapshot, then the data_version check plus, on a miss, the monthly summaries."""
+    engine, users, counter = database
+    cache = ReportCache()
+    for expected in (5, 4):  # cache miss, then hit
+        with Session(engine) as session:
+            counter.count = 0
+            snapshot = load_snapshot(session, users[name])
+            cached_report(session, users[name], cache=cache, budgets=snapshot.budget_amounts)
+            assert counter.count == expected
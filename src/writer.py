@@ -0,0 +1,331 @@
+"""Group commits for many processes writing to one SQLite file.
+
+SQLite has one write lock per database. When several copies of the CLI add
+transactions or set budgets at the same time, every commit queues for that lock on
+its own, and past the busy timeout (or when a read has to be upgraded to a write)
+the command fails with "database is locked". ``admin writer`` runs a single process
+that owns those writes instead: clients send each write over a Unix socket, the
+writer queues them and commits up to ``max_batch`` in one transaction, waiting at
+most ``max_latency`` seconds after the first for more to arrive. A client only gets
+its reply (the row's id and any budget alerts) once the commit holding its write is
+done, so a write acknowledged through the writer is as durable as a direct one.
+
+Clients go through the writer when $BUDGET_TRACKER_WRITER_SOCKET names its socket
+and write directly when it is unset or the socket cannot be connected to. If a group commit
+fails, its writes are retried in one transaction each, so a bad write only fails
+itself. The socket is created readable by its owner only: like the admin commands,
+the writer trusts whoever can reach it, as it would anyone who can open the file.
+
+The protocol is one JSON object per line: ``{"op", "database", "user_id", "fields"}``
+in, and the WriteResult fields or ``{"error"}`` out.
+"""
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import stat
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from budgets import BudgetAlert, check_alerts, expense_deltas
+from db import Session, get_engine
+from importer import parse_row
+from models import Budget, Transaction
+from money import parse_amount
+from reports import json_default
+from settings import DEFAULT_WRITER_MAX_BATCH, DEFAULT_WRITER_MAX_LATENCY_MS, DEFAULT_WRITER_TIMEOUT, WRITER_SOCKET_ENV
+
+
+class WriterError(RuntimeError):
+    """The writer could not commit a write, or did not say whether it did."""
+
+
+@dataclass
+class WriteResult:
+    """The id of the written row, whether it was created and the budget alerts it raised."""
+    id: int
+    created: bool = True
+    alerts: list = field(default_factory=list)
+
+
+def add_transaction(session, user_id, transaction):
+    """Insert a transaction given as a raw mapping (see importer.parse_row) and check its budget."""
+    row = parse_row(transaction, user_id)
+    record = Transaction(**row)
+    session.add(record)
+    session.flush()
+    return WriteResult(record.id, alerts=check_alerts(session, user_id, expense_deltas([row])))
+
+
+def set_budget(session, user_id, category, amount):
+    """Create or update the budget of a category."""
+    amount = parse_amount(amount)
+    budget = session.scalar(select(Budget).where(Budget.user_id == user_id, Budget.category == category))
+    created = budget is None
+    if created:
+        budget = Budget(user_id=user_id, category=category, amount=amount)
+        session.add(budget)
+    else:
+        budget.amount = amount
+    session.flush()
+    return WriteResult(budget.id, created=created)
+
+
+WRITES = {"add_transaction": add_transaction, "set_budget": set_budget}
+
+
+def apply(session, message):
+    write = WRITES.get(message.get("op"))
+    if write is None:
+        raise ValueError(f"unknown write {message.get('op')!r}")
+    return write(session, message["user_id"], **message["fields"])
+
+
+def commit(messages):
+    """Apply the writes in one transaction of the calling thread's session."""
+    session = Session()
+    try:
+        with session.begin():
+            return [apply(session, message) for message in messages]
+    finally:
+        session.close()
+
+
+def database_name():
+    """The configured database, so that a client never writes through a writer serving another one."""
+    url = get_engine().url
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        return os.path.realpath(url.database)
+    return url.render_as_string()
+
+
+def encode(value):
+    return (json.dumps(value, default=json_default) + "\n").encode()
+
+
+def decode_result(reply):
+    if "error" in reply:
+        raise (ValueError if reply.get("invalid") else WriterError)(reply["error"])
+    alerts = [BudgetAlert(alert["category"], alert["period"], alert["threshold"], Decimal(alert["budget"]),
+                          Decimal(alert["spent"])) for alert in reply["alerts"]]
+    return WriteResult(reply["id"], reply["created"], alerts)
+
+
+def submit(op, user_id, timeout=DEFAULT_WRITER_TIMEOUT, **fields):
+    """Run one write through the writer when one is listening, else in a transaction of its own.
+
+    Returns a WriteResult; invalid input raises ValueError either way.
+    """
+    message = {"op": op, "database": database_name(), "user_id": user_id, "fields": fields}
+    path = os.environ.get(WRITER_SOCKET_ENV)
+    if path:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.connect(path)  # blocking, so a full accept backlog waits instead of failing
+        except OSError:
+            client.close()  # no writer running, or not one this user can reach
+        else:
+            with client:
+                client.settimeout(timeout)
+                return send(client, message)
+    return commit([message])[0]
+
+
+def send(client, message):
+    try:
+        client.sendall(encode(message))
+        with client.makefile("rb") as reader:
+            line = reader.readline()
+    except socket.timeout:
+        raise WriterError("The writer did not reply in time; the write may still be committed.")
+    if not line:
+        raise WriterError("The writer closed the connection before replying; the write may still be committed.")
+    return decode_result(json.loads(line))
+
+
+class GroupCommitter:
+    """Commits queued writes in groups from one thread; ``submit`` blocks until its write is committed."""
+
+    def __init__(self, max_batch=DEFAULT_WRITER_MAX_BATCH, max_latency=DEFAULT_WRITER_MAX_LATENCY_MS / 1000):
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.queue = queue.Queue()
+        self.commits = 0
+        self.writes = 0
+        self.thread = threading.Thread(target=self.run, name="group-commit", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Commit what is already queued, then end the thread."""
+        self.queue.put(None)
+        self.thread.join()
+
+    def submit(self, message):
+        future = Future()
+        self.queue.put((message, future))
+        return future.result()
+
+    def next_batch(self):
+        """Wait for one write, then take more until max_batch or max_latency; None stops the thread."""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch and batch[-1] is not None:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            pending = [item for item in batch if item is not None]
+            if pending:
+                self.commit(pending)
+            if len(pending) < len(batch):
+                return
+
+    def commit(self, pending):
+        try:
+            results = commit([message for message, _ in pending])
+        except Exception as error:
+            if len(pending) == 1:
+                pending[0][1].set_exception(error)
+                return
+            # One write spoiled the group: give every write a transaction of its own
+            for item in pending:
+                self.commit([item])
+            return
+        self.commits += 1
+        self.writes += len(pending)
+        for (_, future), result in zip(pending, results):
+            future.set_result(result)
+
+
+class WriteHandler(socketserver.StreamRequestHandler):
+    """Answers each JSON line from one client once its write is committed."""
+
+    def handle(self):
+        for line in self.rfile:
+            self.wfile.write(encode(self.server.reply(line)))
+
+
+class WriterServer(socketserver.ThreadingUnixStreamServer):
+    """One thread per client connection; ``server_close`` answers what they sent before returning."""
+    daemon_threads = False  # server_close joins the handler threads
+    request_queue_size = socket.SOMAXCONN
+
+    def __init__(self, path, committer):
+        self.committer = committer
+        self.database = database_name()
+        self.bound = False
+        self.connections = set()
+        self.lock = threading.Lock()
+        super().__init__(path, WriteHandler)
+
+    def server_bind(self):
+        remove_stale_socket(self.server_address)
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+        self.bound = True
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections.add(request)
+        super().process_request(request, client_address)
+
+    def shutdown_request(self, request):
+        with self.lock:
+            self.connections.discard(request)
+        super().shutdown_request(request)
+
+    def server_close(self):
+        """Stop listening, answer every line clients already sent, then wait for the handler threads.
+
+        Connections still in the listen backlog are accepted first. Each connection's
+        reading side is shut down, so its handler serves the lines already received and
+        then sees end of file instead of waiting for more.
+        """
+        if self.bound:
+            os.unlink(self.server_address)  # new clients write directly from here on
+            self.bound = False
+            self.accept_backlog()
+        with self.lock:
+            for connection in self.connections:
+                try:
+                    connection.shutdown(socket.SHUT_RD)
+                except OSError:
+                    pass  # the client has gone already
+        super().server_close()
+
+    def accept_backlog(self):
+        self.socket.setblocking(False)
+        while True:
+            try:
+                request, client_address = self.socket.accept()
+            except BlockingIOError:
+                return
+            request.setblocking(True)
+            self.process_request(request, client_address)
+
+    def reply(self, line):
+        try:
+            message = json.loads(line)
+            if message.get("database") != self.database:
+                return {"error": f"The writer serves {self.database}, not {message.get('database')}."}
+            return asdict(self.committer.submit(message))
+        except ValueError as error:
+            return {"error": str(error), "invalid": True}
+        except Exception as error:
+            return {"error": f"{type(error).__name__}: {error}"}
+
+
+def remove_stale_socket(path):
+    """Delete the socket file a crashed writer left behind; refuse to replace a live one."""
+    if not os.path.exists(path):
+        return
+    if not stat.S_ISSOCK(os.stat(path).st_mode):
+        raise WriterError(f"{path} exists and is not a socket.")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    raise WriterError(f"A writer is already listening on {path}.")
+
+
+def interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(path, max_batch=DEFAULT_WRITER_MAX_BATCH, max_latency=DEFAULT_WRITER_MAX_LATENCY_MS / 1000):
+    """Serve writes on the Unix socket ``path`` until SIGINT or SIGTERM; returns the GroupCommitter.
+
+    Writes already sent when it stops are still committed and answered before it returns.
+    """
+    server = WriterServer(path, GroupCommitter(max_batch, max_latency))
+    committer = server.committer.start()
+    signal.signal(signal.SIGTERM, interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        committer.stop()
+    return committer